@@ -1,31 +1,37 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import pickle
-import requests
 import datetime
-import matplotlib
-import matplotlib.pyplot as plt
 import base64
-import io
+import os
+import sys
 from pathlib import Path
 
 
 ############################## MODELS & STREAMLIT CONFIGURATION ##############################
 
-# Function to load a model using pickle
-def load_model(model_path):
-    with open(model_path, 'rb') as file:
-        return pickle.load(file)
-
 # Resolve paths relative to this file (App/app_football.py)
 APP_DIR = Path(__file__).resolve().parent       # App/ folder
 BASE_DIR = APP_DIR.parent                       # project root
-MODELS_DIR = BASE_DIR / "Models"
 
-# Load models
-model_with_weather = load_model(MODELS_DIR / "finalized_model_with_weather (3).sav")
-model_without_weather = load_model(MODELS_DIR / "finalized_model_without_weather (3).sav")
+# Make the shared code in src/football importable
+if str(BASE_DIR / "src") not in sys.path:
+    sys.path.insert(0, str(BASE_DIR / "src"))
+
+from football.charts import attendance_chart, attendance_chart_spec
+from football.core import AttendancePredictor
+from football.features import default_form
+from football.form import current_form
+from football.thresholds import ALL, LATEST_SEASON, ROLLING, ROLLING_WINDOW
+from football.weather import get_weather_data
+
+# The prediction itself (features, models, prediction cube, thresholds) is football.core, shared
+# with the HTTP service (football.service). The models are cached for the whole server process
+# and reloaded only if their file changes; each one is compiled into flat NumPy arrays
+# (tree_engine.py) and stacked with its P10/P90 companion (quantiles.py), and without a forecast
+# most matches are a lookup in the precomputed cube (cube.py).
+predictor = AttendancePredictor.current()
+
+# Attendance chart: "svg" (default, small and sharp), "png", or "native" (Vega-Lite, drawn by the browser)
+CHART_OUTPUT = os.environ.get("FOOTBALL_CHART", "svg")
 
 # Configure Streamlit page
 st.set_page_config(
@@ -167,8 +173,10 @@ st.markdown("""
 
 ############################## INPUT FIELDS ##############################
 
-# Define available teams
-available_home_teams = ["Club Brugge", "Cercle Brugge", "Genk", "RSC Anderlecht", "Union SG", "KAA Gent", "Royal Antwerp", "KVC Westerlo", "Standard Liège", "KV Mechelen", "R Charleroi SC", "OH Leuven", "Sint-Truiden", "FCV Dender EH", "Zulte Waregem", "La Louvière"]
+# Team facts (stadium, capacity, roof, coordinates, thresholds) by team id, from football.db
+# (loaded once per process, see football.registry)
+teams = predictor.teams
+available_home_teams = list(teams.league_teams)
 available_away_teams = available_home_teams
 
 # Fix competition to Super League (no dropdown shown to the user)
@@ -201,70 +209,32 @@ with row2_col2:
     match_hour = match_time.hour
     weekday = match_date.strftime("%A")
 
+# Home games the Low / Normal / High thresholds are taken from (kept up to date in football.db)
+threshold_scopes = {
+    "All seasons": ALL,
+    "Latest season": LATEST_SEASON,
+    f"Last {ROLLING_WINDOW} home games": ROLLING,
+}
+threshold_scope = st.radio(
+    "📊 Compare with",
+    list(threshold_scopes),
+    horizontal=True,
+    help="Home games of the home team used for the Low / Normal / High attendance levels",
+)
+
+home_team_id = teams.id_of(home_team)
+
 # Close the card container
 st.markdown("</div>", unsafe_allow_html=True)
 
 
 ############################## WEATHER DATA ##############################
 
-# Function to fetch weather data from an API
-def get_weather_data(latitude, longitude, match_date, match_hour):
-    api_url = (
-        f"https://api.open-meteo.com/v1/forecast?"
-        f"latitude={latitude}&longitude={longitude}&start_date={match_date}&end_date={match_date}"
-        f"&hourly=temperature_2m,weathercode"
-        f"&timezone=auto"
-    )
-    try:
-        response = requests.get(api_url)
-        response.raise_for_status()
-        weather_data = response.json()
-        hourly_data = weather_data['hourly']
-        temperature_at_match = hourly_data['temperature_2m'][match_hour]
-        weather_code_at_match = hourly_data['weathercode'][match_hour]
-        # Map weather codes to human-readable conditions
-        if weather_code_at_match in [0]:
-            weather_condition = "Clear or mostly clear"
-        elif weather_code_at_match in [1, 2, 3]:
-            weather_condition = "Partly cloudy"
-        elif weather_code_at_match in [61, 63, 65, 80, 81, 82]:
-            weather_condition = "Rainy"
-        elif weather_code_at_match in [51, 53, 55]:
-            weather_condition = "Drizzle"
-        elif weather_code_at_match in [71, 73, 75, 85, 86, 77]:
-            weather_condition = "Snowy"
-        else:
-            weather_condition = "Unknown"
-
-        return temperature_at_match, weather_condition
-    except:
-        return None, None
-
-# Define stadium coordinates
-stadium_coordinates = {
-    "Club Brugge": {"lat": 51.19333, "lon": 3.18056},
-    "Cercle Brugge": {"lat": 51.19333, "lon": 3.18056},
-    "Genk": {"lat": 51.00500, "lon": 5.53333},
-    "RSC Anderlecht": {"lat": 50.83417, "lon": 4.29833},
-    "Union SG": {"lat": 50.81733, "lon": 4.32417},
-    "KAA Gent": {"lat": 51.01611, "lon": 3.73417},
-    "Royal Antwerp": {"lat": 51.22500, "lon": 4.46992},
-    "KVC Westerlo": {"lat": 51.09482, "lon": 4.92881},
-    "Standard Liège": {"lat": 50.60597, "lon": 5.53934},
-    "KV Mechelen": {"lat": 51.03718, "lon": 4.48640},
-    "R Charleroi SC": {"lat": 50.41461, "lon": 4.45379},
-    "OH Leuven": {"lat": 50.86833, "lon": 4.69417},
-    "Sint-Truiden": {"lat": 50.81347, "lon": 5.16626},
-    "FCV Dender EH": {"lat": 50.88368, "lon": 4.07118},
-    "Zulte Waregem": {"lat": 50.88306, "lon": 3.42889},
-    "La Louvière": {"lat": 50.47750, "lon": 4.20131}
-}
-
 # Fetch weather data based on home team and match information
+# (cached per stadium and date for the whole process, see football.weather)
 if home_team and match_date and match_time:
-    coordinates = stadium_coordinates[home_team]
-    latitude = coordinates['lat']
-    longitude = coordinates['lon']
+    latitude = teams.latitude[home_team_id]
+    longitude = teams.longitude[home_team_id]
     temperature_at_match, weather_condition = get_weather_data(latitude, longitude, match_date, match_hour)
 
 # Weather display and emoji mapping logic
@@ -314,6 +284,10 @@ else:
 ################### Rankings and Team Data Processing ##############################
 
 # user inputs for rankings and last 5 games (home + away)
+# The last-5 form is prefilled from football.db (table TeamForm, kept up to date by the
+# cleaning / DB build); the user can still override it.
+stored_form = {**default_form, **current_form(home_team, away_team)}
+
 form_col1, form_col2 = st.columns(2)
 
 with form_col1:
@@ -327,19 +301,19 @@ with form_col1:
         "Home team – goals scored in last 5 games",
         min_value=0,
         max_value=50,
-        value=6,
+        value=int(stored_form["goals_scored_home_last5"]),
     )
     goals_conceded_home_last5 = st.number_input(
         "Home team – goals conceded in last 5 games",
         min_value=0,
         max_value=50,
-        value=5,
+        value=int(stored_form["goals_conceded_home_last5"]),
     )
     wins_home_last5 = st.number_input(
         "Home team – wins in last 5 games (last 5)",
         min_value=0,
         max_value=5,
-        value=3,
+        value=int(stored_form["wins_home_last5"]),
     )
 
 with form_col2:
@@ -353,653 +327,120 @@ with form_col2:
         "Away team – goals scored in last 5 games",
         min_value=0,
         max_value=50,
-        value=5,
+        value=int(stored_form["goals_scored_away_last5"]),
     )
-
-
-# Define team-specific data, including stadium capacity and attendance thresholds
-team_data = {
-    "Cercle Brugge": {
-        "max_capacity": 29062,
-        "attendance_30th_percentile": 3837.0,
-        "attendance_70th_percentile": 4589.4,
-    },
-    "Club Brugge": {
-        "max_capacity": 29062,
-        "attendance_30th_percentile": 19710.0,
-        "attendance_70th_percentile": 24388.4,
-    },
-    "FCV Dender EH": {
-        "max_capacity": 6200,
-        "attendance_30th_percentile": 2496.6,
-        "attendance_70th_percentile": 3949.0,
-    },
-    "Genk": {
-        "max_capacity": 23500,
-        "attendance_30th_percentile": 14705.2,
-        "attendance_70th_percentile": 18137.6,
-    },
-    "KAA Gent": {
-        "max_capacity": 20000,
-        "attendance_30th_percentile": 13262.2,
-        "attendance_70th_percentile": 17244.1,
-    },
-    "KV Mechelen": {
-        "max_capacity": 16500,
-        "attendance_30th_percentile": 11667.2,
-        "attendance_70th_percentile": 14690.8,
-    },
-    "KVC Westerlo": {
-        "max_capacity": 8000,
-        "attendance_30th_percentile": 5000.0,
-        "attendance_70th_percentile": 6516.8,
-    },
-    "La Louvière": {
-        "max_capacity": 12000,
-        "attendance_30th_percentile": 1888.0,
-        "attendance_70th_percentile": 3053.0,
-    },
-    "OH Leuven": {
-        "max_capacity": 10500,
-        "attendance_30th_percentile": 5612.4,
-        "attendance_70th_percentile": 7229.8,
-    },
-    "R Charleroi SC": {
-        "max_capacity": 15000,
-        "attendance_30th_percentile": 6306.7,
-        "attendance_70th_percentile": 8884.8,
-    },
-    "RSC Anderlecht": {
-        "max_capacity": 22500,
-        "attendance_30th_percentile": 18000.0,
-        "attendance_70th_percentile": 20000.0,
-    },
-    "Royal Antwerp": {
-        "max_capacity": 16644,
-        "attendance_30th_percentile": 11825.0,
-        "attendance_70th_percentile": 14736.8,
-    },
-    "Sint-Truiden": {
-        "max_capacity": 14600,
-        "attendance_30th_percentile": 4409.4,
-        "attendance_70th_percentile": 6033.6,
-    },
-    "Standard Liège": {
-        "max_capacity": 27670,
-        "attendance_30th_percentile": 18134.0,
-        "attendance_70th_percentile": 22512.0,
-    },
-    "Union SG": {
-        "max_capacity": 9400,
-        "attendance_30th_percentile": 5910.0,
-        "attendance_70th_percentile": 7024.0,
-    },
-    "Zulte Waregem": {
-        "max_capacity": 12400,
-        "attendance_30th_percentile": 6626.6,
-        "attendance_70th_percentile": 7953.5,
-    },
-}
-
-
-# --- stadium features for the model (uses your team_data dict) ---
-home_team_info = team_data.get(home_team)
-max_capacity_feature = home_team_info["max_capacity"] if home_team_info else 0
-
-# mark which stadiums have (mostly) a full roof – adjust if needed
-full_roof_map = {
-    "Club Brugge": 0,
-    "Cercle Brugge": 0,
-    "Genk": 0,
-    "RSC Anderlecht": 1,
-    "Union SG": 0,
-    "KAA Gent": 0,
-    "Royal Antwerp": 0,
-    "KVC Westerlo": 0,
-    "Standard Liège": 0,
-    "KV Mechelen": 0,
-    "R Charleroi SC": 0,
-    "OH Leuven": 0,
-    "Sint-Truiden": 0,
-    "FCV Dender EH": 0,
-    "Zulte Waregem": 0,
-    "La Louvière": 0,
-}
-full_roof_feature = float(full_roof_map.get(home_team, 0))
-
-# --- derby flag (based on your derby list) ---
-derby_pairs = {
-    ("Club Brugge", "Cercle Brugge"),      # Bruges Derby
-    ("RSC Anderlecht", "Union SG"),        # Brussels Derby
-    ("Genk", "Sint-Truiden"),              # Limburg Derby
-    ("Standard Liège", "R Charleroi SC"),  # Walloon Derby
-    ("OH Leuven", "KV Mechelen"),          # Dijle Derby
-}
-
-is_derby = int(
-    (home_team, away_team) in derby_pairs
-    or (away_team, home_team) in derby_pairs
-)
-
-
-# --- team categories from ranking (for the Home/Opposing team Category_* dummies) ---
-def categorize_team(r):
-    if r is None:
-        return "Unknown"
-    try:
-        r = int(r)
-    except ValueError:
-        return "Unknown"
-
-    if r <= 4:
-        return "Top ranked"
-    elif r <= 8:
-        return "Medium ranked"
-    elif r <= 16:
-        return "Bottom ranked"
-    else:
-        return "Not ranked"
-
-home_team_category = categorize_team(ranking_home_team)
-opposing_team_category = categorize_team(ranking_away_team)
-
-# --- game day (Weekday / Weekend) for Game day_* dummies ---
-game_day = "Weekend" if match_date.weekday() >= 5 else "Weekday"
-
-# --- time slot (Afternoon / Evening / Night) for Time slot_* dummies ---
-# Must match the notebook logic: h < 18 = Afternoon, 18 <= h < 20 = Evening, else Night
-if match_hour < 18:
-    time_slot = "Afternoon"
-elif 18 <= match_hour < 20:
-    time_slot = "Evening"
-else:
-    time_slot = "Night"
-
-# --- Weather GoodBad (Good / Bad) based on your rule ---
-good_conditions = ["Clear or mostly clear", "Partly cloudy"]
-bad_conditions = ["Rainy", "Drizzle", "Snowy"]
-
-if 'weather_condition' in locals() and weather_condition is not None:
-    if weather_condition in good_conditions:
-        weather_goodbad = "Good"
-    elif weather_condition in bad_conditions:
-        weather_goodbad = "Bad"
-    else:
-        weather_goodbad = "Good"  # neutral default, can set to "Bad" if you prefer
-else:
-    weather_goodbad = "Good"
+    st.caption("Last-5 form is filled in from the latest matches in the database (home games for the "
+               "home team, away games for the away team).")
 
 
 ################### Preparing Input Data for the Model ##############################
 
-# Define the input features for the prediction model
-input_features = {
-    # basic match info
-    'Matchday': matchday,
-    'Time': match_hour,
-    'Home Team': home_team,
-    'Away Team': away_team,
-    'Weekday': match_date.strftime("%A"),
-    'Month': match_date.month,
-    'Day': match_date.day,
-
-    # rankings
-    'Ranking Home Team': float(ranking_home_team),
-    'Ranking Away Team': float(ranking_away_team),
-
-    # recent form – home team, as in your training set
-    'Goals Scored in Last 5 Games': float(goals_scored_home_last5),
-    'Goals Conceded in Last 5 Games': float(goals_conceded_home_last5),
-    'Number of Wins in Last 5 Games': float(wins_home_last5),
-
-    # map last-5 goals into these features (so nothing stays at 0)
-    'Home Team Goals Scored': float(goals_scored_home_last5),
-    'Away Team Goals Scored': float(goals_scored_away_last5),
-
-    # weather (raw condition + numeric temperature)
-    'Weather': weather_condition if 'weather_condition' in locals() else 'Unknown',
-    'Temperature (°C)': float(temperature_at_match) if 'temperature_at_match' in locals() and temperature_at_match is not None else 0.0,
-
-    # stadium features
-    'Derby': float(is_derby),
-    'Max Capacity': float(max_capacity_feature),
-    'Full Roof': float(full_roof_feature),
-
-    # macro features – keep neutral for now unless you add extra inputs
-    'GDP_Real_lagQ': 0.0,
-    'CPI_QoQ_Growth_%_lagQ': 0.0,
-    'Employment_Rate_%_lagQ': 0.0,
-
-    # extra categorical vars for dummies
-    'Home team Category': home_team_category,
-    'Opposing team Category': opposing_team_category,
-    'Game day': game_day,
-    'Time slot': time_slot,
-    'Weather GoodBad': weather_goodbad,
+# The match as football.core takes it (the HTTP service receives the same fields as JSON).
+# Stadium, derby, ranking category, game day, time slot and weather rules live in football.features.
+match = {
+    "home_team": home_team,
+    "away_team": away_team,
+    "match_date": match_date,
+    "match_time": match_hour,
+    "matchday": matchday,
+    "ranking_home_team": ranking_home_team,
+    "ranking_away_team": ranking_away_team,
+    "goals_scored_home_last5": goals_scored_home_last5,
+    "goals_conceded_home_last5": goals_conceded_home_last5,
+    "wins_home_last5": wins_home_last5,
+    "goals_scored_away_last5": goals_scored_away_last5,
+    "temperature": temperature_at_match if 'temperature_at_match' in locals() else None,
+    "weather_condition": weather_condition if 'weather_condition' in locals() else None,
+    "thresholds": threshold_scopes[threshold_scope],
 }
 
-# Convert the input features into a DataFrame
-input_df = pd.DataFrame([input_features])
-
-# List of expected columns for the model
-# List of expected columns for the models
-expected_columns_with_weather = [
-    'match_id',
-    'Time',
-    'Ranking Home Team',
-    'Ranking Away Team',
-    'Temperature (°C)',
-    'Month',
-    'Day',
-    'Derby',
-    'Max Capacity',
-    'Full Roof',
-    'GDP_Real_lagQ',
-    'CPI_QoQ_Growth_%_lagQ',
-    'Employment_Rate_%_lagQ',
-    'Home Team Goals Scored',
-    'Away Team Goals Scored',
-    'Goals Scored in Last 5 Games',
-    'Goals Conceded in Last 5 Games',
-    'Number of Wins in Last 5 Games',
-    'Matchday_10',
-    'Matchday_11',
-    'Matchday_12',
-    'Matchday_13',
-    'Matchday_14',
-    'Matchday_15',
-    'Matchday_16',
-    'Matchday_17',
-    'Matchday_18',
-    'Matchday_19',
-    'Matchday_2',
-    'Matchday_20',
-    'Matchday_21',
-    'Matchday_22',
-    'Matchday_23',
-    'Matchday_24',
-    'Matchday_25',
-    'Matchday_26',
-    'Matchday_27',
-    'Matchday_28',
-    'Matchday_29',
-    'Matchday_3',
-    'Matchday_30',
-    'Matchday_31',
-    'Matchday_32',
-    'Matchday_33',
-    'Matchday_34',
-    'Matchday_3rd round 1st leg',
-    'Matchday_3rd round 2nd leg',
-    'Matchday_4',
-    'Matchday_5',
-    'Matchday_6',
-    'Matchday_7',
-    'Matchday_8',
-    'Matchday_9',
-    'Matchday_Final',
-    'Matchday_Group A',
-    'Matchday_Group B',
-    'Matchday_Group D',
-    'Matchday_Group E',
-    'Matchday_Group F',
-    'Matchday_Group H',
-    'Matchday_Group Stage',
-    'Matchday_Qualifying Round 1st leg',
-    'Matchday_Qualifying Round 2nd leg',
-    'Matchday_Quarter-Finals',
-    'Matchday_Quarter-Finals 1st leg',
-    'Matchday_Quarter-Finals 2nd leg',
-    'Matchday_Round of 16',
-    'Matchday_Second Round 1st leg',
-    'Matchday_Second Round 2nd leg',
-    'Matchday_Semi-Finals 1st Leg',
-    'Matchday_Semi-Finals 2nd Leg',
-    'Matchday_Seventh Round',
-    'Matchday_Sixth Round',
-    'Matchday_final 2nd leg',
-    'Matchday_group I',
-    'Matchday_intermediate stage 1st leg',
-    'Matchday_intermediate stage 2nd leg',
-    'Matchday_last 16 1st leg',
-    'Matchday_last 16 2nd leg',
-    'Home Team_Club Brugge',
-    'Home Team_FCV Dender EH',
-    'Home Team_Genk',
-    'Home Team_KAA Gent',
-    'Home Team_KV Mechelen',
-    'Home Team_KVC Westerlo',
-    'Home Team_La Louvière',
-    'Home Team_OH Leuven',
-    'Home Team_R Charleroi SC',
-    'Home Team_RSC Anderlecht',
-    'Home Team_Royal Antwerp',
-    'Home Team_Sint-Truiden',
-    'Home Team_Standard Liège',
-    'Home Team_Union SG',
-    'Home Team_Zulte Waregem',
-    'Away Team_Club Brugge',
-    'Away Team_FCV Dender EH',
-    'Away Team_Genk',
-    'Away Team_KAA Gent',
-    'Away Team_KV Mechelen',
-    'Away Team_KVC Westerlo',
-    'Away Team_La Louvière',
-    'Away Team_OH Leuven',
-    'Away Team_R Charleroi SC',
-    'Away Team_RSC Anderlecht',
-    'Away Team_Royal Antwerp',
-    'Away Team_Sint-Truiden',
-    'Away Team_Standard Liège',
-    'Away Team_Union SG',
-    'Away Team_Unknown',
-    'Away Team_Zulte Waregem',
-    'Weekday_Monday',
-    'Weekday_Saturday',
-    'Weekday_Sunday',
-    'Weekday_Thursday',
-    'Weekday_Tuesday',
-    'Weekday_Wednesday',
-    'Opposing team Category_Bottom ranked',
-    'Opposing team Category_Medium ranked',
-    'Opposing team Category_Not ranked',
-    'Opposing team Category_Top ranked',
-    'Opposing team Category_Unknown',
-    'Home team Category_Bottom ranked',
-    'Home team Category_Medium ranked',
-    'Home team Category_Not ranked',
-    'Home team Category_Top ranked',
-    'Home team Category_Unknown',
-    'Game day_Weekday',
-    'Game day_Weekend',
-    'Time slot_Afternoon',
-    'Time slot_Evening',
-    'Time slot_Night',
-    'Weather GoodBad_Bad',
-    'Weather GoodBad_Good',
-    'Weather_Clear or mostly clear',
-    'Weather_Drizzle',
-    'Weather_Partly cloudy',
-    'Weather_Rainy',
-    'Weather_Snowy',
-]
-
-expected_columns_without_weather = [
-    'match_id',
-    'Time',
-    'Ranking Home Team',
-    'Ranking Away Team',
-    'Temperature (°C)',
-    'Month',
-    'Day',
-    'Derby',
-    'Max Capacity',
-    'Full Roof',
-    'GDP_Real_lagQ',
-    'CPI_QoQ_Growth_%_lagQ',
-    'Employment_Rate_%_lagQ',
-    'Home Team Goals Scored',
-    'Away Team Goals Scored',
-    'Goals Scored in Last 5 Games',
-    'Goals Conceded in Last 5 Games',
-    'Number of Wins in Last 5 Games',
-    'Matchday_10',
-    'Matchday_11',
-    'Matchday_12',
-    'Matchday_13',
-    'Matchday_14',
-    'Matchday_15',
-    'Matchday_16',
-    'Matchday_17',
-    'Matchday_18',
-    'Matchday_19',
-    'Matchday_2',
-    'Matchday_20',
-    'Matchday_21',
-    'Matchday_22',
-    'Matchday_23',
-    'Matchday_24',
-    'Matchday_25',
-    'Matchday_26',
-    'Matchday_27',
-    'Matchday_28',
-    'Matchday_29',
-    'Matchday_3',
-    'Matchday_30',
-    'Matchday_31',
-    'Matchday_32',
-    'Matchday_33',
-    'Matchday_34',
-    'Matchday_3rd round 1st leg',
-    'Matchday_3rd round 2nd leg',
-    'Matchday_4',
-    'Matchday_5',
-    'Matchday_6',
-    'Matchday_7',
-    'Matchday_8',
-    'Matchday_9',
-    'Matchday_Final',
-    'Matchday_Group A',
-    'Matchday_Group B',
-    'Matchday_Group D',
-    'Matchday_Group E',
-    'Matchday_Group F',
-    'Matchday_Group H',
-    'Matchday_Group Stage',
-    'Matchday_Qualifying Round 1st leg',
-    'Matchday_Qualifying Round 2nd leg',
-    'Matchday_Quarter-Finals',
-    'Matchday_Quarter-Finals 1st leg',
-    'Matchday_Quarter-Finals 2nd leg',
-    'Matchday_Round of 16',
-    'Matchday_Second Round 1st leg',
-    'Matchday_Second Round 2nd leg',
-    'Matchday_Semi-Finals 1st Leg',
-    'Matchday_Semi-Finals 2nd Leg',
-    'Matchday_Seventh Round',
-    'Matchday_Sixth Round',
-    'Matchday_final 2nd leg',
-    'Matchday_group I',
-    'Matchday_intermediate stage 1st leg',
-    'Matchday_intermediate stage 2nd leg',
-    'Matchday_last 16 1st leg',
-    'Matchday_last 16 2nd leg',
-    'Home Team_Club Brugge',
-    'Home Team_FCV Dender EH',
-    'Home Team_Genk',
-    'Home Team_KAA Gent',
-    'Home Team_KV Mechelen',
-    'Home Team_KVC Westerlo',
-    'Home Team_La Louvière',
-    'Home Team_OH Leuven',
-    'Home Team_R Charleroi SC',
-    'Home Team_RSC Anderlecht',
-    'Home Team_Royal Antwerp',
-    'Home Team_Sint-Truiden',
-    'Home Team_Standard Liège',
-    'Home Team_Union SG',
-    'Home Team_Zulte Waregem',
-    'Away Team_Club Brugge',
-    'Away Team_FCV Dender EH',
-    'Away Team_Genk',
-    'Away Team_KAA Gent',
-    'Away Team_KV Mechelen',
-    'Away Team_KVC Westerlo',
-    'Away Team_La Louvière',
-    'Away Team_OH Leuven',
-    'Away Team_R Charleroi SC',
-    'Away Team_RSC Anderlecht',
-    'Away Team_Royal Antwerp',
-    'Away Team_Sint-Truiden',
-    'Away Team_Standard Liège',
-    'Away Team_Union SG',
-    'Away Team_Unknown',
-    'Away Team_Zulte Waregem',
-    'Weekday_Monday',
-    'Weekday_Saturday',
-    'Weekday_Sunday',
-    'Weekday_Thursday',
-    'Weekday_Tuesday',
-    'Weekday_Wednesday',
-    'Opposing team Category_Bottom ranked',
-    'Opposing team Category_Medium ranked',
-    'Opposing team Category_Not ranked',
-    'Opposing team Category_Top ranked',
-    'Opposing team Category_Unknown',
-    'Home team Category_Bottom ranked',
-    'Home team Category_Medium ranked',
-    'Home team Category_Not ranked',
-    'Home team Category_Top ranked',
-    'Home team Category_Unknown',
-    'Game day_Weekday',
-    'Game day_Weekend',
-    'Time slot_Afternoon',
-    'Time slot_Evening',
-    'Time slot_Night',
-]
-
-# Perform one-hot encoding for categorical columns (we'll only keep what we need afterwards)
-categorical_columns = [
-    "Matchday",
-    "Home Team",
-    "Away Team",
-    "Weather",
-    "Weekday",
-    "Home team Category",
-    "Opposing team Category",
-    "Game day",
-    "Time slot",
-    "Weather GoodBad",
-]
-
-
-encoded_df = pd.get_dummies(pd.DataFrame([input_features]), columns=categorical_columns, drop_first=False)
-
-# Make sure all expected columns exist (for both models); if missing, fill with 0
-all_expected = list(set(expected_columns_with_weather + expected_columns_without_weather))
-for col in all_expected:
-    if col not in encoded_df.columns:
-        encoded_df[col] = 0
-
-# Build the two final DataFrames with the correct column order and dtype
-input_df_with_weather = encoded_df[expected_columns_with_weather].astype(float)
-input_df_without_weather = encoded_df[expected_columns_without_weather].astype(float)
-
-
 
 ################### Predicting Attendance ##############################
 
 # Predict attendance when the user clicks the button
 if st.button("🎯 Predict Attendance"):
 
-    # 1) Decide if we can reliably use the weather model
-    use_weather_model = (
-        'temperature_at_match' in locals()
-        and temperature_at_match is not None
-        and 'weather_condition' in locals()
-        and weather_condition is not None
-        and weather_condition != "Unknown"
-    )
-
-    if use_weather_model:
-        prediction = model_with_weather.predict(input_df_with_weather)[0] * 100
-        weather_status = "Weather data used for prediction."
-    else:
-        prediction = model_without_weather.predict(input_df_without_weather)[0] * 100
-        weather_status = (
-            "Weather data unavailable or unreliable. "
-            "Prediction made without weather information."
-        )
-
-    # 2) Get stadium info for the home team
-    home_team_name = home_team
-    team_info = team_data.get(home_team_name, None)
-
-    if not team_info:
-        st.error("No stadium information found for this home team.")
-        st.info(weather_status)
+    # 1) Score the match: the with-weather model when the forecast is usable, otherwise the
+    #    without-weather model (an exact cube lookup when the inputs are the prefilled ones)
+    try:
+        result = predictor.predict(match)
+    except ValueError as error:
+        # e.g. no stadium information for the home team
+        st.error(str(error))
     else:
-        max_capacity = team_info["max_capacity"]
-        attendance_30th = team_info["attendance_30th_percentile"]
-        attendance_70th = team_info["attendance_70th_percentile"]
-
-        # 3) Convert predicted percentage into absolute attendance
-        predicted_attendance = min(
-            ((prediction / 100) * max_capacity).round(),
-            max_capacity
-        )
-
-        if predicted_attendance < attendance_30th:
-            attendance_status = "Low attendance 🚶‍♂️"
-        elif predicted_attendance > attendance_70th:
-            attendance_status = "High attendance 🏟️"
+        if result.model == "with_weather":
+            weather_status = "Weather data used for prediction."
         else:
-            attendance_status = "Normal attendance ⚖️"
+            weather_status = (
+                "Weather data unavailable or unreliable. "
+                "Prediction made without weather information."
+            )
+
+        # 2) Attendance level (from the home team's thresholds) and the P10-P90 range
+        attendance_status = {
+            "Low": "Low attendance 🚶‍♂️",
+            "Normal": "Normal attendance ⚖️",
+            "High": "High attendance 🏟️",
+        }[result.attendance_status]
 
         st.success(f"Attendance Status: {attendance_status}")
-
-        # 4) Build horizontal bar chart
-        fig, ax = plt.subplots(figsize=(10, 2.5))
-        ax.barh(
-            y=[0],
-            width=[predicted_attendance / max_capacity],
-            height=0.5,
-            edgecolor="black",
-            alpha=0.8,
-        )
-
-        # Threshold lines
-        ax.axvline(x=attendance_30th / max_capacity, linestyle="--",
-                   label="30th Percentile", linewidth=1.2)
-        ax.axvline(x=attendance_70th / max_capacity, linestyle="--",
-                   label="70th Percentile", linewidth=1.2)
-
-        # Styling
-        fig.patch.set_facecolor("#f8f9fa")
-        ax.set_facecolor("#ffffff")
-        ax.spines["top"].set_visible(False)
-        ax.spines["right"].set_visible(False)
-
-        ax.set_xlim(0, 1)
-        ax.set_xticks([0, 0.25, 0.5, 0.75, 1])
-        ax.set_xticklabels(["0%", "25%", "50%", "75%", "100%"], fontsize=12)
-        ax.set_yticks([])
-
-        ax.legend(
-            loc="lower center",
-            bbox_to_anchor=(0.5, -0.4),
-            ncol=2,
-            fontsize=12,
-            frameon=False,
-        )
-
-        ax.set_title(
-            f"Predicted Attendance: {predicted_attendance:.0f} of {max_capacity} ({prediction:.2f}%)",
-            fontsize=14,
-            pad=15,
-            color="#333333",
+        st.caption(
+            f"Likely range: {result.attendance_p10:,.0f} to {result.attendance_p90:,.0f} spectators "
+            f"(8 matches out of 10 fall in this range)."
         )
 
-        # 5) Render chart in Streamlit
-        buf = io.BytesIO()
-        fig.savefig(buf, format="png", bbox_inches="tight", dpi=100)
-        buf.seek(0)
-        encoded_image = base64.b64encode(buf.read()).decode("utf-8")
-
-        st.markdown(
-            f"""
-            <div style="background-color: #f9f9fa; padding: 20px; border-radius: 10px;
-                        border: 1px solid #ddd; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
-                <h3 style="text-align: center; color: #003366;">Attendance Prediction Details</h3>
-                <img src="data:image/png;base64,{encoded_image}" style="display: block; margin: auto;"/>
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
-
-        # 6) Show whether weather was used or not
+        # 3) Chart: drawn by the browser (native), or an image from one reused, pre-styled figure,
+        #    memoised per home team and rounded prediction (football.charts)
+        if CHART_OUTPUT == "native":
+            st.markdown('<h3 style="text-align: center; color: #003366;">Attendance Prediction Details</h3>',
+                        unsafe_allow_html=True)
+            st.vega_lite_chart(attendance_chart_spec(result), width="stretch")
+        else:
+            image = attendance_chart(result, CHART_OUTPUT)
+            mime = "image/svg+xml" if CHART_OUTPUT == "svg" else "image/png"
+            encoded_image = base64.b64encode(image).decode("utf-8")
+
+            # 4) Render chart in Streamlit
+            st.markdown(
+                f"""
+                <div style="background-color: #f9f9fa; padding: 20px; border-radius: 10px;
+                            border: 1px solid #ddd; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
+                    <h3 style="text-align: center; color: #003366;">Attendance Prediction Details</h3>
+                    <img src="data:{mime};base64,{encoded_image}" style="display: block; margin: auto; max-width: 100%;"/>
+                </div>
+                """,
+                unsafe_allow_html=True,
+            )
+
+        # 5) Show whether weather was used or not
         st.info(weather_status)
 
+        # 6) Why this number: exact per-feature contributions of the model (TreeSHAP, football.explain),
+        #    next to what the feature usually adds for this home team (stored in football.db)
+        with st.expander("🔍 Why this number?"):
+            why = predictor.explain(match, top=8)
+            st.caption(
+                f"The model starts from the average of the training matches ({why.base_value:.1f}% of the stadium); "
+                f"each feature below moves the prediction up or down, and together they add up to "
+                f"{why.prediction:.1f}%."
+            )
+            st.dataframe(
+                [
+                    {
+                        "Feature": line.feature,
+                        "This match": (
+                            "" if line.value is None
+                            else f"{line.value:g}" if isinstance(line.value, float) else str(line.value)),
+                        "Effect (points)": round(line.contribution, 1),
+                        f"Usual at {home_team} (points)": (
+                            None if line.team_average is None else round(line.team_average, 1)),
+                    }
+                    for line in why.contributions
+                ],
+                hide_index=True,
+                width="stretch",
+            )
+
 
 
 
@@ -0,0 +1,5 @@
+"""Shared code for the Jupiler Pro League attendance project.
+
+The notebooks in src/ and the Streamlit app in App/ both import from here, so
+the data pipeline and the app always agree on paths, tables and features.
+"""
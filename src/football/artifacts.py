@@ -0,0 +1,143 @@
+"""Model files: XGBoost's native UBJ format with an embedded manifest.
+
+The models used to be pickled XGBRegressor objects (.sav). Unpickling runs
+arbitrary code, breaks across XGBoost versions and says nothing about which
+features or training data a file belongs to. A model artifact is instead the
+booster saved with XGBRegressor.save_model (".ubj", binary JSON, or ".json")
+plus a manifest stored as a booster attribute, so it travels inside the same
+file:
+
+    {
+      "format": "football-attendance-model",
+      "format_version": 1,
+      "name": "with_weather",
+      "feature_names": [...],        # ordered, as the model expects them
+      "n_features": 138,
+      "dtype": "float32",            # the rows FeatureEncoder builds
+      "data_version": "63c9...",     # training_view.data_version of the training set
+      "metrics": {"rmse": ..., "r2": ...},
+      "xgboost_version": "3.2.0",
+      "created_at": "2026-10-17 12:00:00"
+    }
+
+load_artifact() checks the manifest against the booster before returning the
+model, so the app can build its FeatureEncoder straight from the model
+(model_columns) instead of from hand-copied feature lists.
+
+Convert an old pickled model (from the src/ folder):
+
+    python -m football.artifacts "../Models/finalized_model_with_weather (3).sav" \\
+        -o ../Models/finalized_model_with_weather.ubj --name with_weather
+"""
+
+import argparse
+import json
+import pickle
+import time
+
+import numpy as np
+import xgboost
+from xgboost import XGBRegressor
+
+
+FORMAT = "football-attendance-model"
+FORMAT_VERSION = 1
+DTYPE = "float32"
+
+
+class ArtifactError(ValueError):
+    """A model file without a manifest, or whose manifest does not match the booster."""
+
+
+def build_manifest(model, name, data_version=None, metrics=None, **extra):
+    """Return the manifest of a fitted model (its feature names come from the booster)."""
+    booster = model.get_booster()
+    if booster.feature_names is None:
+        raise ArtifactError("The model was not fitted on named features; fit it on a DataFrame")
+    return {
+        "format": FORMAT,
+        "format_version": FORMAT_VERSION,
+        "name": name,
+        "feature_names": list(booster.feature_names),
+        "n_features": booster.num_features(),
+        "dtype": DTYPE,
+        "data_version": data_version,
+        "metrics": {key: float(value) for key, value in (metrics or {}).items()},
+        "xgboost_version": xgboost.__version__,
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        **extra,
+    }
+
+
+def save_artifact(model, path, name, data_version=None, metrics=None, **extra):
+    """Save a fitted XGBRegressor with its manifest (.ubj or .json); return the manifest."""
+    manifest = build_manifest(model, name, data_version, metrics, **extra)
+    model.get_booster().set_attr(manifest=json.dumps(manifest, ensure_ascii=False))
+    model.save_model(path)
+    return manifest
+
+
+def manifest(model):
+    """Return the manifest embedded in a loaded model, or None."""
+    text = model.get_booster().attr("manifest")
+    return json.loads(text) if text else None
+
+
+def verify(model, expected_data_version=None):
+    """Raise ArtifactError unless the manifest describes this booster."""
+    info = manifest(model)
+    if info is None or info.get("format") != FORMAT:
+        raise ArtifactError("No model manifest in the file")
+    if info["format_version"] > FORMAT_VERSION:
+        raise ArtifactError(f"Manifest version {info['format_version']} is newer than this code ({FORMAT_VERSION})")
+    if info["dtype"] != DTYPE:
+        raise ArtifactError(f"Unsupported input dtype {info['dtype']}")
+
+    booster = model.get_booster()
+    if booster.num_features() != info["n_features"] or len(info["feature_names"]) != info["n_features"]:
+        raise ArtifactError(f"Manifest lists {info['n_features']} features, the booster has {booster.num_features()}")
+    if list(booster.feature_names or []) != info["feature_names"]:
+        raise ArtifactError("Manifest feature names do not match the booster")
+    if expected_data_version is not None and info["data_version"] != expected_data_version:
+        raise ArtifactError(f"Model trained on data {info['data_version']}, expected {expected_data_version}")
+    return info
+
+
+def load_artifact(path, expected_data_version=None):
+    """Load and verify a model artifact; return the XGBRegressor."""
+    model = XGBRegressor()
+    model.load_model(path)
+    verify(model, expected_data_version)
+    return model
+
+
+def convert_pickle(sav_path, path, name, **extra):
+    """Turn a pickled XGBRegressor (.sav) into an artifact. Only for trusted files."""
+    with open(sav_path, "rb") as file:
+        model = pickle.load(file)
+    names = getattr(model, "feature_names_in_", None)
+    if names is not None:
+        model.get_booster().feature_names = [str(n) for n in names]
+    return save_artifact(model, path, name, source=str(sav_path), **extra)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a pickled model (.sav) into a model artifact (.ubj).")
+    parser.add_argument("sav", help="pickled XGBRegressor")
+    parser.add_argument("-o", "--output", required=True, help="artifact to write (.ubj or .json)")
+    parser.add_argument("--name", required=True, help="model name stored in the manifest, e.g. with_weather")
+    args = parser.parse_args(argv)
+
+    info = convert_pickle(args.sav, args.output, args.name)
+
+    # The artifact must predict exactly like the pickled model
+    with open(args.sav, "rb") as file:
+        original = pickle.load(file)
+    converted = load_artifact(args.output)
+    X = np.random.default_rng(0).uniform(0, 30, (256, info["n_features"])).astype(np.float32)
+    assert np.array_equal(original.predict(X), converted.predict(X))
+    print(f"✅ {args.output}: {info['n_features']} features, same predictions as {args.sav}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Walk-forward backtest: train on the past seasons, score the next one.
+
+The ML notebook evaluates the models on one random 75/25 split (and tunes
+them with 3 random folds). Matches of the same matchday, and even of the
+same weekend, end up on both sides, and the score does not say what matters
+for the app: how a model trained on everything up to season N does on
+season N+1. Here every season after the first `min_train_seasons` is one
+fold: the model is trained on all matches played before that season started
+and scores every match of that season.
+
+The encoded matrix is the stored training view (training_view.py), the same
+one the models are trained on: it is read once, and every worker process of
+the pool gets it once (pool initializer) and only slices rows out of it for
+its folds. The folds of both models run in parallel, one single-threaded
+XGBoost fit per fold, like the tuning workers.
+
+A match's season is the one of its date (a season runs from July to June),
+so the matches football.db stores with season "Unknown" (January to March
+2025) count in 2024/2025. Errors are in percentage points of the stadium.
+
+From the notebook, after tuning (cwd src/):
+
+    from football import backtest
+    result = backtest.run({"with_weather": best_weather.best_params,
+                           "without_weather": stage1["without_weather"].best_params})
+    result.seasons, result.teams
+
+From the command line (with the hyperparameters recorded in the model files):
+
+    cd src
+    python -m football.backtest
+    python -m football.backtest --min-train-seasons 2 --workers 4
+"""
+
+import argparse
+import sqlite3
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+from xgboost import XGBRegressor
+
+from football import training_view
+from football.artifacts import manifest
+from football.paths import DB_PATH, MODEL_WITH_WEATHER_PATH, MODEL_WITHOUT_WEATHER_PATH, TRAINING_VIEW_DIR
+from football.resources import load_model
+
+
+MODEL_PATHS = {
+    "with_weather": MODEL_WITH_WEATHER_PATH,
+    "without_weather": MODEL_WITHOUT_WEATHER_PATH,
+}
+
+MATCH_INFO_QUERY = """
+SELECT m.match_id, m.match_date, t.team_name
+FROM Match AS m
+JOIN MatchParticipation AS mp ON mp.match_id = m.match_id AND mp.is_home = 1
+JOIN Team AS t ON t.team_id = mp.team_id
+"""
+
+Fold = namedtuple("Fold", ["season", "train", "test"])   # row indices of the training view
+
+BacktestResult = namedtuple("BacktestResult", [
+    "predictions",      # one row per (model, scored match): match_id, date, season, home team, actual, predicted, error
+    "seasons",          # per (model, season): training and scored matches, MAE, RMSE, R², bias
+    "teams",            # per (model, home team): scored matches, MAE, RMSE, bias
+])
+
+
+def season_of(dates):
+    """Season label of match dates ("2023/2024"): a season runs from July to June."""
+    dates = pd.DatetimeIndex(pd.to_datetime(dates))
+    start = dates.year - (dates.month < 7)
+    return pd.Index([f"{year}/{year + 1}" for year in start])
+
+
+def model_params(model):
+    """The hyperparameters a model was trained with, as recorded in its manifest (n_estimators included).
+
+    A model file from before they were recorded only tells its number of
+    trees: XGBoost's defaults are used for the rest, with a warning.
+    """
+    info = manifest(model) or {}
+    if "params" in info:
+        return dict(info["params"])
+    n_trees = model.get_booster().num_boosted_rounds()
+    print(f"⚠️ {info.get('name', 'model')}: no hyperparameters in the manifest, "
+          f"backtesting XGBoost's defaults with its {n_trees} trees")
+    return {"n_estimators": n_trees}
+
+
+def match_info(match_ids, db_path=DB_PATH):
+    """DataFrame match_id, date, season, home team of the given football.db matches, in their order."""
+    with closing(sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)) as conn:
+        info = pd.read_sql_query(MATCH_INFO_QUERY, conn).set_index("match_id")
+    info = info.reindex(np.asarray(match_ids))
+    if info["team_name"].isna().any():
+        raise ValueError("The training view has matches football.db does not know; refresh the view")
+    dates = pd.to_datetime(info["match_date"])
+    return pd.DataFrame({
+        "match_id": info.index.to_numpy(),
+        "date": dates.to_numpy(),
+        "season": season_of(dates),
+        "home_team": info["team_name"].to_numpy(),
+    })
+
+
+def walk_forward_folds(info, min_train_seasons=1):
+    """One Fold per season after the first `min_train_seasons`: every earlier match trains, the season is scored."""
+    dates = info["date"].to_numpy()
+    seasons = info["season"].to_numpy()
+    folds = []
+    for season in sorted(set(seasons))[min_train_seasons:]:
+        test = np.flatnonzero(seasons == season)
+        train = np.flatnonzero(dates < dates[test].min())
+        if len(train):
+            folds.append(Fold(season, train, test))
+    return folds
+
+
+############################## WORKERS ##############################
+
+_datasets = {}
+
+
+def _init_worker(datasets):
+    _datasets.update(datasets)
+
+
+def _fit_fold(name, params, train, test, seed):
+    """Predictions of one fold's model on its scored rows (runs in a worker)."""
+    X, y = _datasets[name]
+    model = XGBRegressor(objective="reg:squarederror", tree_method="hist", random_state=seed, n_jobs=1, **params)
+    model.fit(X[train], y[train])
+    return model.predict(X[test]).astype(np.float64)
+
+
+############################## TABLES ##############################
+
+def _errors(frame):
+    error = frame["error"]
+    actual = frame["actual"]
+    residual = ((actual - frame["predicted"]) ** 2).sum()
+    total = ((actual - actual.mean()) ** 2).sum()
+    return pd.Series({
+        "matches": len(frame),
+        "MAE": error.abs().mean(),
+        "RMSE": np.sqrt((error ** 2).mean()),
+        "R2": 1 - residual / total if total > 0 else np.nan,
+        "bias": error.mean(),
+    })
+
+
+def error_table(predictions, by):
+    """MAE, RMSE, R² and bias (mean of predicted - actual, points) of the predictions, per `by` columns."""
+    return (predictions.groupby(by, sort=True)[["actual", "predicted", "error"]]
+            .apply(_errors)
+            .astype({"matches": int})
+            .reset_index())
+
+
+############################## RUN ##############################
+
+def run(params=None, view=None, db_path=DB_PATH, min_train_seasons=1, workers=None, seed=42, verbose=True):
+    """Backtest the with- and without-weather models season by season; return a BacktestResult.
+
+    `params` maps a model name to its XGBRegressor params (default: those of
+    the model files, model_params()). `view` is a TrainingView (default:
+    training_view.refresh()).
+    """
+    start = time.perf_counter()
+    if params is None:
+        params = {name: model_params(load_model(path)) for name, path in MODEL_PATHS.items()}
+    view = view if view is not None else training_view.refresh(db_path)
+
+    X_with = np.ascontiguousarray(view.X, dtype=np.float32)
+    X_without, _ = training_view.without_weather(view)
+    y = np.asarray(view.y, dtype=np.float64)
+    matrices = {"with_weather": X_with, "without_weather": np.ascontiguousarray(X_without, dtype=np.float32)}
+    datasets = {name: (matrices[name], y) for name in params}
+
+    info = match_info(view.match_ids, db_path)
+    folds = walk_forward_folds(info, min_train_seasons)
+    if not folds:
+        raise ValueError(f"Not enough seasons for a walk-forward backtest ({info['season'].nunique()} in the data)")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(datasets,)) as pool:
+        futures = [
+            (name, fold, pool.submit(_fit_fold, name, settings, fold.train, fold.test, seed))
+            for name, settings in params.items()
+            for fold in folds
+        ]
+        frames = []
+        for name, fold, future in futures:
+            predicted = future.result()
+            frame = info.iloc[fold.test].assign(model=name, train_matches=len(fold.train),
+                                                actual=y[fold.test] * 100, predicted=predicted * 100)
+            frames.append(frame)
+
+    predictions = pd.concat(frames, ignore_index=True)
+    predictions["error"] = predictions["predicted"] - predictions["actual"]
+    seasons = error_table(predictions, ["model", "season"])
+    train_matches = predictions.groupby(["model", "season"], sort=True)["train_matches"].first().to_numpy()
+    seasons.insert(2, "train_matches", train_matches)
+    # R² within one club mostly measures how little its attendance varies: left out
+    teams = error_table(predictions, ["model", "home_team"]).drop(columns="R2")
+    predictions = predictions.drop(columns="train_matches")
+
+    if verbose:
+        print(f"✅ {len(folds)} season folds x {len(params)} models in {time.perf_counter() - start:.1f} s")
+    return BacktestResult(predictions, seasons, teams)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the attendance models, season by season.")
+    parser.add_argument("--db", default=DB_PATH, help="database file (default: Data/football.db)")
+    parser.add_argument("--view", default=TRAINING_VIEW_DIR, help="training view directory (default: Data/training_view)")
+    parser.add_argument("--min-train-seasons", type=int, default=1,
+                        help="seasons only trained on, before the first scored one (default: 1)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--teams", type=int, default=20, help="rows of the per-team table to print (default: 20)")
+    parser.add_argument("-o", "--output", help="also write every scored match to this CSV")
+    args = parser.parse_args(argv)
+
+    view = training_view.refresh(args.db, args.view)
+    result = run(view=view, db_path=args.db, min_train_seasons=args.min_train_seasons, workers=args.workers)
+    pd.set_option("display.width", 160)
+    print("\nPer season (points of the stadium):")
+    print(result.seasons.round(3).to_string(index=False))
+    print("\nPer home team, worst MAE first:")
+    worst = result.teams.sort_values("MAE", ascending=False, kind="stable")
+    print(worst.head(args.teams).round(3).to_string(index=False))
+    if args.output:
+        result.predictions.to_csv(args.output, index=False)
+        print(f"\n✅ {len(result.predictions)} predictions written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Score a whole fixture list (one matchday or a full season) in one go.
+
+Usage (from the src/ folder):
+
+    python -m football.batch fixtures.csv -o predictions.csv
+
+The fixture file (CSV or Parquet) needs one row per match with the columns
+home_team, away_team, match_date (YYYY-MM-DD), match_time (HH:MM) and matchday.
+These columns are optional:
+
+- ranking_home_team, ranking_away_team (the app's defaults are used when
+  missing)
+- goals_scored_home_last5, goals_conceded_home_last5, wins_home_last5,
+  goals_scored_away_last5 (missing values are filled with the teams' current
+  form from football.db, see form.py, then the app's defaults)
+- temperature and weather_condition (e.g. "Rainy")
+
+Other columns are kept in the output but not used. The rows are scored by
+core.AttendancePredictor.predict_many, so a fixture gets the same numbers as
+from the app or the HTTP service: rows with usable weather go through the
+with-weather model, all other rows through the without-weather model, and
+each model (with its P10/P90 companion, see quantiles.py) is called once, on
+a single encoded matrix.
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from football.core import OPTIONAL_FIELDS, REQUIRED_FIELDS, AttendancePredictor
+
+
+# Prediction fields added to the fixture table
+OUTPUT_COLUMNS = [
+    "model",
+    "predicted_percentage",
+    "predicted_attendance",
+    "attendance_p10",
+    "attendance_p90",
+    "max_capacity",
+    "attendance_status",
+]
+
+
+def read_fixtures(path):
+    path = Path(path)
+    if path.suffix.lower() in (".parquet", ".pq"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def write_predictions(predictions, path):
+    path = Path(path)
+    if path.suffix.lower() in (".parquet", ".pq"):
+        predictions.to_parquet(path, index=False)
+    else:
+        predictions.to_csv(path, index=False)
+
+
+def score_fixtures(fixtures, predictor=None):
+    """Return the fixture table with the predicted attendance of every match.
+
+    Added columns: model, predicted_percentage, predicted_attendance,
+    attendance_p10 / attendance_p90 (the likely range), max_capacity and
+    attendance_status (Low / Normal / High, from the home team's 30th / 70th
+    attendance percentiles). `predictor` defaults to
+    AttendancePredictor.current().
+    """
+    missing = [c for c in REQUIRED_FIELDS if c not in fixtures.columns]
+    if missing:
+        raise ValueError(f"Fixture list is missing the column(s): {', '.join(missing)}")
+
+    predictor = predictor or AttendancePredictor.current()
+    fields = [c for c in REQUIRED_FIELDS + OPTIONAL_FIELDS if c in fixtures.columns]
+    scored = pd.DataFrame(predictor.predict_many(fixtures[fields].to_dict("records")), index=fixtures.index)
+
+    predictions = fixtures.copy()
+    predictions[OUTPUT_COLUMNS] = scored[OUTPUT_COLUMNS]
+    return predictions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Predict stadium attendance for a fixture list.")
+    parser.add_argument("fixtures", help="CSV or Parquet file with one row per match")
+    parser.add_argument("-o", "--output", default="predictions.csv", help="where to write the predictions (CSV or Parquet)")
+    args = parser.parse_args(argv)
+
+    fixtures = read_fixtures(args.fixtures)
+    predictor = AttendancePredictor.current()
+
+    start = time.perf_counter()
+    predictions = score_fixtures(fixtures, predictor)
+    elapsed = time.perf_counter() - start
+    write_predictions(predictions, args.output)
+
+    print(f"✅ Scored {len(predictions)} matches in {elapsed * 1000:.1f} ms → {args.output}")
+    print(predictions["attendance_status"].value_counts().to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""The attendance chart of the app: one reused figure, memoised images, SVG or native output.
+
+The app used to build a new pyplot figure for every prediction, render it to
+a PNG and never close it, so a long-running server kept every figure alive.
+Here a single pre-styled matplotlib Figure (not registered with pyplot, so
+nothing keeps it besides this module) is built once per process. A chart is
+drawn by moving its artists (bar width, P10-P90 range, threshold lines,
+title) and saving it, under a lock because Streamlit serves sessions from
+several threads.
+
+Images are memoised by (home team, prediction rounded to ROUND_TO percentage
+points, range, thresholds): every number drawn comes from the rounded values,
+so the same key always gives the same image, and a click that was already
+drawn costs a dictionary lookup.
+
+    attendance_chart(result)                 # core.Prediction -> SVG bytes (text kept as text)
+    attendance_chart(result, "png")
+    attendance_chart_spec(result)            # Vega-Lite dict for st.vega_lite_chart, drawn by the browser
+"""
+
+import functools
+import io
+import threading
+
+import matplotlib
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from football.predict import attendance_from_share
+
+
+ROUND_TO = 0.1          # percentage points; the bar moves by less than a pixel
+FORMATS = ("svg", "png")
+
+
+class ChartTemplate:
+    """The styled figure with its artists; draw() updates them and renders one image."""
+
+    def __init__(self):
+        # Same artists, order (hence colours) and styling as the app's original chart
+        self.figure = Figure(figsize=(10, 2.5))
+        ax = self.figure.add_subplot()
+        self.bar = ax.barh(y=[0], width=[0.5], height=0.5, edgecolor="black", alpha=0.8)[0]
+
+        # P10-P90 interval around the prediction
+        self.range = ax.errorbar(
+            x=[0.5], y=[0], xerr=[[0.1], [0.1]], fmt="none",
+            ecolor="#333333", elinewidth=2, capsize=10, label="P10-P90 range",
+        )
+
+        # Threshold lines
+        self.low = ax.axvline(x=0.3, linestyle="--", label="30th Percentile", linewidth=1.2)
+        self.high = ax.axvline(x=0.7, linestyle="--", label="70th Percentile", linewidth=1.2)
+
+        # Styling
+        self.figure.patch.set_facecolor("#f8f9fa")
+        ax.set_facecolor("#ffffff")
+        ax.spines["top"].set_visible(False)
+        ax.spines["right"].set_visible(False)
+
+        ax.set_xlim(0, 1)
+        ax.set_xticks([0, 0.25, 0.5, 0.75, 1])
+        ax.set_xticklabels(["0%", "25%", "50%", "75%", "100%"], fontsize=12)
+        ax.set_yticks([])
+        ax.legend(loc="lower center", bbox_to_anchor=(0.5, -0.4), ncol=3, fontsize=12, frameon=False)
+        self.title = ax.set_title("", fontsize=14, pad=15, color="#333333")
+
+        # bbox_inches="tight" lays the figure out twice per image; the layout never changes, so
+        # measure the tight box once, with the longest title
+        self.title.set_text("Predicted Attendance: 00000 of 00000 (100.0%)")
+        self.bbox = self.figure.get_tightbbox(FigureCanvasAgg(self.figure).get_renderer()).padded(0.1)
+        self.lock = threading.Lock()
+
+    def draw(self, share, lower, upper, low, high, title, fmt="svg"):
+        """Render the chart for these shares of capacity (0-1); return the image bytes."""
+        if fmt not in FORMATS:
+            raise ValueError(f"Chart format must be one of {', '.join(FORMATS)}, not {fmt!r}")
+        with self.lock:
+            self.bar.set_width(share)
+            _, (cap_low, cap_high), (range_line,) = self.range.lines
+            range_line.set_segments([[(lower, 0), (upper, 0)]])
+            cap_low.set_xdata([lower])
+            cap_high.set_xdata([upper])
+            self.low.set_xdata([low, low])
+            self.high.set_xdata([high, high])
+            self.title.set_text(title)
+
+            buffer = io.BytesIO()
+            # svg.fonttype "none": text stays <text>, not one path per glyph (a fraction of the size)
+            metadata = {"Date": None} if fmt == "svg" else None
+            with matplotlib.rc_context({"svg.fonttype": "none", "svg.hashsalt": "attendance"}):
+                self.figure.savefig(buffer, format=fmt, bbox_inches=self.bbox, dpi=100, metadata=metadata)
+            return buffer.getvalue()
+
+
+_template = None
+_template_lock = threading.Lock()
+
+
+def template():
+    """The process-wide ChartTemplate, built on first use."""
+    global _template
+    with _template_lock:
+        if _template is None:
+            _template = ChartTemplate()
+        return _template
+
+
+def chart_key(result):
+    """Memo key of a core.Prediction: the home team and every drawn number, rounded."""
+    capacity = result.max_capacity
+
+    def percent(attendance):
+        return round(round(attendance / capacity * 100 / ROUND_TO) * ROUND_TO, 6)
+
+    return (
+        result.home_team,
+        capacity,
+        round(round(result.predicted_percentage / ROUND_TO) * ROUND_TO, 6),
+        percent(result.attendance_p10),
+        percent(result.attendance_p90),
+        percent(result.attendance_30th),
+        percent(result.attendance_70th),
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def _chart(key, fmt):
+    _, capacity, percentage, lower, upper, low, high = key
+    attendance = attendance_from_share(percentage / 100, capacity)
+    title = f"Predicted Attendance: {attendance:.0f} of {capacity} ({percentage:.1f}%)"
+    return template().draw(percentage / 100, lower / 100, upper / 100, low / 100, high / 100, title, fmt)
+
+
+def attendance_chart(result, fmt="svg"):
+    """The chart of a core.Prediction as SVG (default) or PNG bytes, memoised (see chart_key)."""
+    return _chart(chart_key(result), fmt)
+
+
+def attendance_chart_spec(result):
+    """The same chart as a Vega-Lite spec (for st.vega_lite_chart): no server-side rendering at all."""
+    _, capacity, percentage, lower, upper, low, high = chart_key(result)
+    attendance = attendance_from_share(percentage / 100, capacity)
+    percent_axis = {"scale": {"domain": [0, 100]}, "axis": {"values": [0, 25, 50, 75, 100], "labelExpr": "datum.value + '%'"}}
+    return {
+        "title": f"Predicted Attendance: {attendance:.0f} of {capacity} ({percentage:.1f}%)",
+        "height": 90,
+        "data": {"values": [{"prediction": percentage, "lower": lower, "upper": upper, "low": low, "high": high}]},
+        "layer": [
+            {"mark": {"type": "bar", "height": 40, "opacity": 0.8, "stroke": "black"},
+             "encoding": {"x": {"field": "prediction", "type": "quantitative", "title": None, **percent_axis}}},
+            {"mark": {"type": "rule", "color": "#333333", "strokeWidth": 2},
+             "encoding": {"x": {"field": "lower", "type": "quantitative"}, "x2": {"field": "upper"}}},
+            {"mark": {"type": "rule", "strokeDash": [4, 4], "color": "#ff7f0e"},
+             "encoding": {"x": {"field": "low", "type": "quantitative"}}},
+            {"mark": {"type": "rule", "strokeDash": [4, 4], "color": "#2ca02c"},
+             "encoding": {"x": {"field": "high", "type": "quantitative"}}},
+        ],
+    }
+
+
+def clear_cache():
+    """Forget the memoised images."""
+    _chart.cache_clear()
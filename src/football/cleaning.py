@@ -0,0 +1,524 @@
+"""Cleaning of the scraped matches (RawDataB_weather.csv -> CleanedData.csv).
+
+Every step of 2.DataCleaning.ipynb is a function here, in the order the
+notebook runs them. The notebook calls them one by one (and keeps its
+intermediate CSVs). clean() chains them for a full rebuild.
+
+update() adds newly scraped matches without redoing the whole history:
+
+- only the new raw rows are parsed, filtered and enriched;
+- duplicates are checked against the matches already in football.db (by
+  match_keys(), a hash of competition, season, month and team pair);
+- the macro features of the new rows come from the quarter before theirs
+  (the local macro store, see macro.py);
+- the last-5 form of each home team continues from its buffers in football.db
+  (see form.py);
+- the raw lines of the new matches are appended to RawDataB_weather.csv,
+  once cleaned (not those of known matches, so a second run adds nothing),
+  and their rows to CleanedData.csv and football.db.
+
+The result is identical to running the full notebook on the extended raw file.
+update() falls back to a full rebuild when an append cannot reproduce it: a new
+match dated before the latest cleaned one (its row would land mid-file), or a
+team the database has never seen (team ids are assigned alphabetically).
+
+Command line (from the src/ folder):
+
+    python -m football.cleaning --rebuild
+    python -m football.cleaning --update new_matches.csv
+"""
+
+import argparse
+import io
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from football import db, form, macro, registry
+from football.form import FormStore
+from football.paths import CLEANED_CSV_PATH, DATA_DIR, DB_PATH, MACRO_STORE_PATH, RAW_WEATHER_CSV_PATH
+
+
+# RawDataB_weather.csv column types (what read_csv infers on the full file).
+# Fixed explicitly so that a handful of new rows is parsed exactly like the full file.
+RAW_DTYPES = {
+    "Competition": "str",
+    "Matchday": "str",
+    "Date": "str",
+    "Time": "str",
+    "Home Team": "str",
+    "Ranking Home Team": "str",
+    "Away Team": "str",
+    "Ranking Away Team": "str",
+    "Attendance": "str",
+    "Result": "str",
+    "Weather": "str",
+    "Temperature (°C)": "float64",
+}
+
+# Report of the scraped duplicates that disagree (see duplicate_conflicts())
+CONFLICTS_CSV_PATH = DATA_DIR / "duplicate_conflicts.csv"
+
+# Columns that are float in a full rebuild because some raw rows are missing values
+FLOAT_COLUMNS = ["Time", "Max Capacity", "Full Roof"]
+
+SEASON_CHOICES = ["2019/2020", "2020/2021", "2021/2022", "2022/2023", "2023/2024", "2024/2025"]
+
+# Months of Covid
+# source drop of restriction: https://de.wikipedia.org/wiki/Division_1A_2021/22
+# source beginning of restrictions: https://de.wikipedia.org/wiki/COVID-19-Pandemie_in_Belgien
+months_to_remove_2020 = [3, 4, 5, 6, 7, 8, 9, 10, 11, 12]
+months_to_remove_2021 = [1, 2, 3, 4, 5, 6, 7, 8]
+
+COMPETITION = "Jupiler Pro League"
+
+FORM_COLUMNS = ["Goals Scored in Last 5 Games", "Goals Conceded in Last 5 Games", "Number of Wins in Last 5 Games"]
+
+
+def read_raw(path=RAW_WEATHER_CSV_PATH):
+    return pd.read_csv(path, dtype=RAW_DTYPES)
+
+
+def read_quarterly_macro(path=MACRO_STORE_PATH):
+    """Quarterly macro data from the local store (latest revision of every value, see macro.py)."""
+    return macro.MacroStore.load(path).quarterly()
+
+
+############################## CLEANING STEPS ##############################
+
+def add_date_columns(df):
+    """Parse "Sat 27/07/19" into date, Date (MM-DD-YYYY), Weekday, Month and Year."""
+    df = df.rename(columns={"Date": "old_date"})
+    df["date"] = pd.to_datetime(df["old_date"], format="%a %d/%m/%y", errors="coerce")  # there are some unknowns so we need coerce
+    df["Date"] = df["date"].dt.strftime("%m-%d-%Y")
+    df["Weekday"] = df["date"].dt.day_name()
+    df["Month"] = df["date"].dt.month
+    df["Year"] = df["date"].dt.year
+    return df
+
+
+def add_season(df):
+    """Season label: July to June, "Unknown" outside 2019/2020 - 2024/2025."""
+    year, month = df["Year"], df["Month"]
+    # Season start year; every 2019 match belongs to 2019/2020 (the scrape starts in July 2019)
+    start = np.where(year == 2019, 2019, year - (month < 7))
+    conditions = [(start == 2019 + i) & (year <= 2024) for i in range(len(SEASON_CHOICES))]
+    df["Season"] = np.select(conditions, SEASON_CHOICES, default="Unknown")
+    return df
+
+
+def add_quarter(df):
+    df["quarter"] = np.where((df["Month"] >= 1) & (df["Month"] <= 3), 1,
+                    np.where((df["Month"] >= 4) & (df["Month"] <= 6), 2,
+                    np.where((df["Month"] >= 7) & (df["Month"] <= 9), 3,
+                    np.where((df["Month"] >= 10) & (df["Month"] <= 12), 4, np.nan))))
+    return df
+
+
+def parse_time(df):
+    """"8:30 PM" -> 20 (NaN when unknown)."""
+    df["Time"] = pd.to_datetime(df["Time"], format="%I:%M %p", errors="coerce").dt.hour
+    return df
+
+
+def drop_covid(df):
+    """Remove the matches played from March 2020 to August 2021."""
+    return df[~(((df["Year"] == 2020) & (df["Month"].isin(months_to_remove_2020))) |
+                ((df["Year"] == 2021) & (df["Month"].isin(months_to_remove_2021))))]
+
+
+def add_stadium_info(df):
+    """Stadium, capacity, city, province and roof of the home team (empty for non-league teams)."""
+    df = df.copy()
+    clubs = registry.seed()
+    home = clubs.ids(df["Home Team"])
+    df["Stadium"] = clubs.stadium_name[home]
+    df["Max Capacity"] = clubs.max_capacity[home]
+    df["City"] = clubs.city[home]
+    df["Province"] = clubs.province[home]
+    df["Full Roof"] = clubs.full_roof[home]
+    return df
+
+
+def keep_league_matches(df):
+    """Jupiler Pro League matches played in one of the current league stadiums."""
+    clubs = registry.seed()
+    df = df[clubs.league_order[clubs.ids(df["Home Team"])] > 0]
+    return df[df["Competition"] == COMPETITION]
+
+
+def drop_unplayed(df):
+    """Remove games not yet played (score "-:-")."""
+    return df[df["Result"] != "-:-"]
+
+
+def clean_attendance(df):
+    """"9.444" -> "9444"; drop matches without attendance ("x" or missing)."""
+    df = df[df["Attendance"].notna()].copy()
+    df["Attendance"] = df["Attendance"].astype(str).str.replace(".", "")
+    return df[(df["Attendance"] != "x") & (df["Attendance"] != "nan")]
+
+
+def add_percentage_attendance(df):
+    df = df.copy()
+    df["Attendance"] = pd.to_numeric(df["Attendance"], errors="coerce")
+    df["Max Capacity"] = pd.to_numeric(df["Max Capacity"], errors="coerce")
+    df = df.dropna(subset=["Attendance", "Max Capacity"])
+    df["PercentageAttendance"] = df["Attendance"] / df["Max Capacity"]
+    return df
+
+
+def clean_rankings(df):
+    """"(7.)" -> "7"."""
+    df["Ranking Home Team"] = df["Ranking Home Team"].str.replace(r"[().]", "", regex=True).str.strip()
+    df["Ranking Away Team"] = df["Ranking Away Team"].str.replace(r"[().]", "", regex=True).str.strip()
+    return df
+
+
+def _categorical(values):
+    """Column as a categorical (hashing then only hashes each distinct value once)."""
+    codes, uniques = pd.factorize(values)
+    return pd.Categorical.from_codes(codes, categories=uniques)
+
+
+def team_pairs(df):
+    """Unordered team pair of every row: (first, second) team in alphabetical order.
+
+    Both teams are coded against one sorted category list, so the alphabetical
+    order is the order of the codes and the pair is a min / max over two arrays.
+    """
+    n = len(df)
+    codes, teams = pd.factorize(np.concatenate([df["Home Team"].to_numpy(), df["Away Team"].to_numpy()]))
+    order = np.argsort(teams.astype(str), kind="stable")
+    rank = np.empty(len(order) + 1, dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    rank[-1] = -1  # missing team (code -1) stays missing
+    codes = rank[codes]
+    home, away = codes[:n], codes[n:]
+    categories = pd.Index(teams[order])
+    first = pd.Categorical.from_codes(np.minimum(home, away), categories=categories)
+    second = pd.Categorical.from_codes(np.maximum(home, away), categories=categories)
+    return first, second
+
+
+def match_keys(df):
+    """64-bit key of a match whichever club's page it was scraped from.
+
+    Hash of (Competition, Season, Month, unordered team pair). It only depends
+    on the values, so keys of different batches (or of the database) compare.
+    """
+    first, second = team_pairs(df)
+    key_columns = pd.DataFrame({
+        "Competition": _categorical(df["Competition"].astype("str")),
+        "Season": _categorical(df["Season"].astype("str")),
+        "Month": df["Month"].astype("Int64").to_numpy(),
+        "First": first,
+        "Second": second,
+    })
+    return pd.Series(pd.util.hash_pandas_object(key_columns, index=False).to_numpy(), index=df.index, name="Match Key")
+
+
+def duplicate_conflicts(df, keys=None):
+    """Copies of the same match that disagree on attendance or score.
+
+    Returns those rows (all copies, with their "Match Key"), grouped by match.
+    """
+    keys = match_keys(df) if keys is None else keys
+    copies = df.assign(**{"Match Key": keys})[keys.duplicated(keep=False).to_numpy()]
+    differs = copies.groupby("Match Key")[["Attendance", "Result"]].transform("nunique", dropna=False)
+    return copies[(differs > 1).any(axis=1)].sort_values("Match Key", kind="stable")
+
+
+def drop_duplicate_matches(df, keys=None):
+    """Every match is scraped twice (once per club); keep the first copy."""
+    keys = match_keys(df) if keys is None else keys
+    return df[~keys.duplicated().to_numpy()]
+
+
+def add_macro_features(df, qdata):
+    """Add the previous available quarter's GDP / CPI / employment (*_lagQ) by (Year, quarter).
+
+    An as-of join on the quarter (see macro.MacroTable): each value is the
+    latest observation dated in an earlier quarter than the match.
+    """
+    df = df.copy()
+    df["Year"] = pd.to_numeric(df["Year"], errors="coerce").astype("Int64")
+    df["quarter"] = pd.to_numeric(df["quarter"], errors="coerce").astype("Int64")
+
+    lagged = macro.MacroTable(qdata).lagged(
+        df["Year"].to_numpy(dtype=float, na_value=np.nan), df["quarter"].to_numpy(dtype=float, na_value=np.nan))
+    df = df.drop(columns=[c for c in lagged if c in df.columns])
+    for column, values in lagged.items():
+        df[column] = values
+    return df
+
+
+def add_result_columns(df):
+    """Split "2:1" into home / away goals and flag extra time or penalties."""
+    df = df.copy()
+    # Some scores carry "AET" or "on pens" after the away goals
+    has_score = df["Result"].str.contains(":", regex=False)
+    score = df["Result"].str.split(":", n=1)
+    df["Home Team Goals Scored"] = score.str[0].where(has_score, "-")
+    df["Away Team Goals Scored"] = score.str[1].where(has_score, "-")
+    df = df.drop(columns=["Result"])
+
+    away = df["Away Team Goals Scored"]
+    df["Match Type"] = np.select(
+        [away.str.contains("AET", regex=False), away.str.contains("pens", regex=False)],
+        ["Extra Time", "Penalties"],
+        default="Normal Time",
+    )
+    df["Away Team Goals Scored"] = away.str.extract(r"(\d+)", expand=False).astype(int)
+    return df
+
+
+def add_outcomes(df):
+    """Home / away outcome (Win, Draw, Loss, or Not Played without a score)."""
+    df = df.copy()
+    df["Home Team Goals Scored"] = pd.to_numeric(df["Home Team Goals Scored"], errors="coerce")
+    df["Away Team Goals Scored"] = pd.to_numeric(df["Away Team Goals Scored"], errors="coerce")
+
+    home_goals, away_goals = df["Home Team Goals Scored"], df["Away Team Goals Scored"]
+    not_played = home_goals.isna() | away_goals.isna()
+    df["Home Team Outcome"] = np.select(
+        [not_played, home_goals > away_goals, home_goals < away_goals], ["Not Played", "Win", "Loss"], default="Draw")
+    df["Away Team Outcome"] = np.select(
+        [not_played, home_goals > away_goals, home_goals < away_goals], ["Not Played", "Loss", "Win"], default="Draw")
+    return df
+
+
+def sort_by_date(df):
+    """Re-parse Date, add Year/Month/Day and sort chronologically (ties keep their order)."""
+    df = df.copy()
+    df["Date"] = pd.to_datetime(df["Date"], format="%m-%d-%Y", errors="coerce")
+    df["Year"] = df["Date"].dt.year
+    df["Month"] = df["Date"].dt.month
+    df["Day"] = df["Date"].dt.day
+    return df.sort_values(by=["Year", "Month", "Day"]).reset_index(drop=True)
+
+
+def add_rolling_form(df, store=None):
+    """Goals scored / conceded and wins over each home team's previous 5 home games.
+
+    The first 5 home games of a team use historical_data (games before the
+    scrape). `store` (a form.FormStore, e.g. loaded from football.db)
+    continues the windows of an earlier run. Rows must already be in
+    chronological order.
+    """
+    store = FormStore() if store is None else store
+
+    form = np.zeros((len(df), 3))
+    home_teams = df["Home Team"].to_numpy()
+    away_teams = df["Away Team"].to_numpy()
+    scored = df["Home Team Goals Scored"].to_numpy(dtype=float)
+    conceded = df["Away Team Goals Scored"].to_numpy(dtype=float)
+    outcomes = df["Home Team Outcome"].to_numpy()
+
+    for row, (home, away) in enumerate(zip(home_teams, away_teams)):
+        form[row] = store.form(home, is_home=True).totals()
+        store.add_match(home, away, scored[row], conceded[row], outcomes[row])
+
+    df = df.copy()
+    for position, column in enumerate(FORM_COLUMNS):
+        df[column] = form[:, position]
+
+    # Replace missing or invalid values with 0 safely
+    return df.infer_objects().fillna(0)
+
+
+def drop_helper_date_columns(df):
+    return df.drop(columns=["old_date", "date"])
+
+
+def add_categories(df):
+    """Ranking categories, game day, time slot, Weather GoodBad and Derby."""
+    df = df.copy()
+    df.columns = [c.replace("\xa0", " ") for c in df.columns]
+
+    df["Ranking Home Team"] = pd.to_numeric(df["Ranking Home Team"], errors="coerce").fillna(0).astype(int)
+    df["Ranking Away Team"] = pd.to_numeric(df["Ranking Away Team"], errors="coerce").fillna(0).astype(int)
+
+    def categorize_ranking(ranking):
+        return np.select(
+            [ranking.between(1, 3), ranking.between(4, 8), ranking.between(9, 12), ranking == 0],
+            ["Top ranked", "Medium ranked", "Bottom ranked", "Not ranked"],
+            default="Unknown",
+        )
+
+    df["Opposing team Category"] = categorize_ranking(df["Ranking Away Team"])
+    df["Home team Category"] = categorize_ranking(df["Ranking Home Team"])
+
+    df["Game day"] = np.select(
+        [df["Weekday"].isin(["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]),
+         df["Weekday"].isin(["Saturday", "Sunday"])],
+        ["Weekday", "Weekend"],
+        default="Unknown",
+    )
+
+    # h < 18 = Afternoon, 18 <= h < 20 = Evening, else Night
+    hours = pd.to_numeric(df["Time"], errors="coerce")
+    df["Time slot"] = np.select(
+        [hours.isna(), hours < 18, hours < 20], ["", "Afternoon", "Evening"], default="Night")
+
+    df["Weather GoodBad"] = np.select(
+        [df["Weather"].isin(["Clear or mostly clear", "Partly cloudy"]),
+         df["Weather"].isin(["Rainy", "Drizzle", "Snowy"])],
+        ["Good", "Bad"],
+        default="Unknown",
+    )
+
+    clubs = registry.seed()
+    df["Derby"] = clubs.derby[clubs.ids(df["Home Team"]), clubs.ids(df["Away Team"])].astype(int)
+    return df
+
+
+def finalize(df):
+    df = df.copy()
+    df[FLOAT_COLUMNS] = df[FLOAT_COLUMNS].astype(float)
+    return df
+
+
+############################## FULL / INCREMENTAL ##############################
+
+def clean_matches(raw):
+    """Raw steps up to (not including) the dedup: parse, filter and enrich rows one by one."""
+    df = add_date_columns(raw.copy())
+    df = add_season(df)
+    df = add_quarter(df)
+    df = parse_time(df)
+    df = drop_covid(df)
+    df = add_stadium_info(df)
+    df = keep_league_matches(df)
+    df = drop_unplayed(df)
+    df = clean_attendance(df)
+    df = add_percentage_attendance(df)
+    return clean_rankings(df)
+
+
+def enrich_matches(df, qdata, store=None):
+    """Steps after the dedup: macro, results, last-5 form and categories."""
+    df = add_macro_features(df, qdata)
+    df = add_result_columns(df)
+    df = add_outcomes(df)
+    df = sort_by_date(df)
+    df = add_rolling_form(df, store)
+    df = drop_helper_date_columns(df)
+    return finalize(add_categories(df))
+
+
+def clean(raw, qdata, conflicts_csv=None):
+    """Full rebuild: the whole notebook on the whole raw table.
+
+    If conflicts_csv is given, the duplicate_conflicts() report is written there.
+    """
+    df = clean_matches(raw)
+    keys = match_keys(df)
+    if conflicts_csv is not None:
+        conflicts = duplicate_conflicts(df, keys)
+        conflicts.to_csv(conflicts_csv, index=False)
+        if len(conflicts):
+            print(f"⚠️ {conflicts['Match Key'].nunique()} duplicated match(es) disagree on attendance or score, "
+                  f"see {conflicts_csv}")
+    return enrich_matches(drop_duplicate_matches(df, keys), qdata)
+
+
+def rebuild(raw_csv=RAW_WEATHER_CSV_PATH, cleaned_csv=CLEANED_CSV_PATH, db_path=DB_PATH, qdata=None,
+            conflicts_csv=CONFLICTS_CSV_PATH):
+    """Clean the whole raw file, write CleanedData.csv and rebuild football.db."""
+    qdata = read_quarterly_macro() if qdata is None else qdata
+    cleaned = clean(read_raw(raw_csv), qdata, conflicts_csv)
+    cleaned.to_csv(cleaned_csv, index=False)
+    db.build_database(cleaned_csv, db_path)
+    return cleaned
+
+
+def _append_csv(frame, path):
+    """Append rows to a CSV; return them as read back from the CSV text (like a full rebuild reads them)."""
+    text = frame.to_csv(index=False)
+    with open(path, "a", newline="", encoding="utf-8") as file:
+        file.write(text.partition("\n")[2])
+    return pd.read_csv(io.StringIO(text))
+
+
+def _append_raw_lines(new_raw_csv, raw_csv, rows):
+    """Append the given data lines (0-based row numbers) of a newly scraped file to the raw file, byte for byte."""
+    header, _, body = Path(new_raw_csv).read_bytes().removeprefix(b"\xef\xbb\xbf").partition(b"\n")
+    raw_header = Path(raw_csv).read_bytes()[:len(header) + 4].removeprefix(b"\xef\xbb\xbf")
+    if not raw_header.startswith(header):
+        raise ValueError(f"{new_raw_csv} does not have the columns of {raw_csv}")
+    # One line per row, as read_raw() reads them (it skips blank lines)
+    lines = [line for line in body.splitlines(keepends=True) if line.strip()]
+    lines = [lines[i] for i in rows]
+    if not lines:
+        return
+    if not lines[-1].endswith(b"\n"):
+        lines[-1] += b"\r\n"
+    with open(raw_csv, "rb+") as file:
+        file.seek(-1, 2)
+        if file.read(1) != b"\n":
+            file.write(b"\r\n")
+        file.write(b"".join(lines))
+
+
+def update(new_raw_csv, raw_csv=RAW_WEATHER_CSV_PATH, cleaned_csv=CLEANED_CSV_PATH, db_path=DB_PATH, qdata=None):
+    """Add newly scraped matches (a CSV with the columns of RawDataB_weather.csv).
+
+    Raw lines a full rebuild would drop (other competitions, unplayed
+    matches, no attendance) are not appended to the raw file either.
+
+    Returns (number of new cleaned matches, "appended" or "rebuilt").
+    """
+    qdata = read_quarterly_macro() if qdata is None else qdata
+    new_raw = read_raw(new_raw_csv)
+
+    with db.writer(db_path) as conn:
+        candidates = clean_matches(new_raw)
+        # Already in the dataset (scraped from the other club's page before), or twice in this batch
+        keys = match_keys(candidates)
+        known = match_keys(db.stored_matches(conn, candidates["Season"].unique(), candidates["Month"].unique()))
+        candidates = candidates[~(keys.isin(known) | keys.duplicated()).to_numpy()]
+        if candidates.empty:
+            return 0, "appended"
+
+        # The raw file stays the source of truth for a later full rebuild
+        _append_raw_lines(new_raw_csv, raw_csv, new_raw.index.get_indexer(candidates.index))
+
+        # An append only equals a full rebuild if the new rows sort after the stored ones
+        # and bring no new team (team ids are alphabetical)
+        latest = db.latest_match_date(conn)
+        first_new = candidates["date"].min()
+        new_teams = (set(candidates["Home Team"]) | set(candidates["Away Team"])) - db.team_names(conn)
+        append = not new_teams and (latest is None or first_new >= pd.Timestamp(latest))
+
+        if append:
+            new_rows = enrich_matches(candidates, qdata, form.refresh(conn))
+            # The database is fed from the CSV text, exactly like build_database reads it
+            db.append_matches(conn, _append_csv(new_rows, cleaned_csv))
+            return len(new_rows), "appended"
+
+    rebuild(raw_csv, cleaned_csv, db_path, qdata)
+    return len(candidates), "rebuilt"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Clean the scraped matches (full rebuild or incremental update).")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--rebuild", action="store_true", help="clean RawDataB_weather.csv from scratch")
+    group.add_argument("--update", metavar="NEW_RAW_CSV", help="append newly scraped rows")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.rebuild:
+        cleaned = rebuild()
+        print(f"✅ Rebuilt {CLEANED_CSV_PATH.name} and {DB_PATH.name}: {len(cleaned)} matches "
+              f"in {time.perf_counter() - start:.2f} s")
+    else:
+        n_new, mode = update(args.update)
+        print(f"✅ {n_new} new match(es) {mode} in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
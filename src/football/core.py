@@ -0,0 +1,316 @@
+"""Attendance predictions without the UI: one match or many, plain dicts in and out.
+
+The Streamlit app, the HTTP service (service.py) and any other caller share
+this code, so they cannot give different numbers for the same match:
+
+    from football.core import AttendancePredictor
+    predictor = AttendancePredictor.current()
+    predictor.predict({"home_team": "Club Brugge", "away_team": "KAA Gent",
+                       "match_date": "2026-03-14", "match_time": "18:15", "matchday": 28})
+
+A match has the fixture columns of the batch scorer (see batch.py):
+home_team, away_team, match_date (a date or YYYY-MM-DD), match_time ("HH:MM"
+or an hour) and matchday. Optional fields: the rankings and last-5 form
+(see features.default_form; missing form is taken from football.db, then the
+defaults), temperature and weather_condition, and thresholds, the home games
+the Low / Normal / High level is compared with ("all", "latest season",
+"rolling" or a season such as "2024/2025", see thresholds.py).
+
+As in the app, a match with a usable forecast goes through the with-weather
+model and any other match through the without-weather model, which is read
+from the prediction cube (cube.py) when the cube covers its inputs.
+predict_many() scores a list of matches on one encoded matrix per model, and
+explain() breaks one prediction down into feature contributions (explain.py).
+"""
+
+import datetime
+from collections import namedtuple
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+from football import registry
+from football.explain import explanation, read_team_average
+from football.features import (
+    default_form,
+    encoder_for,
+    has_usable_weather,
+    match_feature_frame,
+    match_features,
+)
+from football.form import cached_form, cached_form_table, fill_form
+from football.paths import (
+    DB_PATH,
+    MODEL_WITH_WEATHER_INTERVAL_PATH,
+    MODEL_WITH_WEATHER_PATH,
+    MODEL_WITHOUT_WEATHER_INTERVAL_PATH,
+    MODEL_WITHOUT_WEATHER_PATH,
+    PREDICTION_CUBE_DIR,
+)
+from football.predict import attendance_from_share, attendance_level
+from football.resources import load_interval_predictor, load_prediction_cube
+from football.thresholds import ALL, team_thresholds
+
+
+REQUIRED_FIELDS = ("home_team", "away_team", "match_date", "match_time", "matchday")
+OPTIONAL_FIELDS = tuple(default_form) + ("temperature", "weather_condition", "thresholds")
+
+Prediction = namedtuple("Prediction", [
+    "home_team",
+    "away_team",
+    "match_date",             # YYYY-MM-DD
+    "model",                  # with_weather / without_weather
+    "source",                 # cube (precomputed) / live
+    "predicted_percentage",   # share of the stadium, 0-100
+    "predicted_attendance",
+    "attendance_p10",
+    "attendance_p90",
+    "max_capacity",
+    "attendance_30th",
+    "attendance_70th",
+    "attendance_status",      # Low / Normal / High
+])
+
+
+def _given(value):
+    """False for a missing field: None, or NaN (an empty cell of a fixture file)."""
+    return value is not None and not (isinstance(value, float) and np.isnan(value))
+
+
+def parse_match(match, teams):
+    """Validate one match description; return it as a fixture row with a match_hour.
+
+    Raises ValueError with a message meant for the caller (the service
+    returns it as a 400).
+    """
+    if not isinstance(match, Mapping):
+        raise ValueError("A match must be an object with the fields " + ", ".join(REQUIRED_FIELDS))
+    missing = [field for field in REQUIRED_FIELDS if not _given(match.get(field))]
+    if missing:
+        raise ValueError(f"Missing field(s): {', '.join(missing)}")
+    unknown = sorted(set(match) - set(REQUIRED_FIELDS) - set(OPTIONAL_FIELDS))
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+
+    home_team, away_team = str(match["home_team"]), str(match["away_team"])
+    if np.isnan(teams.max_capacity[teams.id_of(home_team)]):
+        raise ValueError(f"No stadium information for home team: {home_team}")
+    if home_team == away_team:
+        raise ValueError("The home and away teams must be different")
+
+    match_date = match["match_date"]
+    if isinstance(match_date, datetime.datetime):
+        match_date = match_date.date()
+    elif not isinstance(match_date, datetime.date):
+        try:
+            match_date = datetime.date.fromisoformat(str(match_date))
+        except ValueError:
+            raise ValueError(f"match_date must be YYYY-MM-DD, got {match_date!r}") from None
+
+    try:
+        # "15:30", "15:30:00" or a bare hour such as 15
+        match_hour = int(str(match["match_time"]).split(":")[0])
+        matchday = int(match["matchday"])
+        numbers = {field: float(match[field]) for field in OPTIONAL_FIELDS[:-2] if _given(match.get(field))}
+    except (TypeError, ValueError):
+        raise ValueError("match_time, matchday, the rankings, the form and temperature must be numbers") from None
+    if not 0 <= match_hour <= 23:
+        raise ValueError(f"match_time must be between 00:00 and 23:59, got {match['match_time']!r}")
+
+    return {
+        "home_team": home_team,
+        "away_team": away_team,
+        "match_date": match_date,
+        "match_hour": match_hour,
+        "matchday": matchday,
+        **numbers,
+        "weather_condition": match["weather_condition"] if _given(match.get("weather_condition")) else None,
+        "thresholds": str(match["thresholds"]) if _given(match.get("thresholds")) else ALL,
+    }
+
+
+class AttendancePredictor:
+    """The two interval models, the prediction cube and the team registry, ready to score matches."""
+
+    def __init__(self, model_with_weather, model_without_weather, prediction_cube=None, teams=None,
+                 db_path=DB_PATH):
+        self.model_with_weather = model_with_weather
+        self.model_without_weather = model_without_weather
+        self.prediction_cube = prediction_cube
+        self.teams = teams or registry.current(db_path)
+        self.db_path = db_path
+        self.encoder_with_weather = encoder_for(tuple(model_with_weather.feature_names))
+        self.encoder_without_weather = encoder_for(tuple(model_without_weather.feature_names))
+
+    def __repr__(self):
+        cube = "with" if self.prediction_cube is not None else "without"
+        return f"AttendancePredictor({self.teams!r}, {cube} prediction cube)"
+
+    @classmethod
+    def current(cls, db_path=DB_PATH):
+        """A predictor over the shipped models, from the process-wide cache (see resources.py).
+
+        Cheap to call once per request: every file is only stat'ed, and
+        reloaded when it changed.
+        """
+        return cls(
+            load_interval_predictor(MODEL_WITH_WEATHER_PATH, MODEL_WITH_WEATHER_INTERVAL_PATH),
+            load_interval_predictor(MODEL_WITHOUT_WEATHER_PATH, MODEL_WITHOUT_WEATHER_INTERVAL_PATH),
+            load_prediction_cube(PREDICTION_CUBE_DIR, MODEL_WITHOUT_WEATHER_PATH, MODEL_WITHOUT_WEATHER_INTERVAL_PATH),
+            registry.current(db_path),
+            db_path,
+        )
+
+    def _away_team(self, away_team):
+        # The models only know the current league teams; everybody else is "Unknown" (as in training)
+        return away_team if self.teams.league_order[self.teams.id_of(away_team)] > 0 else "Unknown"
+
+    def _thresholds(self, home_team, home_id, scope):
+        stored = team_thresholds(home_team, scope, self.db_path) if scope != ALL else None
+        return stored or (self.teams.attendance_30th[home_id], self.teams.attendance_70th[home_id])
+
+    def _features(self, row):
+        """Raw features of a parsed match, and whether it goes through the with-weather model."""
+        home_team, away_team = row["home_team"], row["away_team"]
+        form = {**default_form, **cached_form(home_team, away_team, self.db_path)}
+        form.update((field, row[field]) for field in default_form if field in row)
+        temperature, condition = row.get("temperature"), row["weather_condition"]
+
+        features = match_features(
+            home_team=home_team,
+            away_team=away_team,
+            match_date=row["match_date"],
+            match_hour=row["match_hour"],
+            matchday=row["matchday"],
+            temperature=temperature,
+            weather_condition=condition,
+            teams=self.teams,
+            **form,
+        )
+        features["Away Team"] = self._away_team(away_team)
+        return features, has_usable_weather(temperature, condition)
+
+    def predict(self, match):
+        """Score one match; return a Prediction."""
+        row = parse_match(match, self.teams)
+        home_team, away_team = row["home_team"], row["away_team"]
+        features, use_weather = self._features(row)
+
+        source = "live"
+        if use_weather:
+            model = "with_weather"
+            share, lower, upper = self.model_with_weather.predict(
+                self.encoder_with_weather.encode(features).reshape(1, -1))
+        else:
+            model = "without_weather"
+            encoded = self.encoder_without_weather.encode(features).reshape(1, -1)
+            cached = (
+                self.prediction_cube.lookup(home_team, away_team, encoded)
+                if self.prediction_cube is not None else None
+            )
+            if cached is not None:
+                source = "cube"
+            share, lower, upper = cached if cached is not None else self.model_without_weather.predict(encoded)
+
+        home_id = self.teams.id_of(home_team)
+        attendance_30th, attendance_70th = self._thresholds(home_team, home_id, row["thresholds"])
+        max_capacity = self.teams.max_capacity[home_id]
+        attendance = attendance_from_share(share[0], max_capacity)
+        return Prediction(
+            home_team=home_team,
+            away_team=away_team,
+            match_date=row["match_date"].isoformat(),
+            model=model,
+            source=source,
+            predicted_percentage=float(share[0]) * 100,
+            predicted_attendance=int(attendance),
+            attendance_p10=int(attendance_from_share(lower[0], max_capacity)),
+            attendance_p90=int(attendance_from_share(upper[0], max_capacity)),
+            max_capacity=int(max_capacity),
+            attendance_30th=float(attendance_30th),
+            attendance_70th=float(attendance_70th),
+            attendance_status=str(attendance_level(attendance, attendance_30th, attendance_70th)),
+        )
+
+    def explain(self, match, top=None):
+        """Why predict() gives this number: an explain.Explanation of the match's point prediction.
+
+        The contributions of every raw feature (exact TreeSHAP, in percentage
+        points) next to the home team's usual ones, from football.db. With
+        `top`, the smaller ones are summed into one line.
+        """
+        row = parse_match(match, self.teams)
+        features, use_weather = self._features(row)
+        model, predictor, encoder = (
+            ("with_weather", self.model_with_weather, self.encoder_with_weather) if use_weather
+            else ("without_weather", self.model_without_weather, self.encoder_without_weather)
+        )
+        if predictor.model is None:
+            raise ValueError("This predictor was built without the fitted models; they are needed to explain")
+        team_average = read_team_average(row["home_team"], model, self.db_path)
+        return explanation(predictor.model, encoder.encode(features), features, model, team_average, top)
+
+    def predict_many(self, matches):
+        """Score a list of matches (each model runs once, on one matrix); return a list of Predictions."""
+        rows = []
+        for i, match in enumerate(matches):
+            try:
+                rows.append(parse_match(match, self.teams))
+            except ValueError as error:
+                raise ValueError(f"Match {i}: {error}") from None
+        if not rows:
+            return []
+
+        fixtures = fill_form(pd.DataFrame(rows), table=cached_form_table(self.db_path))
+        raw = match_feature_frame(fixtures, self.teams)
+        raw["Away Team"] = [self._away_team(team) for team in raw["Away Team"]]
+
+        temperature = fixtures["temperature"] if "temperature" in fixtures else pd.Series(np.nan, index=fixtures.index)
+        use_weather = np.array([
+            has_usable_weather(None if pd.isna(t) else t, c)
+            for t, c in zip(temperature, fixtures["weather_condition"])
+        ], dtype=bool)
+
+        share = np.empty(len(rows))
+        lower = np.empty(len(rows))
+        upper = np.empty(len(rows))
+        routes = [
+            (use_weather, self.model_with_weather, self.encoder_with_weather),
+            (~use_weather, self.model_without_weather, self.encoder_without_weather),
+        ]
+        for selected, model, encoder in routes:
+            if selected.any():
+                share[selected], lower[selected], upper[selected] = model.predict(encoder.encode_frame(raw[selected]))
+
+        home_ids = self.teams.ids(fixtures["home_team"])
+        max_capacity = self.teams.max_capacity[home_ids]
+        attendance_30th = self.teams.attendance_30th[home_ids].copy()
+        attendance_70th = self.teams.attendance_70th[home_ids].copy()
+        for i, row in enumerate(rows):
+            if row["thresholds"] != ALL:
+                attendance_30th[i], attendance_70th[i] = self._thresholds(
+                    row["home_team"], home_ids[i], row["thresholds"])
+        attendance = attendance_from_share(share, max_capacity)
+        status = attendance_level(attendance, attendance_30th, attendance_70th)
+        attendance_p10 = attendance_from_share(lower, max_capacity)
+        attendance_p90 = attendance_from_share(upper, max_capacity)
+
+        return [
+            Prediction(
+                home_team=row["home_team"],
+                away_team=row["away_team"],
+                match_date=row["match_date"].isoformat(),
+                model="with_weather" if use_weather[i] else "without_weather",
+                source="live",
+                predicted_percentage=float(share[i] * 100),
+                predicted_attendance=int(attendance[i]),
+                attendance_p10=int(attendance_p10[i]),
+                attendance_p90=int(attendance_p90[i]),
+                max_capacity=int(max_capacity[i]),
+                attendance_30th=float(attendance_30th[i]),
+                attendance_70th=float(attendance_70th[i]),
+                attendance_status=str(status[i]),
+            )
+            for i, row in enumerate(rows)
+        ]
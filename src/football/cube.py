@@ -0,0 +1,363 @@
+"""Precomputed what-if predictions: the without-weather model as a lookup cube.
+
+Most clicks in the app score a match without a usable forecast (anything more
+than a couple of weeks ahead), i.e. with the without-weather model, the
+prefilled rankings and the last-5 form stored in football.db. Only the teams,
+the date, the kickoff hour and the matchday change. This module scores all
+those matches once, offline, and stores the results as one dense float32
+array:
+
+    values[home, away, date, hour, matchday, output]     output = prediction, P10, P90
+
+Every axis stands for all the columns match_features() derives from one
+input, whatever the model reads of them:
+
+    date        Month, Day, Weekday_*, Game day_*
+    hour        Time, Time slot_*
+    matchday    Matchday (or its Matchday_* dummies)
+
+Tree ensembles are piecewise constant: every tree compares a feature with a
+few split thresholds, so all the values between two consecutive thresholds
+give the same prediction. An input's "class" is the bucket every column of
+its axis falls in (read from the compiled TreeEngine), and the axes hold one
+cell per class, not per input: the kickoff hours that no tree tells apart
+share a cell, as do the matchdays whose dummy no tree splits on. A lookup is
+exact, not an approximation. The date axis holds the classes of the next
+HORIZON_DAYS days from the build (a later date of the same class is a hit
+too): a year of Month / Day buckets times the seven weekdays would be seven
+times larger.
+
+Everything else the model reads (rankings, form, derby, stadium, and the
+macro features, the latest published quarter for an upcoming match) is fixed
+per team pair. Those "anchor" values are stored next to the cube, and
+lookup() only answers when the encoded row matches its anchor. An overridden
+ranking, a hand-edited form or a forecast temperature is a different input.
+In those cases lookup() returns None and the caller runs the live model. An
+exact cube over the rankings as well would be far too large, because the
+model splits on every league position. build() refuses a model that reads a
+feature depending on the date which is neither an axis nor the macro data.
+
+    cube_dir/
+        values.npy     (teams, teams, date, hour, matchday, 3) float32, memory-mapped by the app
+        anchors.npy    (teams, teams, n_features) float32, the fixed part of every row
+        meta.json      teams, axes, thresholds and classes, sha256 of the model files (written last)
+
+Build it after training or after a DB rebuild (from the src/ folder):
+
+    python -m football.cube
+"""
+
+import argparse
+import datetime
+import itertools
+import json
+import os
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+from football import macro, registry
+from football.core import parse_match
+from football.features import default_form, encoder_for, game_day_for_date, match_features, time_slot_for_hour
+from football.form import current_form
+from football.paths import (
+    MODEL_WITHOUT_WEATHER_INTERVAL_PATH,
+    MODEL_WITHOUT_WEATHER_PATH,
+    PREDICTION_CUBE_DIR,
+)
+from football.resources import file_digest, load_interval_predictor
+
+
+SCHEMA_VERSION = 2
+
+# Cube axes, in order, and the raw features (match_features) each one sets
+AXES = {
+    "date": ("Month", "Day", "Weekday", "Game day"),
+    "hour": ("Time", "Time slot"),
+    "matchday": ("Matchday",),
+}
+OUTPUTS = ("prediction", "lower", "upper")
+
+# Days from the build date whose classes the date axis holds
+HORIZON_DAYS = 366
+# Matchdays the app accepts in practice (36 rounds, 38 with the play-offs)
+MATCHDAYS = range(1, 39)
+
+# How a stored axis is read: the model columns it sets (zeroed in the anchors),
+# those the trees split on with their thresholds, and class codes -> cell index
+Axis = namedtuple("Axis", ["name", "columns", "split_columns", "thresholds", "classes"])
+
+
+def split_points(engine, feature):
+    """Return the sorted thresholds the trees compare `feature` with."""
+    index = engine.feature_names.index(feature)
+    internal = engine.left != np.arange(len(engine.left))
+    return np.unique(engine.threshold[internal & (engine.feature == index)])
+
+
+def axis_inputs(axis, start):
+    """Raw feature values of every input of an axis, as match_features() sets them."""
+    if axis == "date":
+        dates = [start + datetime.timedelta(days=i) for i in range(HORIZON_DAYS)]
+        return [{"Month": d.month, "Day": d.day, "Weekday": d.strftime("%A"), "Game day": game_day_for_date(d)}
+                for d in dates]
+    if axis == "hour":
+        return [{"Time": hour, "Time slot": time_slot_for_hour(hour)} for hour in range(24)]
+    return [{"Matchday": matchday} for matchday in MATCHDAYS]
+
+
+def axis_columns(encoder, features):
+    """Sorted indices of the model columns holding these raw features (numeric or dummies)."""
+    columns = [index for column, index in encoder.numeric if column in features]
+    for column in features:
+        columns.extend(encoder.dummies.get(column, {}).values())
+    return sorted(columns)
+
+
+def class_codes(values, thresholds):
+    """(n, n_split_columns) bucket of every value: splits go left when x < threshold."""
+    codes = np.zeros(values.shape, dtype=np.int64)
+    for j, t in enumerate(thresholds):
+        codes[:, j] = np.searchsorted(t, values[:, j], side="right")
+    return codes
+
+
+class PredictionCube:
+    """The stored cube, with exact lookups for the rows it covers."""
+
+    def __init__(self, values, anchors, meta):
+        self.values = values
+        self.anchors = anchors
+        self.meta = meta
+        self.teams = {team: i for i, team in enumerate(meta["teams"])}
+        self.feature_names = meta["feature_names"]
+        index = {name: i for i, name in enumerate(self.feature_names)}
+        self.axes = []
+        for name, axis in meta["axes"].items():
+            self.axes.append(Axis(
+                name=name,
+                columns=[index[c] for c in axis["columns"]],
+                split_columns=[index[c] for c in axis["thresholds"]],
+                thresholds=[np.asarray(t, dtype=np.float32) for t in axis["thresholds"].values()],
+                classes={tuple(codes): i for i, codes in enumerate(axis["classes"])},
+            ))
+        self.axis_columns = [i for axis in self.axes for i in axis.columns]
+        self.model_digests = meta["model_digests"]
+
+    def __repr__(self):
+        shape = "x".join(str(n) for n in self.values.shape)
+        return f"PredictionCube({shape}, axes {', '.join(axis.name for axis in self.axes)})"
+
+    def lookup(self, home_team, away_team, row):
+        """Return (prediction, lower, upper) like IntervalPredictor.predict, or None.
+
+        `row` is the match encoded for the without-weather model. None means
+        the match is outside the cube (an unknown team, a value other than the
+        anchor outside the axes, or a date / hour / matchday class the cube
+        does not hold): use the live model.
+        """
+        home, away = self.teams.get(home_team), self.teams.get(away_team)
+        if home is None or away is None:
+            return None
+        row = np.asarray(row, dtype=np.float32).reshape(-1)
+        fixed = row.copy()
+        fixed[self.axis_columns] = 0
+        if not np.array_equal(fixed, self.anchors[home, away], equal_nan=True):
+            return None
+
+        cell = []
+        for axis in self.axes:
+            values = row[axis.split_columns]
+            if np.isnan(values).any():
+                return None
+            codes = class_codes(values.reshape(1, -1), axis.thresholds)[0]
+            index = axis.classes.get(tuple(codes.tolist()))
+            if index is None:
+                return None
+            cell.append(index)
+        outputs = np.array(self.values[(home, away) + tuple(cell)])
+        return outputs[0:1], outputs[1:2], outputs[2:3]
+
+
+def anchor_features(home_team, away_team, match_date=datetime.date(2000, 1, 1), match_hour=0, matchday=1):
+    """The raw features the app prefills for a match without weather.
+
+    The date, hour and matchday only set the columns of the cube axes, which
+    build() overwrites; passing others checks that nothing else depends on them.
+    """
+    form = {**default_form, **current_form(home_team, away_team)}
+    features = match_features(
+        home_team=home_team,
+        away_team=away_team,
+        match_date=match_date,
+        match_hour=match_hour,
+        matchday=matchday,
+        **form,
+    )
+    # Any match after the latest published quarter gets these (an older date is scored live)
+    features.update(macro.current().latest())
+    return features
+
+
+def _axis_classes(name, encoder, engine, start):
+    """(meta entry, (n_classes, n_columns) column values) of one axis: one representative input per class."""
+    columns = axis_columns(encoder, AXES[name])
+    inputs = np.stack([encoder.encode(features)[columns] for features in axis_inputs(name, start)])
+    thresholds = {j: split_points(engine, encoder.columns[i]) for j, i in enumerate(columns)}
+    split = [j for j, t in thresholds.items() if len(t)]
+    codes = class_codes(inputs[:, split], [thresholds[j] for j in split])
+    if split:
+        _, first = np.unique(codes, axis=0, return_index=True)
+        first = np.sort(first)                              # classes in input order
+    else:
+        first = np.array([0])                               # the model reads none of it: one class
+    meta = {
+        "columns": [encoder.columns[i] for i in columns],
+        "thresholds": {encoder.columns[columns[j]]: thresholds[j].tolist() for j in split},
+        "classes": codes[first].tolist(),
+    }
+    return meta, inputs[first]
+
+
+def _check_anchored(encoder, engine, axis_index, home_team, away_team):
+    """Raise ValueError when a column the model reads outside the axes changes with the date, hour or matchday."""
+    first = encoder.encode(anchor_features(home_team, away_team))
+    other = encoder.encode(anchor_features(home_team, away_team, datetime.date(2001, 7, 18), 20, 17))
+    internal = engine.left != np.arange(len(engine.left))
+    read = np.zeros(encoder.n_features, dtype=bool)
+    read[np.unique(engine.feature[internal])] = True
+    read[axis_index] = False
+    changed = read & ~((first == other) | (np.isnan(first) & np.isnan(other)))
+    if changed.any():
+        names = ", ".join(encoder.columns[i] for i in np.flatnonzero(changed))
+        raise ValueError(f"The model reads {names}, which depend on the date but are not cube axes")
+
+
+def build(cube_dir=PREDICTION_CUBE_DIR, model_path=MODEL_WITHOUT_WEATHER_PATH,
+          interval_path=MODEL_WITHOUT_WEATHER_INTERVAL_PATH, teams=None, start=None, verbose=True):
+    """Score every team pair over the date / hour / matchday classes; return the meta.
+
+    The date axis covers the HORIZON_DAYS days from `start` (default: today).
+    """
+    teams = teams or registry.current().league_teams
+    start = start or datetime.date.today()
+    predictor = load_interval_predictor(model_path, interval_path)
+    encoder = encoder_for(tuple(predictor.feature_names))
+    axes = {name: _axis_classes(name, encoder, predictor.engine, start) for name in AXES}
+    index = {name: i for i, name in enumerate(encoder.columns)}
+    axis_index = [index[c] for axis, _ in axes.values() for c in axis["columns"]]
+    _check_anchored(encoder, predictor.engine, axis_index, teams[0], teams[1])
+
+    # The axis columns of every cell, in the cube's axis order
+    grid_shape = tuple(len(classes) for _, classes in axes.values())
+    grid = np.zeros((int(np.prod(grid_shape)), encoder.n_features), dtype=np.float32)
+    for cell, combination in enumerate(itertools.product(*(range(n) for n in grid_shape))):
+        for (axis, classes), i in zip(axes.values(), combination):
+            grid[cell, [index[c] for c in axis["columns"]]] = classes[i]
+    fixed = np.ones(encoder.n_features, dtype=bool)
+    fixed[axis_index] = False
+
+    n_teams = len(teams)
+    values = np.full((n_teams, n_teams) + grid_shape + (len(OUTPUTS),), np.nan, dtype=np.float32)
+    anchors = np.zeros((n_teams, n_teams, encoder.n_features), dtype=np.float32)
+    start_time = time.perf_counter()
+    for home, home_team in enumerate(teams):
+        for away, away_team in enumerate(teams):
+            if home == away:
+                anchors[home, away] = np.nan      # never matches: the app needs two teams
+                continue
+            anchor = encoder.encode(anchor_features(home_team, away_team))
+            anchor[axis_index] = 0
+            anchors[home, away] = anchor
+
+            rows = grid.copy()
+            rows[:, fixed] = anchor[fixed]
+            prediction, lower, upper = predictor.predict(rows)
+            values[home, away] = np.stack([prediction, lower, upper], axis=1).reshape(grid_shape + (len(OUTPUTS),))
+        if verbose:
+            print(f"   {home_team}: done ({time.perf_counter() - start_time:.0f} s)")
+
+    meta = {
+        "schema_version": SCHEMA_VERSION,
+        "built_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "teams": list(teams),
+        "axes": {name: axis for name, (axis, _) in axes.items()},
+        "horizon": [start.isoformat(), (start + datetime.timedelta(days=HORIZON_DAYS - 1)).isoformat()],
+        "outputs": list(OUTPUTS),
+        "feature_names": list(predictor.feature_names),
+        "model_digests": [file_digest(model_path), file_digest(interval_path)],
+        "shape": list(values.shape),
+    }
+    _save(cube_dir, values, anchors, meta)
+    return meta
+
+
+def _save(cube_dir, values, anchors, meta):
+    """Write the arrays, then meta.json last: a cube with a meta is always complete."""
+    cube_dir = Path(cube_dir)
+    cube_dir.mkdir(parents=True, exist_ok=True)
+    meta_path = cube_dir / "meta.json"
+    meta_path.unlink(missing_ok=True)
+    for name, array in (("values.npy", values), ("anchors.npy", anchors)):
+        tmp = cube_dir / f"{name}.tmp.npy"
+        np.save(tmp, array)
+        os.replace(tmp, cube_dir / name)
+    tmp = meta_path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(meta, indent=1, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, meta_path)
+
+
+def load(meta_path):
+    """Load a cube from its meta.json; the values are memory-mapped, not read."""
+    cube_dir = Path(meta_path).parent
+    meta = json.loads(Path(meta_path).read_text(encoding="utf-8"))
+    if meta["schema_version"] != SCHEMA_VERSION:
+        raise ValueError(f"Cube schema {meta['schema_version']}, expected {SCHEMA_VERSION}; rebuild it")
+    return PredictionCube(
+        values=np.load(cube_dir / "values.npy", mmap_mode="r"),
+        anchors=np.load(cube_dir / "anchors.npy"),
+        meta=meta,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute the without-weather predictions as a lookup cube.")
+    parser.add_argument("-o", "--output", default=PREDICTION_CUBE_DIR, help="cube folder (default: Data/prediction_cube)")
+    args = parser.parse_args(argv)
+
+    meta = build(args.output)
+    cube = load(Path(args.output) / "meta.json")
+
+    # Spot-check the cube against the live model, on matches parsed and featurised like the app's
+    predictor = load_interval_predictor(MODEL_WITHOUT_WEATHER_PATH, MODEL_WITHOUT_WEATHER_INTERVAL_PATH)
+    encoder = encoder_for(tuple(predictor.feature_names))
+    teams = registry.current()
+    start = datetime.date.fromisoformat(meta["horizon"][0])
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        home_team, away_team = rng.choice(meta["teams"], size=2, replace=False)
+        row = parse_match({
+            "home_team": home_team,
+            "away_team": away_team,
+            "match_date": (start + datetime.timedelta(days=int(rng.integers(HORIZON_DAYS)))).isoformat(),
+            "match_time": f"{int(rng.integers(11, 23))}:30",
+            "matchday": int(rng.choice(MATCHDAYS)),
+        }, teams)
+        form = {**default_form, **current_form(home_team, away_team)}
+        features = match_features(home_team=home_team, away_team=away_team, match_date=row["match_date"],
+                                  match_hour=row["match_hour"], matchday=row["matchday"], teams=teams, **form)
+        encoded = encoder.encode(features)
+        cached = cube.lookup(home_team, away_team, encoded)
+        expected = predictor.predict(encoded.reshape(1, -1))
+        if cached is None:
+            raise RuntimeError(f"{home_team} - {away_team} on {row['match_date']} is not in the cube")
+        if not all(np.array_equal(a, b) for a, b in zip(cached, expected)):
+            raise RuntimeError(f"{home_team} - {away_team} on {row['match_date']}: the cube differs from the live model")
+    size = cube.values.nbytes / 1e6
+    print(f"✅ {args.output}: {cube}, {size:.1f} MB, same predictions as the live model")
+
+
+if __name__ == "__main__":
+    main()
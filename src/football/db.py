@@ -0,0 +1,568 @@
+"""football.db: the star schema built from CleanedData.csv (see 3.DB.ipynb).
+
+build_database() is the notebook's full build: one bulk-loaded transaction
+(WAL journal while it runs, see writer()), secondary indexes for the training join and the per-team
+history queries, and an upsert mode that updates the file in place:
+
+    python -m football.db            # delete and rebuild
+    python -m football.db --upsert   # update in place (the app keeps reading)
+
+append_matches() adds newly cleaned matches to an existing database; it
+produces the same rows a full build of the extended CleanedData.csv would.
+Both bring the per-team form buffers (TeamForm, see form.py) and attendance
+thresholds (TeamAttendance, see thresholds.py) up to date. The
+other helpers answer what an incremental cleaning run needs to know (known
+matches, latest date) without loading the whole history.
+"""
+
+import argparse
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+from football import form, static_data, thresholds
+from football.paths import CLEANED_CSV_PATH, DB_PATH
+
+
+schema_sql = """
+PRAGMA foreign_keys = ON;
+
+CREATE TABLE IF NOT EXISTS Stadium (
+    stadium_id    INTEGER PRIMARY KEY,
+    stadium_name  TEXT NOT NULL UNIQUE,
+    city          TEXT NOT NULL,
+    province      TEXT NOT NULL,
+    max_capacity  INTEGER NOT NULL,
+    full_roof     INTEGER NOT NULL,
+    latitude      REAL,
+    longitude     REAL
+);
+
+-- stadium_id: home stadium of the current league clubs; league_order: their
+-- position in the app's team list (0 for teams outside the current league)
+CREATE TABLE IF NOT EXISTS Team (
+    team_id       INTEGER PRIMARY KEY,
+    team_name     TEXT NOT NULL UNIQUE,
+    stadium_id    INTEGER,
+    league_order  INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY (stadium_id) REFERENCES Stadium(stadium_id)
+);
+
+-- One row per derby, in one direction only
+CREATE TABLE IF NOT EXISTS Derby (
+    team_id     INTEGER NOT NULL,
+    rival_id    INTEGER NOT NULL,
+    derby_name  TEXT NOT NULL,
+    PRIMARY KEY (team_id, rival_id),
+    FOREIGN KEY (team_id) REFERENCES Team(team_id),
+    FOREIGN KEY (rival_id) REFERENCES Team(team_id)
+);
+
+CREATE TABLE IF NOT EXISTS EconomicContext (
+    year                         INTEGER NOT NULL,
+    quarter                      INTEGER NOT NULL,
+    gdp_real_lagq                REAL NOT NULL,
+    cpi_qoq_growth_pct_lagq      REAL NOT NULL,
+    employment_rate_pct_lagq     REAL NOT NULL,
+    PRIMARY KEY (year, quarter)
+);
+
+CREATE TABLE IF NOT EXISTS Match (
+    match_id             INTEGER PRIMARY KEY,
+    competition          TEXT NOT NULL,
+    match_date           TEXT NOT NULL,
+    time_hour            INTEGER NOT NULL,
+    season               TEXT NOT NULL,
+    year                 INTEGER NOT NULL,
+    quarter              INTEGER NOT NULL,
+    month                INTEGER NOT NULL,
+    day_of_month         INTEGER NOT NULL,
+    stadium_id           INTEGER NOT NULL,
+    match_type           TEXT NOT NULL,
+    attendance           INTEGER NOT NULL,
+    percentage_attendance REAL,
+    weather_type         TEXT,
+    weather_quality      TEXT,
+    temperature_c        REAL,
+    derby_flag           INTEGER,
+    matchday_label       TEXT,
+    weekday              TEXT,
+    game_day_type        TEXT,
+    time_slot            TEXT,
+    FOREIGN KEY (stadium_id) REFERENCES Stadium(stadium_id),
+    FOREIGN KEY (year, quarter) REFERENCES EconomicContext(year, quarter)
+);
+
+CREATE TABLE IF NOT EXISTS MatchParticipation (
+    match_id             INTEGER NOT NULL,
+    team_id              INTEGER NOT NULL,
+    is_home              INTEGER NOT NULL,
+    ranking_at_match     INTEGER,
+    goals_scored         INTEGER,
+    outcome              TEXT,
+    goals_scored_last5   REAL,
+    goals_conceded_last5 REAL,
+    wins_last5           REAL,
+    team_category        TEXT,
+    opponent_category    TEXT,
+    PRIMARY KEY (match_id, team_id, is_home),
+    FOREIGN KEY (match_id) REFERENCES Match(match_id),
+    FOREIGN KEY (team_id) REFERENCES Team(team_id)
+);
+"""
+
+STADIUM_COLUMNS = ["Stadium", "Max Capacity", "City", "Province", "Full Roof"]
+
+
+############################## TABLES FROM THE CLEANED DATA ##############################
+
+def prepare(df, first_match_id=1):
+    """Add match_id (row order) and the typed date / time fields."""
+    df = df.copy()
+    df["match_id"] = range(first_match_id, first_match_id + len(df))
+    df["match_date"] = pd.to_datetime(df["Date"], format="%Y-%m-%d")
+    df["time_hour"] = df["Time"].astype(int)
+    df["month"] = df["Month"].astype(int)
+    df["day_of_month"] = df["Day"].astype(int)
+    return df
+
+
+def stadium_table(stadium_dim):
+    stadiums = stadium_dim.rename(columns={
+        "Stadium": "stadium_name",
+        "Max Capacity": "max_capacity",
+        "City": "city",
+        "Province": "province",
+        "Full Roof": "full_roof",
+    })
+    coordinates = stadiums["stadium_name"].map(static_data.stadium_coordinates)
+    stadiums["latitude"] = [c[0] if isinstance(c, tuple) else None for c in coordinates]
+    stadiums["longitude"] = [c[1] if isinstance(c, tuple) else None for c in coordinates]
+    return stadiums
+
+
+def league_stadiums(stadium_dim):
+    """Append the stadiums of league clubs that have no match in the data yet (e.g. a promoted club)."""
+    known = set(stadium_dim["Stadium"])
+    new = pd.DataFrame(
+        [info for info in dict.fromkeys(static_data.league_clubs.values()) if info[0] not in known],
+        columns=STADIUM_COLUMNS,
+    )
+    new.insert(0, "stadium_id", range(len(stadium_dim) + 1, len(stadium_dim) + len(new) + 1))
+    return pd.concat([stadium_dim, new], ignore_index=True)
+
+
+def team_table(team_names, stadiums):
+    """Teams with ids in alphabetical order, plus the home stadium and list order of the league clubs."""
+    stadium_ids = dict(zip(stadiums["stadium_name"], stadiums["stadium_id"]))
+    league_order = {name: order for order, name in enumerate(static_data.league_clubs, 1)}
+    return pd.DataFrame({
+        "team_id": range(1, len(team_names) + 1),
+        "team_name": team_names,
+        "stadium_id": [
+            stadium_ids[static_data.league_clubs[name][0]] if name in league_order else None
+            for name in team_names
+        ],
+        "league_order": [league_order.get(name, 0) for name in team_names],
+    })
+
+
+def derby_table(teams):
+    team_ids = dict(zip(teams["team_name"], teams["team_id"]))
+    return pd.DataFrame(
+        [(team_ids[home], team_ids[away], name) for (home, away), name in static_data.derbies.items()],
+        columns=["team_id", "rival_id", "derby_name"],
+    )
+
+
+def economic_table(df):
+    return (
+        df[["Year", "quarter", "GDP_Real_lagQ", "CPI_QoQ_Growth_%_lagQ", "Employment_Rate_%_lagQ"]]
+        # One row per quarter: rows cleaned after a revision carry the latest values
+        .drop_duplicates(subset=["Year", "quarter"], keep="last")
+        .rename(columns={
+            "Year": "year",
+            "quarter": "quarter",
+            "GDP_Real_lagQ": "gdp_real_lagq",
+            "CPI_QoQ_Growth_%_lagQ": "cpi_qoq_growth_pct_lagq",
+            "Employment_Rate_%_lagQ": "employment_rate_pct_lagq",
+        })
+    )
+
+
+def match_table(df):
+    match_db = pd.DataFrame({
+        "match_id": df["match_id"],
+        "competition": df["Competition"],
+        "match_date": df["match_date"].dt.strftime("%Y-%m-%d"),
+        "time_hour": df["time_hour"],
+        "season": df["Season"],
+        "year": df["Year"],
+        "quarter": df["quarter"],
+        "month": df["month"],
+        "day_of_month": df["day_of_month"],
+        "stadium_id": df["stadium_id"],
+        "match_type": df["Match Type"],
+        "attendance": df["Attendance"],
+        "percentage_attendance": df["PercentageAttendance"],
+        "weather_type": df["Weather"],
+        "weather_quality": df["Weather GoodBad"],
+        "temperature_c": df["Temperature (°C)"],
+        "derby_flag": df["Derby"],
+        "matchday_label": df["Matchday"].astype(str),
+        "weekday": df["Weekday"],
+        "game_day_type": df["Game day"],
+        "time_slot": df["Time slot"],
+    })
+    return match_db.drop_duplicates(subset=["match_id"])
+
+
+def participation_table(df):
+    """Two rows per match: the home team (with its last-5 form) and the away team."""
+    home_mp = pd.DataFrame({
+        "match_id": df["match_id"],
+        "team_id": df["home_team_id"],
+        "is_home": 1,
+        "ranking_at_match": df["Ranking Home Team"],
+        "goals_scored": df["Home Team Goals Scored"],
+        "outcome": df["Home Team Outcome"],
+        "goals_scored_last5": df["Goals Scored in Last 5 Games"],
+        "goals_conceded_last5": df["Goals Conceded in Last 5 Games"],
+        "wins_last5": df["Number of Wins in Last 5 Games"],
+        "team_category": df["Home team Category"],
+        "opponent_category": df["Opposing team Category"],
+    })
+
+    away_mp = pd.DataFrame({
+        "match_id": df["match_id"],
+        "team_id": df["away_team_id"],
+        "is_home": 0,
+        "ranking_at_match": df["Ranking Away Team"],
+        "goals_scored": df["Away Team Goals Scored"],
+        "outcome": df["Away Team Outcome"],
+        "goals_scored_last5": None,
+        "goals_conceded_last5": None,
+        "wins_last5": None,
+        "team_category": df["Opposing team Category"],
+        "opponent_category": df["Home team Category"],
+    })
+
+    return pd.concat([home_mp, away_mp], ignore_index=True)
+
+
+############################## BULK LOADING ##############################
+
+# Applied to every connection to football.db (the journal mode is set by writer())
+PRAGMAS = {
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+    "cache_size": -64000,  # 64 MB
+    "foreign_keys": "ON",
+}
+
+# Secondary indexes, created after the bulk load
+index_sql = """
+-- Training join (4.ML_dev&save) and match lookups by date / stadium / season
+CREATE INDEX IF NOT EXISTS idx_match_date ON Match (match_date);
+CREATE INDEX IF NOT EXISTS idx_match_stadium ON Match (stadium_id);
+CREATE INDEX IF NOT EXISTS idx_match_season_month ON Match (season, month);
+CREATE INDEX IF NOT EXISTS idx_match_quarter ON Match (year, quarter);
+-- Per-team history (covering: match ids are chronological, so this is also (team, date) order)
+CREATE INDEX IF NOT EXISTS idx_participation_team
+    ON MatchParticipation (team_id, is_home, match_id, goals_scored, outcome);
+-- Home / away side of a match without touching the table
+CREATE INDEX IF NOT EXISTS idx_participation_side
+    ON MatchParticipation (match_id, is_home, team_id, goals_scored, outcome);
+"""
+
+# Primary key of every table, in load order (parents first)
+TABLE_KEYS = {
+    "Stadium": ["stadium_id"],
+    "Team": ["team_id"],
+    "Derby": ["team_id", "rival_id"],
+    "EconomicContext": ["year", "quarter"],
+    "Match": ["match_id"],
+    "MatchParticipation": ["match_id", "team_id", "is_home"],
+}
+
+
+def connect(db_path=DB_PATH):
+    """Connection to football.db with PRAGMAS applied."""
+    conn = sqlite3.connect(db_path)
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+@contextmanager
+def writer(db_path=DB_PATH):
+    """connect() for a build or an append: the file is in WAL mode while it runs.
+
+    WAL lets the app keep reading during the write. The file is checkpointed
+    and switched back to a rollback journal on exit, so the shipped database
+    can be opened from a read-only directory and leaves no -wal/-shm files.
+    """
+    conn = connect(db_path)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+        yield conn
+    finally:
+        try:
+            conn.execute("PRAGMA journal_mode = DELETE")
+        except sqlite3.OperationalError as error:
+            print(f"⚠️ {db_path} stays in WAL mode until the next write: {error}")
+        conn.close()
+
+
+def _records(frame):
+    """Rows as tuples of plain Python values (None for missing), ready for executemany."""
+    return list(frame.astype(object).where(frame.notna(), None).itertuples(index=False, name=None))
+
+
+def insert_rows(conn, table, frame, upsert=False):
+    """executemany INSERT of a DataFrame whose columns are the table's columns.
+
+    With upsert=True, rows whose primary key already exists are updated.
+    """
+    columns = list(frame.columns)
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    if upsert:
+        key = TABLE_KEYS[table]
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c not in key)
+        sql += f" ON CONFLICT ({', '.join(key)}) DO UPDATE SET {updates}"
+    conn.executemany(sql, _records(frame))
+
+
+# Columns that identify a stored row in upsert mode: the primary key, plus the
+# UNIQUE name of a dimension (a name that moved to another id must be deleted first)
+IDENTITY_COLUMNS = {
+    **TABLE_KEYS,
+    "Team": ["team_id", "team_name"],
+    "Stadium": ["stadium_id", "stadium_name"],
+}
+
+
+def _delete_missing(conn, table, frame):
+    """Delete the stored rows that are not in frame (upsert mode)."""
+    key = IDENTITY_COLUMNS[table]
+    stored = set(conn.execute(f"SELECT {', '.join(key)} FROM {table}").fetchall())
+    stale = stored - set(_records(frame[key]))
+    if stale:
+        conn.executemany(f"DELETE FROM {table} WHERE " + " AND ".join(f"{k} = ?" for k in key), sorted(stale))
+
+
+############################## FULL BUILD ##############################
+
+def reset_database(path):
+    path = Path(path)
+    for file in (path, path.with_name(path.name + "-wal"), path.with_name(path.name + "-shm")):
+        if file.exists():
+            file.unlink()
+
+
+def database_tables(csv_path=CLEANED_CSV_PATH):
+    """Every table of football.db as a DataFrame, {table: frame} in load order."""
+    df = prepare(pd.read_csv(csv_path))
+
+    # STADIUM dimension (ids in order of first appearance)
+    stadium_dim = df[STADIUM_COLUMNS].drop_duplicates().reset_index(drop=True)
+    stadium_dim.insert(0, "stadium_id", stadium_dim.index + 1)
+    df = df.merge(stadium_dim, on=STADIUM_COLUMNS, how="left")
+
+    stadium_db = stadium_table(league_stadiums(stadium_dim))
+
+    # TEAM dimension (ids in alphabetical order), with every current league club
+    team_names = sorted(set(df["Home Team"]) | set(df["Away Team"]) | set(static_data.league_clubs) | {"Unknown"})
+    team_db = team_table(team_names, stadium_db)
+    team_name_to_id = dict(zip(team_db.team_name, team_db.team_id))
+    df["home_team_id"] = df["Home Team"].map(team_name_to_id)
+    df["away_team_id"] = df["Away Team"].map(team_name_to_id)
+
+    return {
+        "Stadium": stadium_db,
+        "Team": team_db,
+        "Derby": derby_table(team_db),
+        "EconomicContext": economic_table(df),
+        "Match": match_table(df),
+        "MatchParticipation": participation_table(df),
+    }
+
+
+def build_stamp(db_path=DB_PATH):
+    """Stamp of the last full build or upsert (PRAGMA user_version), 0 if none.
+
+    Appends keep the stamp unless they revise the macro values of a stored
+    quarter: otherwise the existing rows did not change. Anything derived
+    from the match table (e.g. the training view) can rely on it to decide
+    between an incremental refresh and a rebuild.
+    """
+    if not Path(db_path).exists():
+        return 0
+    with closing(sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)) as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def build_database(csv_path=CLEANED_CSV_PATH, db_path=DB_PATH, upsert=False):
+    """Build football.db out of CleanedData.csv.
+
+    All tables are bulk-loaded with executemany in a single transaction, then
+    the secondary indexes are created and the planner statistics refreshed.
+
+    By default the file is deleted and rebuilt. With upsert=True the existing
+    database is updated in place instead: rows are inserted or updated by
+    primary key and rows that are no longer in the CSV are deleted, so readers
+    (the app) never see a missing or empty database. Either way a new
+    build_stamp() is recorded.
+    """
+    tables = database_tables(csv_path)
+    stamp = max(int(time.time()), build_stamp(db_path) + 1)
+    if not upsert:
+        reset_database(db_path)
+
+    with writer(db_path) as conn:
+        conn.executescript(schema_sql)
+        conn.execute("BEGIN")
+        try:
+            if upsert:
+                # Ids may move (e.g. a new team sorts before others): check the keys at commit
+                conn.execute("PRAGMA defer_foreign_keys = ON")
+                # Earlier matches may change: the form buffers and thresholds are replayed from scratch below
+                conn.execute(form.form_table_sql)
+                conn.execute("DELETE FROM TeamForm")
+                conn.execute(thresholds.threshold_table_sql)
+                conn.execute("DELETE FROM TeamAttendance")
+                # Team ids may have moved: the team averages of football.explain must be recomputed
+                if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'TeamAttribution'").fetchone():
+                    conn.execute("DELETE FROM TeamAttribution")
+                for table in reversed(TABLE_KEYS):
+                    _delete_missing(conn, table, tables[table])
+            for table, frame in tables.items():
+                insert_rows(conn, table, frame, upsert=upsert)
+            for statement in index_sql.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {stamp}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.execute("ANALYZE")
+        form.refresh(conn)
+        thresholds.refresh(conn)
+
+    print("Done. SQLite DB written to:", db_path)
+
+
+############################## INCREMENTAL ##############################
+
+def team_names(conn):
+    return {name for (name,) in conn.execute("SELECT team_name FROM Team")}
+
+
+def latest_match_date(conn):
+    """Date (YYYY-MM-DD) of the latest match, or None for an empty database."""
+    return conn.execute("SELECT MAX(match_date) FROM Match").fetchone()[0]
+
+
+def stored_matches(conn, seasons, months):
+    """Competition, Season, Month, Home Team and Away Team of the stored matches of these seasons and months."""
+    seasons = [str(s) for s in seasons]
+    months = [int(m) for m in months if pd.notna(m)]
+    columns = ["Competition", "Season", "Month", "Home Team", "Away Team"]
+    if not seasons or not months:
+        return pd.DataFrame(columns=columns)
+    rows = conn.execute(f"""
+        SELECT m.competition, m.season, m.month, t_home.team_name, t_away.team_name
+        FROM Match AS m
+        JOIN MatchParticipation AS mp_home ON mp_home.match_id = m.match_id AND mp_home.is_home = 1
+        JOIN MatchParticipation AS mp_away ON mp_away.match_id = m.match_id AND mp_away.is_home = 0
+        JOIN Team AS t_home ON t_home.team_id = mp_home.team_id
+        JOIN Team AS t_away ON t_away.team_id = mp_away.team_id
+        WHERE m.season IN ({",".join("?" * len(seasons))})
+          AND m.month IN ({",".join("?" * len(months))})
+    """, seasons + months).fetchall()
+    return pd.DataFrame(rows, columns=columns)
+
+
+def append_matches(conn, new_rows):
+    """Append cleaned matches (CleanedData.csv rows, in file order) to an existing database.
+
+    Every team must already be in Team; new stadiums are added in order of
+    first appearance, as a full build would number them. Quarters are
+    upserted: a stored quarter takes the values of the new rows, and a new
+    build_stamp() is recorded if they differ. The rows are written in one
+    transaction.
+    """
+    (last_id,) = conn.execute("SELECT COALESCE(MAX(match_id), 0) FROM Match").fetchone()
+    df = prepare(new_rows, first_match_id=last_id + 1)
+
+    team_name_to_id = dict(conn.execute("SELECT team_name, team_id FROM Team").fetchall())
+    df["home_team_id"] = df["Home Team"].map(team_name_to_id)
+    df["away_team_id"] = df["Away Team"].map(team_name_to_id)
+
+    stadium_ids = {
+        (name, capacity, city, province, roof): stadium_id
+        for stadium_id, name, capacity, city, province, roof in conn.execute(
+            "SELECT stadium_id, stadium_name, max_capacity, city, province, full_roof FROM Stadium")
+    }
+    new_stadiums = []
+    for key in df[STADIUM_COLUMNS].drop_duplicates().itertuples(index=False):
+        key = (key[0], int(key[1]), key[2], key[3], int(key[4]))
+        if key not in stadium_ids:
+            stadium_ids[key] = len(stadium_ids) + 1
+            new_stadiums.append((stadium_ids[key],) + key)
+    df["stadium_id"] = [
+        stadium_ids[(name, int(capacity), city, province, int(roof))]
+        for name, capacity, city, province, roof in df[STADIUM_COLUMNS].itertuples(index=False)
+    ]
+
+    econ = economic_table(df)
+    stored_quarters = {
+        (year, quarter): values
+        for year, quarter, *values in conn.execute(
+            "SELECT year, quarter, gdp_real_lagq, cpi_qoq_growth_pct_lagq, employment_rate_pct_lagq FROM EconomicContext")
+    }
+    revised = any(
+        (year, quarter) in stored_quarters and stored_quarters[(year, quarter)] != values
+        for year, quarter, *values in _records(econ)
+    )
+
+    conn.execute("BEGIN")
+    try:
+        if new_stadiums:
+            conn.executemany(
+                "INSERT INTO Stadium (stadium_id, stadium_name, max_capacity, city, province, full_roof, latitude, longitude) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [stadium + static_data.stadium_coordinates.get(stadium[1], (None, None)) for stadium in new_stadiums])
+        insert_rows(conn, "EconomicContext", econ, upsert=True)
+        insert_rows(conn, "Match", match_table(df))
+        insert_rows(conn, "MatchParticipation", participation_table(df))
+        if revised:
+            (old_stamp,) = conn.execute("PRAGMA user_version").fetchone()
+            conn.execute(f"PRAGMA user_version = {max(int(time.time()), old_stamp + 1)}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+    form.refresh(conn)
+    thresholds.refresh(conn)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build football.db from CleanedData.csv.")
+    parser.add_argument("csv", nargs="?", default=CLEANED_CSV_PATH, help="cleaned CSV (default: Data/CleanedData.csv)")
+    parser.add_argument("-o", "--output", default=DB_PATH, help="database file (default: Data/football.db)")
+    parser.add_argument("--upsert", action="store_true", help="update the existing database in place instead of rebuilding it")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    build_database(args.csv, args.output, upsert=args.upsert)
+    print(f"✅ Built in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
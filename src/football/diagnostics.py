@@ -0,0 +1,148 @@
+"""Multicollinearity check of a feature table: every VIF at once.
+
+The variance inflation factor of a column is 1 / (1 - R²) of the regression
+of that column on all the others (with an intercept). The ML notebook used
+to run statsmodels' variance_inflation_factor once per column, i.e. one OLS
+fit per column. All of them are the diagonal of the inverse of the
+correlation matrix, so one symmetric eigendecomposition of that matrix gives
+every VIF at once.
+
+When some columns are exact linear combinations of others (the one-hot
+groups encoded with drop_first=False always sum to 1, and Game day_Weekend
+is Weekday_Saturday + Weekday_Sunday) the correlation matrix is singular. The
+eigenvectors of its zero eigenvalues then say which columns are involved:
+their VIF is infinite (R² = 1, as statsmodels reports it), every dependency
+is listed with the columns it involves, and the other columns get their VIF
+from the pseudo-inverse. A column that never varies has no VIF (NaN).
+
+Run it on the training matrix before training (from the src/ folder):
+
+    python -m football.diagnostics                        # Data/training_view, every column
+    python -m football.diagnostics --model without_weather --threshold 5
+
+or on any numeric DataFrame (the notebook does):
+
+    from football.diagnostics import vif_table
+    vif_table(df_model)
+"""
+
+import argparse
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+
+VIF_THRESHOLD = 10.0        # above this a column is usually considered redundant
+RANK_TOLERANCE = 1e-10      # eigenvalues below this times the largest one count as zero
+
+VIFReport = namedtuple("VIFReport", [
+    "table",                # DataFrame Feature / VIF, highest first
+    "collinear_groups",     # [[feature, ...]] one exact linear dependency each
+    "high",                 # features with a finite VIF above the threshold
+])
+
+
+def variance_inflation_factors(X, tolerance=RANK_TOLERANCE):
+    """(VIF of every column, exact linear dependencies as lists of column indices) of a numeric matrix."""
+    X = np.asarray(X, dtype=np.float64)
+    n_columns = X.shape[1]
+    vif = np.full(n_columns, np.nan)
+    std = X.std(axis=0)
+    varying = np.flatnonzero(std > 0)
+    if len(varying) == 0:
+        return vif, []
+    if len(varying) == 1:
+        vif[varying] = 1.0
+        return vif, []
+
+    Z = (X[:, varying] - X[:, varying].mean(axis=0)) / std[varying]
+    correlation = Z.T @ Z / len(Z)
+
+    # diag(inverse) = sum_k V[i, k]² / w[k]; with zero eigenvalues, the pseudo-inverse keeps the others
+    eigenvalues, eigenvectors = np.linalg.eigh(correlation)
+    null = eigenvalues <= tolerance * eigenvalues[-1]
+    squared = eigenvectors ** 2
+    vif[varying] = squared[:, ~null] @ (1 / eigenvalues[~null])
+
+    groups = []
+    if null.any():
+        # A column is an exact combination of others iff it has weight in a null vector
+        null_vectors = eigenvectors[:, null].T
+        vif[varying[(np.abs(null_vectors) > np.sqrt(tolerance)).any(axis=0)]] = np.inf
+        groups = [[int(varying[i]) for i in dependency] for dependency in _dependencies(null_vectors)]
+    return vif, groups
+
+
+def _dependencies(null_vectors, tolerance=1e-8):
+    """The column sets of a sparse basis of the null space (reduced row echelon form of its vectors).
+
+    The eigenvectors of a repeated zero eigenvalue are arbitrary mixes of the
+    dependencies; row-reducing them gives one short dependency per row, e.g.
+    Weekday_Saturday + Weekday_Sunday = Game day_Weekend.
+    """
+    A = null_vectors.copy()
+    row = 0
+    for column in range(A.shape[1]):
+        if row == len(A):
+            break
+        pivot = row + int(np.argmax(np.abs(A[row:, column])))
+        if abs(A[pivot, column]) < tolerance:
+            continue
+        A[[row, pivot]] = A[[pivot, row]]
+        A[row] /= A[row, column]
+        others = np.arange(len(A)) != row
+        A[others] -= np.outer(A[others, column], A[row])
+        row += 1
+    return [np.flatnonzero(np.abs(vector) > tolerance ** 0.5).tolist() for vector in A[:row]]
+
+
+def vif_table(frame, tolerance=RANK_TOLERANCE):
+    """DataFrame Feature / VIF of every column of a numeric DataFrame, highest first."""
+    return check(frame, tolerance=tolerance, verbose=False).table
+
+
+def check(frame, threshold=VIF_THRESHOLD, tolerance=RANK_TOLERANCE, verbose=True):
+    """Compute the VIFs of a feature table and report the problems; return a VIFReport."""
+    columns = list(frame.columns)
+    vif, groups = variance_inflation_factors(frame.to_numpy(dtype=np.float64), tolerance)
+    table = pd.DataFrame({"Feature": columns, "VIF": vif}).sort_values(
+        "VIF", ascending=False, kind="stable", ignore_index=True)
+    collinear_groups = [[columns[i] for i in group] for group in groups]
+    high = [column for column, value in zip(columns, vif) if np.isfinite(value) and value > threshold]
+    if verbose:
+        for group in collinear_groups:
+            print(f"⚠️ Exactly collinear: {', '.join(group)}")
+        if high:
+            print(f"⚠️ VIF above {threshold:g}: " + ", ".join(
+                f"{column} ({value:.1f})" for column, value in zip(columns, vif) if column in high))
+        if not collinear_groups and not high:
+            print(f"✅ No VIF above {threshold:g} among {len(columns)} features")
+    return VIFReport(table, collinear_groups, high)
+
+
+def main(argv=None):
+    from football import training_view
+    from football.features import model_columns
+    from football.paths import MODEL_WITH_WEATHER_PATH, MODEL_WITHOUT_WEATHER_PATH
+    from football.resources import load_model
+
+    parser = argparse.ArgumentParser(description="Variance inflation factors of the training matrix.")
+    parser.add_argument("--model", choices=["with_weather", "without_weather"],
+                        help="only the features of this model (default: every column of the training view)")
+    parser.add_argument("--threshold", type=float, default=VIF_THRESHOLD, help=f"(default: {VIF_THRESHOLD:g})")
+    parser.add_argument("--top", type=int, default=15, help="rows of the table to print (default: 15)")
+    args = parser.parse_args(argv)
+
+    view = training_view.refresh()
+    frame = pd.DataFrame(view.X, columns=view.columns)
+    if args.model:
+        path = MODEL_WITH_WEATHER_PATH if args.model == "with_weather" else MODEL_WITHOUT_WEATHER_PATH
+        frame = frame.reindex(columns=list(model_columns(load_model(path))), fill_value=0.0)
+
+    report = check(frame, args.threshold)
+    print(report.table.head(args.top).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""Why this number: exact per-prediction feature contributions (TreeSHAP).
+
+The ML notebook explains the model with shap's permutation explainer, which
+calls predict() thousands of times and only gives a global importance table.
+For tree ensembles the SHAP values can be computed exactly by walking the
+tree paths once (TreeSHAP), and XGBoost does it itself:
+booster.predict(..., pred_contribs=True). It takes a few milliseconds for one
+match, and a single call covers the whole training set.
+
+A contribution is in percentage points of the stadium. The contributions of
+a match and the base value (the average prediction over the training data)
+add up to its prediction exactly. The one-hot dummies of a column (e.g. the
+Home Team_* columns) are summed into that column, so the breakdown reads
+"Home Team: Club Brugge +6.1 points".
+
+The average contributions over every home game of each team are stored in
+football.db (table TeamAttribution), next to a digest of the model file they
+were computed with, so the app can put "usual for this club" next to the
+contributions of a match. A database upsert clears them (team ids may move).
+Rebuild them after training the models, or after rebuilding or upserting the
+database (from the src/ folder):
+
+    python -m football.explain
+
+From Python (see also core.AttendancePredictor.explain):
+
+    from football.explain import explainer_for
+    explainer_for(model).explain(row)      # one encoded row -> (base value, {feature: points})
+"""
+
+import argparse
+import functools
+import sqlite3
+import time
+from collections import namedtuple
+from contextlib import closing
+
+import numpy as np
+import xgboost
+
+from football import db, training_view
+from football.features import encoder_for, model_columns
+from football.paths import DB_PATH, MODEL_WITH_WEATHER_PATH, MODEL_WITHOUT_WEATHER_PATH
+from football.resources import file_digest, load_cached, load_model
+
+
+MODEL_PATHS = {
+    "with_weather": MODEL_WITH_WEATHER_PATH,
+    "without_weather": MODEL_WITHOUT_WEATHER_PATH,
+}
+
+attribution_table_sql = """
+CREATE TABLE IF NOT EXISTS TeamAttribution (
+    team_id            INTEGER NOT NULL,
+    model              TEXT NOT NULL,
+    feature            TEXT NOT NULL,
+    mean_contribution  REAL NOT NULL,
+    home_games         INTEGER NOT NULL,
+    model_digest       TEXT NOT NULL,
+    PRIMARY KEY (team_id, model, feature),
+    FOREIGN KEY (team_id) REFERENCES Team(team_id)
+) WITHOUT ROWID;
+"""
+
+# One line of a breakdown; contribution and team_average in percentage points
+Contribution = namedtuple("Contribution", ["feature", "value", "contribution", "team_average"])
+
+Explanation = namedtuple("Explanation", [
+    "model",              # with_weather / without_weather
+    "base_value",         # average prediction over the training data, percent of the stadium
+    "prediction",         # base_value + every contribution
+    "contributions",      # [Contribution], largest effect first
+])
+
+
+class TreeExplainer:
+    """TreeSHAP contributions of one fitted model, summed per raw feature."""
+
+    def __init__(self, model):
+        self.booster = model.get_booster()
+        self.columns = model_columns(model)
+        encoder = encoder_for(self.columns)
+
+        # Raw feature of every model column: a numeric feature is its own, a dummy belongs to its column
+        group_of = [None] * encoder.n_features
+        for column, index in encoder.numeric:
+            group_of[index] = column
+        for column, lookup in encoder.dummies.items():
+            for index in lookup.values():
+                group_of[index] = column
+        self.features = list(dict.fromkeys(group_of))
+        self.membership = np.zeros((encoder.n_features, len(self.features)), dtype=np.float64)
+        self.membership[np.arange(encoder.n_features), [self.features.index(g) for g in group_of]] = 1.0
+
+    def __repr__(self):
+        return f"TreeExplainer({len(self.columns)} columns, {len(self.features)} features)"
+
+    def contributions(self, X):
+        """(n_rows, n_features + 1) exact SHAP values of the encoded rows, the last column the base value."""
+        X = np.asarray(X, dtype=np.float32).reshape(-1, len(self.columns))
+        return self.booster.predict(xgboost.DMatrix(X, feature_names=list(self.columns)), pred_contribs=True)
+
+    def grouped(self, X):
+        """(contributions per raw feature (n_rows, len(features)), base values (n_rows,)), as shares."""
+        contributions = self.contributions(X).astype(np.float64)
+        return contributions[:, :-1] @ self.membership, contributions[:, -1]
+
+    def explain(self, row):
+        """(base value, {raw feature: contribution}) of one encoded row, in percentage points (memoised)."""
+        row = np.asarray(row, dtype=np.float32).reshape(-1)
+        return _explain_row(self, row.tobytes())
+
+
+@functools.lru_cache(maxsize=1024)
+def _explain_row(explainer, row_bytes):
+    grouped, base = explainer.grouped(np.frombuffer(row_bytes, dtype=np.float32))
+    return float(base[0]) * 100, dict(zip(explainer.features, (grouped[0] * 100).tolist()))
+
+
+@functools.lru_cache(maxsize=8)
+def explainer_for(model):
+    """The TreeExplainer of a loaded model, built once per model object."""
+    return TreeExplainer(model)
+
+
+def explanation(model, row, features, model_name, team_average=None, top=None):
+    """The Explanation of one encoded row.
+
+    `features` is the raw feature dict of the match (match_features()), for
+    the values shown next to the contributions; `team_average` maps a raw
+    feature to the home team's usual contribution (read_team_average()).
+    With `top`, the smaller contributions are summed into one "Other
+    features" line.
+    """
+    explainer = explainer_for(model)
+    base_value, contributions = explainer.explain(row)
+    team_average = team_average or {}
+    # A numeric feature the match description leaves out (e.g. match_id) is encoded as 0
+    encoded = dict(zip(explainer.columns, np.asarray(row, dtype=float).reshape(-1).tolist()))
+    lines = sorted(
+        (Contribution(feature, features.get(feature, encoded.get(feature)), value, team_average.get(feature))
+         for feature, value in contributions.items()),
+        key=lambda line: abs(line.contribution), reverse=True,
+    )
+    if top is not None and len(lines) > top:
+        rest = lines[top:]
+        other_average = [line.team_average for line in rest if line.team_average is not None]
+        lines = lines[:top] + [Contribution(
+            f"Other features ({len(rest)})", None, sum(line.contribution for line in rest),
+            sum(other_average) if other_average else None,
+        )]
+    return Explanation(
+        model=model_name,
+        base_value=base_value,
+        prediction=base_value + sum(contributions.values()),
+        contributions=lines,
+    )
+
+
+############################## PER-TEAM AVERAGES ##############################
+
+def team_averages(rows, model):
+    """{home team: ({raw feature: mean contribution in points}, home games)} over the training rows."""
+    explainer = explainer_for(model)
+    grouped, _ = explainer.grouped(encoder_for(explainer.columns).encode_frame(rows))
+    teams = rows["Home Team"].to_numpy()
+    averages = {}
+    for team in np.unique(teams):
+        selected = teams == team
+        means = grouped[selected].mean(axis=0) * 100
+        averages[str(team)] = (dict(zip(explainer.features, means.tolist())), int(selected.sum()))
+    return averages
+
+
+def refresh(db_path=DB_PATH, models=None):
+    """Recompute TeamAttribution for both shipped models; return {model name: number of teams}."""
+    models = models or {name: (load_model(path), file_digest(path)) for name, path in MODEL_PATHS.items()}
+    with db.writer(db_path) as conn:
+        rows, _ = training_view.training_rows(training_view.prepare(training_view.read_training_frame(conn)))
+        team_ids = dict(conn.execute("SELECT team_name, team_id FROM Team").fetchall())
+
+        conn.execute(attribution_table_sql)
+        conn.execute("BEGIN")
+        try:
+            counts = {}
+            for name, (model, digest) in models.items():
+                averages = team_averages(rows, model)
+                conn.execute("DELETE FROM TeamAttribution WHERE model = ?", (name,))
+                conn.executemany(
+                    "INSERT INTO TeamAttribution (team_id, model, feature, mean_contribution, home_games, model_digest) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (team_ids[team], name, feature, value, games, digest)
+                        for team, (means, games) in averages.items()
+                        for feature, value in means.items()
+                    ],
+                )
+                counts[name] = len(averages)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    return counts
+
+
+def read_attributions(db_path):
+    """{(team name, model name): (model digest, {raw feature: mean contribution})} ({} before the first refresh)."""
+    try:
+        with closing(sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)) as conn:
+            rows = conn.execute("""
+                SELECT t.team_name, a.model, a.model_digest, a.feature, a.mean_contribution
+                FROM TeamAttribution AS a JOIN Team AS t ON t.team_id = a.team_id
+            """).fetchall()
+    except sqlite3.Error:
+        return {}
+    attributions = {}
+    for team, model, digest, feature, value in rows:
+        attributions.setdefault((team, model), (digest, {}))[1][feature] = value
+    return attributions
+
+
+def read_team_average(team, model_name, db_path=DB_PATH):
+    """The usual contributions of `team`'s home games, {raw feature: points}; {} if none or stale.
+
+    Stored averages computed with another model file than the current one are
+    ignored. Both files are only stat'ed per call (see resources.load_cached).
+    """
+    digest, averages = load_cached(db_path, read_attributions).get((team, model_name), (None, {}))
+    if digest is None or digest != load_cached(MODEL_PATHS[model_name], file_digest):
+        return {}
+    return averages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Store the average feature contributions of every team's home games.")
+    parser.add_argument("--db", default=DB_PATH, help="database file (default: Data/football.db)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    counts = refresh(args.db)
+    print(f"✅ TeamAttribution rebuilt in {time.perf_counter() - start:.2f} s: "
+          + ", ".join(f"{name} ({n} teams)" for name, n in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""One-hot feature encoding shared by the app and the training notebook.
+
+The models expect a fixed, ordered list of columns: numeric features such as
+"Time" or "Max Capacity", plus one-hot dummies named "<column>_<value>" (the
+naming pd.get_dummies uses). FeatureEncoder works out once, from that list,
+which index every numeric feature and every categorical value lands on. A
+match description can then be written straight into a float32 NumPy row,
+without building a DataFrame or inserting columns one by one.
+
+The match_features() helpers below turn what the user picks (teams, date,
+time, rankings, weather) into those raw feature values, for a single match or
+for a whole fixture list at once.
+"""
+
+import functools
+
+import numpy as np
+import pandas as pd
+
+from football import macro, registry
+
+
+# Raw columns that the notebooks one-hot encode
+categorical_columns = [
+    "Matchday",
+    "Home Team",
+    "Away Team",
+    "Weather",
+    "Weekday",
+    "Home team Category",
+    "Opposing team Category",
+    "Game day",
+    "Time slot",
+    "Weather GoodBad",
+]
+
+
+class FeatureEncoder:
+    """Encode match descriptions into rows ordered like a model's feature list.
+
+    Categorical values that have no column in the list (e.g. the dummy dropped
+    by drop_first=True, or a team the model never saw) simply leave every
+    dummy of that column at 0, exactly like get_dummies followed by a reindex.
+    Numeric features missing from the description are 0 as well.
+    """
+
+    def __init__(self, columns, categorical=categorical_columns):
+        self.columns = list(columns)
+        self.n_features = len(self.columns)
+        self.dtype = np.float32
+
+        # Longest prefix first, so "Weather GoodBad_Good" is not read as Weather="GoodBad_Good"
+        prefixes = sorted(categorical, key=len, reverse=True)
+
+        self.numeric = []      # [(raw column, index)]
+        self.dummies = {}      # raw column -> {value as str: index}
+        for index, column in enumerate(self.columns):
+            prefix = next((p for p in prefixes if column.startswith(p + "_")), None)
+            if prefix is None:
+                self.numeric.append((column, index))
+            else:
+                self.dummies.setdefault(prefix, {})[column[len(prefix) + 1:]] = index
+
+    def __repr__(self):
+        return f"FeatureEncoder({self.n_features} columns, {len(self.dummies)} categorical)"
+
+    def encode(self, match, out=None):
+        """Return one float32 row for a single match (a dict of raw feature values).
+
+        Pass `out` (an array of n_features) to reuse a buffer instead of
+        allocating a new row.
+        """
+        row = np.zeros(self.n_features, dtype=self.dtype) if out is None else out
+        if out is not None:
+            row.fill(0)
+
+        for column, index in self.numeric:
+            value = match.get(column, 0.0)
+            row[index] = np.nan if value is None else value
+        for column, lookup in self.dummies.items():
+            index = lookup.get(str(match.get(column)))
+            if index is not None:
+                row[index] = 1.0
+        return row
+
+    def encode_frame(self, frame):
+        """Return an (n_rows, n_features) float32 matrix for many matches at once.
+
+        `frame` can be a DataFrame or any mapping of column name -> sequence.
+        As in encode(), a numeric value of None becomes NaN (XGBoost treats it
+        as missing) and a missing column stays at 0.
+        """
+        n_rows = len(next(iter(frame.values()))) if isinstance(frame, dict) else len(frame)
+        matrix = np.zeros((n_rows, self.n_features), dtype=self.dtype)
+        if n_rows == 0:
+            return matrix
+
+        for column, index in self.numeric:
+            if column in frame:
+                matrix[:, index] = np.asarray(frame[column], dtype=float)
+
+        all_rows = np.arange(n_rows)
+        for column, lookup in self.dummies.items():
+            if column not in frame:
+                continue
+            # Look up each distinct value once, then scatter the 1s with fancy indexing
+            values, inverse = np.unique(np.asarray(frame[column]).astype(str), return_inverse=True)
+            value_index = np.array([lookup.get(value, -1) for value in values])[inverse.ravel()]
+            hit = value_index >= 0
+            matrix[all_rows[hit], value_index[hit]] = 1.0
+        return matrix
+
+
+@functools.lru_cache(maxsize=None)
+def encoder_for(columns):
+    """Return the FeatureEncoder for a tuple of columns, built once per process."""
+    return FeatureEncoder(columns)
+
+
+def model_columns(model):
+    """Return the ordered feature names a fitted model was trained on.
+
+    Model artifacts carry them in the booster (checked against the manifest
+    when the file is loaded, see artifacts.py), so there is no hand-copied
+    list that could drift from the saved model.
+    """
+    names = getattr(model, "feature_names_in_", None)
+    if names is None:
+        raise ValueError("The model has no feature names; load it with football.artifacts.load_artifact")
+    return tuple(str(name) for name in names)
+
+
+############################## MATCH DESCRIPTION ##############################
+
+# Weather conditions the forecast can return, split into Good / Bad
+good_weather_conditions = ["Clear or mostly clear", "Partly cloudy"]
+bad_weather_conditions = ["Rainy", "Drizzle", "Snowy"]
+
+# Default rankings / last-5 form, used when the user (or a fixture file) gives none
+default_form = {
+    "ranking_home_team": 5,
+    "ranking_away_team": 8,
+    "goals_scored_home_last5": 6,
+    "goals_conceded_home_last5": 5,
+    "wins_home_last5": 3,
+    "goals_scored_away_last5": 5,
+}
+
+
+# --- team categories from ranking (for the Home/Opposing team Category_* dummies) ---
+def categorize_team(r):
+    if r is None:
+        return "Unknown"
+    try:
+        r = int(r)
+    except ValueError:
+        return "Unknown"
+
+    if r <= 4:
+        return "Top ranked"
+    elif r <= 8:
+        return "Medium ranked"
+    elif r <= 16:
+        return "Bottom ranked"
+    else:
+        return "Not ranked"
+
+
+# --- time slot (Afternoon / Evening / Night) for Time slot_* dummies ---
+# Must match the notebook logic: h < 18 = Afternoon, 18 <= h < 20 = Evening, else Night
+def time_slot_for_hour(hour):
+    if hour < 18:
+        return "Afternoon"
+    elif 18 <= hour < 20:
+        return "Evening"
+    else:
+        return "Night"
+
+
+# --- game day (Weekday / Weekend) for Game day_* dummies ---
+def game_day_for_date(date):
+    return "Weekend" if date.weekday() >= 5 else "Weekday"
+
+
+# --- Weather GoodBad (Good / Bad); unknown or missing weather counts as Good ---
+def weather_goodbad(condition):
+    return "Bad" if condition in bad_weather_conditions else "Good"
+
+
+def is_derby(home_team, away_team, teams=None):
+    teams = teams or registry.current()
+    return bool(teams.derby[teams.id_of(home_team), teams.id_of(away_team)])
+
+
+def has_usable_weather(temperature, condition):
+    """True when the with-weather model can be trusted for this match."""
+    return temperature is not None and condition is not None and condition != "Unknown"
+
+
+def match_features(home_team, away_team, match_date, match_hour, matchday,
+                   ranking_home_team, ranking_away_team,
+                   goals_scored_home_last5, goals_conceded_home_last5, wins_home_last5,
+                   goals_scored_away_last5, temperature=None, weather_condition=None, teams=None,
+                   macro_table=None):
+    """Return the raw feature dict for one match, ready for FeatureEncoder.encode.
+
+    Stadium and derby facts come from the team registry (registry.current()
+    unless `teams` is given); a home team it does not know gets 0. The macro
+    features are those of the quarter before the match, from the local macro
+    store (macro.current() unless `macro_table` is given).
+    """
+    teams = teams or registry.current()
+    macro_table = macro_table or macro.current()
+    home_id, away_id = teams.id_of(home_team), teams.id_of(away_team)
+    return {
+        # basic match info
+        'Matchday': matchday,
+        'Time': match_hour,
+        'Home Team': home_team,
+        'Away Team': away_team,
+        'Weekday': match_date.strftime("%A"),
+        'Month': match_date.month,
+        'Day': match_date.day,
+
+        # rankings
+        'Ranking Home Team': float(ranking_home_team),
+        'Ranking Away Team': float(ranking_away_team),
+
+        # recent form – home team, as in the training set
+        'Goals Scored in Last 5 Games': float(goals_scored_home_last5),
+        'Goals Conceded in Last 5 Games': float(goals_conceded_home_last5),
+        'Number of Wins in Last 5 Games': float(wins_home_last5),
+
+        # map last-5 goals into these features (so nothing stays at 0)
+        'Home Team Goals Scored': float(goals_scored_home_last5),
+        'Away Team Goals Scored': float(goals_scored_away_last5),
+
+        # weather (raw condition + numeric temperature)
+        'Weather': weather_condition,
+        'Temperature (°C)': float(temperature) if temperature is not None else 0.0,
+
+        # stadium features
+        'Derby': float(teams.derby[home_id, away_id]),
+        'Max Capacity': float(np.nan_to_num(teams.max_capacity[home_id])),
+        'Full Roof': float(np.nan_to_num(teams.full_roof[home_id])),
+
+        # macro features – previous available quarter
+        **macro_table.lagged_one(match_date),
+
+        # extra categorical vars for dummies
+        'Home team Category': categorize_team(ranking_home_team),
+        'Opposing team Category': categorize_team(ranking_away_team),
+        'Game day': game_day_for_date(match_date),
+        'Time slot': time_slot_for_hour(match_hour),
+        'Weather GoodBad': weather_goodbad(weather_condition),
+    }
+
+
+def match_feature_frame(fixtures, teams=None, macro_table=None):
+    """Vectorised match_features() for a whole fixture list.
+
+    `fixtures` is a DataFrame with one row per match and the columns home_team,
+    away_team, match_date, match_hour and matchday. The ranking / last-5 form
+    columns (see default_form) plus temperature and weather_condition are
+    optional. Returns a DataFrame with the same raw feature columns as
+    match_features(), ready for FeatureEncoder.encode_frame.
+    """
+    n_rows = len(fixtures)
+    dates = pd.to_datetime(fixtures["match_date"])
+    hours = fixtures["match_hour"].to_numpy(dtype=float)
+    home = fixtures["home_team"].astype(str)
+    away = fixtures["away_team"].astype(str)
+    teams = teams or registry.current()
+    home_ids, away_ids = teams.ids(home), teams.ids(away)
+    lagged = (macro_table or macro.current()).lagged_dates(dates)
+
+    def column(name, default):
+        if name in fixtures:
+            return fixtures[name].fillna(default).to_numpy(dtype=float)
+        return np.full(n_rows, float(default))
+
+    ranking_home = column("ranking_home_team", default_form["ranking_home_team"])
+    ranking_away = column("ranking_away_team", default_form["ranking_away_team"])
+    goals_home = column("goals_scored_home_last5", default_form["goals_scored_home_last5"])
+    goals_away = column("goals_scored_away_last5", default_form["goals_scored_away_last5"])
+
+    if "temperature" in fixtures:
+        temperature = fixtures["temperature"].to_numpy(dtype=float)
+    else:
+        temperature = np.full(n_rows, np.nan)
+    if "weather_condition" in fixtures:
+        weather = fixtures["weather_condition"].where(fixtures["weather_condition"].notna(), None)
+    else:
+        weather = pd.Series([None] * n_rows, index=fixtures.index, dtype=object)
+
+    def categorize(rankings):
+        return np.select(
+            [rankings <= 4, rankings <= 8, rankings <= 16],
+            ["Top ranked", "Medium ranked", "Bottom ranked"],
+            default="Not ranked",
+        )
+
+    return pd.DataFrame({
+        'Matchday': fixtures["matchday"].to_numpy(),
+        'Time': hours,
+        'Home Team': home.to_numpy(),
+        'Away Team': away.to_numpy(),
+        'Weekday': dates.dt.day_name().to_numpy(),
+        'Month': dates.dt.month.to_numpy(dtype=float),
+        'Day': dates.dt.day.to_numpy(dtype=float),
+        'Ranking Home Team': ranking_home,
+        'Ranking Away Team': ranking_away,
+        'Goals Scored in Last 5 Games': goals_home,
+        'Goals Conceded in Last 5 Games': column("goals_conceded_home_last5", default_form["goals_conceded_home_last5"]),
+        'Number of Wins in Last 5 Games': column("wins_home_last5", default_form["wins_home_last5"]),
+        'Home Team Goals Scored': goals_home,
+        'Away Team Goals Scored': goals_away,
+        'Weather': weather.to_numpy(),
+        'Temperature (°C)': np.nan_to_num(temperature, nan=0.0),
+        'Derby': teams.derby[home_ids, away_ids].astype(float),
+        'Max Capacity': np.nan_to_num(teams.max_capacity[home_ids]),
+        'Full Roof': np.nan_to_num(teams.full_roof[home_ids]),
+        **lagged,
+        'Home team Category': categorize(ranking_home),
+        'Opposing team Category': categorize(ranking_away),
+        'Game day': np.where(dates.dt.weekday.to_numpy() >= 5, "Weekend", "Weekday"),
+        'Time slot': np.select([hours < 18, hours < 20], ["Afternoon", "Evening"], default="Night"),
+        'Weather GoodBad': np.where(weather.isin(bad_weather_conditions).to_numpy(), "Bad", "Good"),
+    }, index=fixtures.index)
@@ -0,0 +1,294 @@
+"""Last-5 form of every team, kept up to date one match at a time.
+
+The model's form features are the goals scored, goals conceded and wins of
+the home team over its previous 5 home games. Instead of recomputing a
+rolling window over the whole match table, every team has a small ring
+buffer (a deque of the last 5 games) per venue, home and away. Adding a
+match is O(1) and the form going into the team's next game is the sum of its
+buffer.
+
+The buffers live in football.db (table TeamForm, one row per team and venue).
+They are refreshed after every build or append of the database, so the app
+and the batch scorer read the current form with a single primary-key lookup:
+
+    from football.form import current_form
+    current_form("Club Brugge", "KAA Gent")
+
+The cleaning notebook uses the same buffers (FormStore) to compute the
+training features, so training and serving cannot drift apart.
+"""
+
+import sqlite3
+from collections import deque
+from contextlib import closing
+
+import pandas as pd
+
+from football.paths import DB_PATH
+
+
+WINDOW = 5
+
+# Last 5 home games before the first scraped one, per team (goals scored / conceded, wins)
+historical_data = {
+    "Club Brugge": {"Goals Scored": [3, 0, 3, 1, 1], "Goals Conceded": [2, 2, 2, 0, 0], "Wins": [1, 0, 1, 1, 1]},
+    "Cercle Brugge": {"Goals Scored": [0, 0, 1, 2, 2], "Goals Conceded": [4, 3, 2, 3, 6], "Wins": [0, 0, 0, 0, 0]},
+    "Genk": {"Goals Scored": [0, 1, 2, 4, 1], "Goals Conceded": [0, 1, 3, 0, 0], "Wins": [0, 0, 0, 1, 1]},
+    "RSC Anderlecht": {"Goals Scored": [1, 1, 1, 2, 0], "Goals Conceded": [2, 1, 1, 1, 1], "Wins": [0, 0, 0, 1, 0]},
+    "Union SG": {"Goals Scored": [1, 2, 3, 2, 2], "Goals Conceded": [2, 0, 3, 2, 3], "Wins": [0, 1, 0, 1, 0]},
+    "KAA Gent": {"Goals Scored": [2, 2, 3, 1, 2], "Goals Conceded": [1, 1, 2, 1, 2], "Wins": [1, 1, 1, 0, 0]},
+    "Royal Antwerp": {"Goals Scored": [3, 2, 2, 1, 0], "Goals Conceded": [2, 3, 2, 1, 4], "Wins": [1, 0, 0, 1, 0]},
+    "KVC Westerlo": {"Goals Scored": [1, 0, 3, 2, 1], "Goals Conceded": [2, 2, 0, 3, 0], "Wins": [0, 0, 1, 0, 1]},
+    "Standard Liège": {"Goals Scored": [0, 2, 2, 2, 2], "Goals Conceded": [0, 0, 3, 2, 2], "Wins": [0, 1, 0, 0, 0]},
+    "KV Mechelen": {"Goals Scored": [2, 2, 0, 1, 0], "Goals Conceded": [1, 1, 1, 1, 1], "Wins": [0, 0, 0, 0, 0]},
+    "R Charleroi SC": {"Goals Scored": [2, 2, 2, 2, 3], "Goals Conceded": [3, 1, 0, 0, 0], "Wins": [0, 1, 1, 1, 1]},
+    "OH Leuven": {"Goals Scored": [1, 3, 3, 2, 0], "Goals Conceded": [0, 0, 0, 2, 1], "Wins": [1, 1, 1, 0, 0]},
+    "Sint-Truiden": {"Goals Scored": [2, 1, 2, 0, 2], "Goals Conceded": [1, 1, 2, 2, 2], "Wins": [1, 0, 0, 0, 0]},
+    "FCV Dender EH": {"Goals Scored": [3, 0, 1, 2, 1], "Goals Conceded": [3, 2, 2, 1, 2], "Wins": [0, 0, 0, 1, 0]},
+    "Zulte Waregem": {"Goals Scored": [2, 5, 0, 0, 6], "Goals Conceded": [1, 0, 5, 3, 2], "Wins": [1, 1, 0, 0, 1]},
+    "La Louvière": {"Goals Scored": [7, 4, 1, 1, 0], "Goals Conceded": [0, 1, 1, 1, 2], "Wins": [1, 1, 0, 0, 0]},
+}
+
+form_table_sql = """
+CREATE TABLE IF NOT EXISTS TeamForm (
+    team_id              INTEGER NOT NULL,
+    is_home              INTEGER NOT NULL,
+    games_played         INTEGER NOT NULL,
+    last_match_id        INTEGER NOT NULL,
+    recent_goals_scored  TEXT NOT NULL,
+    recent_goals_conceded TEXT NOT NULL,
+    recent_wins          TEXT NOT NULL,
+    goals_scored_last5   REAL,
+    goals_conceded_last5 REAL,
+    wins_last5           REAL,
+    PRIMARY KEY (team_id, is_home),
+    FOREIGN KEY (team_id) REFERENCES Team(team_id)
+) WITHOUT ROWID;
+"""
+
+
+class TeamForm:
+    """Ring buffers of one team's last games at one venue (oldest first)."""
+
+    __slots__ = ("team", "is_home", "games", "scored", "conceded", "wins")
+
+    def __init__(self, team, is_home, games=0, scored=(), conceded=(), wins=()):
+        self.team = team
+        self.is_home = is_home
+        self.games = games
+        self.scored = deque(scored, maxlen=WINDOW)
+        self.conceded = deque(conceded, maxlen=WINDOW)
+        self.wins = deque(wins, maxlen=WINDOW)
+
+    def push(self, scored, conceded, win):
+        self.games += 1
+        self.scored.append(float(scored))
+        self.conceded.append(float(conceded))
+        self.wins.append(float(win))
+
+    def totals(self):
+        """(goals scored, goals conceded, wins) over the last 5 games, going into the next one.
+
+        Before a team's 6th home game its window still reaches back before the
+        scrape, so historical_data is used (as in the training set).
+        """
+        if self.is_home and self.games < WINDOW and self.team in historical_data:
+            data = historical_data[self.team]
+            return sum(data["Goals Scored"]), sum(data["Goals Conceded"]), sum(data["Wins"])
+        return float(sum(self.scored)), float(sum(self.conceded)), float(sum(self.wins))
+
+
+class FormStore:
+    """Every team's TeamForm buffers, home and away."""
+
+    def __init__(self, last_match_id=0):
+        self.forms = {}
+        self.last_match_id = last_match_id
+
+    def form(self, team, is_home=True):
+        key = (team, bool(is_home))
+        form = self.forms.get(key)
+        if form is None:
+            form = self.forms[key] = TeamForm(team, bool(is_home))
+        return form
+
+    def add_match(self, home_team, away_team, home_goals, away_goals, home_outcome, match_id=None):
+        """Push one played match into the home team's home buffer and the away team's away buffer."""
+        self.form(home_team, True).push(home_goals, away_goals, home_outcome == "Win")
+        self.form(away_team, False).push(away_goals, home_goals, home_outcome == "Loss")
+        if match_id is not None:
+            self.last_match_id = max(self.last_match_id, int(match_id))
+
+    @classmethod
+    def load(cls, conn):
+        """Read the TeamForm table (an empty store if the database has none yet)."""
+        conn.execute(form_table_sql)
+        store = cls()
+        rows = conn.execute("""
+            SELECT t.team_name, f.is_home, f.games_played, f.last_match_id,
+                   f.recent_goals_scored, f.recent_goals_conceded, f.recent_wins
+            FROM TeamForm AS f JOIN Team AS t ON t.team_id = f.team_id
+        """).fetchall()
+        for team, is_home, games, last_match_id, scored, conceded, wins in rows:
+            store.forms[(team, bool(is_home))] = TeamForm(
+                team, bool(is_home), games, _floats(scored), _floats(conceded), _floats(wins))
+            store.last_match_id = max(store.last_match_id, last_match_id)
+        return store
+
+    def save(self, conn):
+        """Write every buffer to TeamForm (replacing the stored ones)."""
+        conn.execute(form_table_sql)
+        team_ids = dict(conn.execute("SELECT team_name, team_id FROM Team").fetchall())
+        rows = []
+        for (team, is_home), form in self.forms.items():
+            scored, conceded, wins = form.totals()
+            rows.append((
+                team_ids[team], int(is_home), form.games, self.last_match_id,
+                _text(form.scored), _text(form.conceded), _text(form.wins),
+                scored, conceded, wins,
+            ))
+        conn.execute("DELETE FROM TeamForm")
+        conn.executemany("INSERT INTO TeamForm VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.commit()
+
+
+def _text(values):
+    return ",".join(repr(v) for v in values)
+
+
+def _floats(text):
+    return [float(v) for v in text.split(",")] if text else []
+
+
+def refresh(conn):
+    """Bring TeamForm up to date with the Match table; return the store.
+
+    Only matches added since the last refresh are replayed (in match_id
+    order, i.e. chronologically), so after a weekly append this touches a
+    handful of rows.
+    """
+    store = FormStore.load(conn)
+    rows = conn.execute("""
+        SELECT m.match_id, t_home.team_name, t_away.team_name,
+               mp_home.goals_scored, mp_away.goals_scored, mp_home.outcome
+        FROM Match AS m
+        JOIN MatchParticipation AS mp_home ON mp_home.match_id = m.match_id AND mp_home.is_home = 1
+        JOIN MatchParticipation AS mp_away ON mp_away.match_id = m.match_id AND mp_away.is_home = 0
+        JOIN Team AS t_home ON t_home.team_id = mp_home.team_id
+        JOIN Team AS t_away ON t_away.team_id = mp_away.team_id
+        WHERE m.match_id > ?
+        ORDER BY m.match_id
+    """, (store.last_match_id,)).fetchall()
+    for match_id, home_team, away_team, home_goals, away_goals, outcome in rows:
+        store.add_match(home_team, away_team, _goals(home_goals), _goals(away_goals), outcome, match_id)
+    if rows:
+        store.save(conn)
+    return store
+
+
+def _goals(value):
+    return float("nan") if value is None else value
+
+
+def current_form(home_team, away_team, db_path=DB_PATH):
+    """Form going into a match, as the keyword arguments of features.match_features.
+
+    Returns goals_scored_home_last5, goals_conceded_home_last5 and
+    wins_home_last5 (home team, last 5 home games) and goals_scored_away_last5
+    (away team, last 5 away games). Teams without stored form are left out,
+    so the caller's defaults apply.
+    """
+    try:
+        with closing(sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)) as conn:
+            rows = conn.execute("""
+                SELECT f.is_home, f.goals_scored_last5, f.goals_conceded_last5, f.wins_last5
+                FROM Team AS t JOIN TeamForm AS f ON f.team_id = t.team_id
+                WHERE (t.team_name = ? AND f.is_home = 1) OR (t.team_name = ? AND f.is_home = 0)
+            """, (home_team, away_team)).fetchall()
+    except sqlite3.Error:
+        rows = []
+
+    stored = {bool(is_home): (scored, conceded, wins) for is_home, scored, conceded, wins in rows}
+    return _match_form(home_team, stored.get(True), stored.get(False))
+
+
+def cached_form(home_team, away_team, db_path=DB_PATH):
+    """current_form() from a copy of TeamForm kept in memory, reloaded only when football.db changes.
+
+    For long-running servers (service.py), which would otherwise open the
+    database on every request.
+    """
+    table = cached_form_table(db_path)
+    return _match_form(home_team, table.get((home_team, True)), table.get((away_team, False)))
+
+
+def cached_form_table(db_path=DB_PATH):
+    """form_table(), loaded once per process and again only when football.db changes."""
+    from football.resources import load_cached
+    return load_cached(db_path, form_table)
+
+
+def _match_form(home_team, home, away):
+    form = {}
+    home = home or _historical_totals(home_team)
+    if home is not None:
+        form.update(zip(["goals_scored_home_last5", "goals_conceded_home_last5", "wins_home_last5"], home))
+    if away is not None:
+        form["goals_scored_away_last5"] = away[0]
+    return form
+
+
+def form_table(db_path=DB_PATH):
+    """The whole TeamForm table as {(team, is_home): (goals scored, goals conceded, wins)}."""
+    try:
+        with closing(sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)) as conn:
+            rows = conn.execute("""
+                SELECT t.team_name, f.is_home, f.goals_scored_last5, f.goals_conceded_last5, f.wins_last5
+                FROM TeamForm AS f JOIN Team AS t ON t.team_id = f.team_id
+            """).fetchall()
+    except sqlite3.Error:
+        return {}
+    return {(team, bool(is_home)): (scored, conceded, wins) for team, is_home, scored, conceded, wins in rows}
+
+
+def _historical_totals(team):
+    """Home form of a team without a stored home game yet (e.g. just promoted)."""
+    return TeamForm(team, True).totals() if team in historical_data else None
+
+
+def fill_form(fixtures, db_path=DB_PATH, table=None):
+    """Fill the missing last-5 form columns of a fixture table from TeamForm.
+
+    Only cells that are missing (or whole columns that are absent) are
+    filled; form given in the fixture file wins. Teams without stored form
+    stay empty, so features.default_form applies. Pass `table` (a
+    form_table()) to skip reading the database.
+    """
+    table = form_table(db_path) if table is None else table
+    fixtures = fixtures.copy()
+    home = [table.get((team, True)) or _historical_totals(team) for team in fixtures["home_team"]]
+    away = [table.get((team, False)) for team in fixtures["away_team"]]
+    stored = {
+        "goals_scored_home_last5": [f[0] if f else None for f in home],
+        "goals_conceded_home_last5": [f[1] if f else None for f in home],
+        "wins_home_last5": [f[2] if f else None for f in home],
+        "goals_scored_away_last5": [f[0] if f else None for f in away],
+    }
+    for column, values in stored.items():
+        values = pd.Series(values, index=fixtures.index, dtype=float)
+        fixtures[column] = fixtures[column].fillna(values) if column in fixtures else values
+    return fixtures
+
+
+def main():
+    """Rebuild TeamForm from scratch (python -m football.form)."""
+    with closing(sqlite3.connect(DB_PATH)) as conn:
+        conn.execute(form_table_sql)
+        conn.execute("DELETE FROM TeamForm")
+        conn.commit()
+        store = refresh(conn)
+    print(f"✅ TeamForm rebuilt: {len(store.forms)} team buffers, up to match {store.last_match_id}")
+
+
+if __name__ == "__main__":
+    main()
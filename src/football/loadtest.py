@@ -0,0 +1,171 @@
+"""Load test of the prediction service (service.py): sustained requests per second.
+
+Every client thread keeps one keep-alive connection open and sends random
+league matches back to back for the whole run; the report gives the
+throughput and the latency percentiles. From the src/ folder:
+
+    python -m football.loadtest                          # starts a 1-worker service itself
+    python -m football.loadtest --url http://127.0.0.1:8000 --clients 8 --duration 30
+    python -m football.loadtest --batch 50               # POST /predict/batch with 50 matches each
+
+Without --url the service is started in a subprocess pinned to one CPU core
+(where the platform allows it), so the number is the throughput of a single
+core. The load generator itself needs CPU too: on a one-core machine both
+share it, and the result is a lower bound.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from contextlib import closing
+from datetime import date, timedelta
+from urllib.parse import urlparse
+
+import numpy as np
+
+from football import registry
+
+
+def random_match(rng, teams, weather=False):
+    """One random league match, as the service takes it."""
+    home_team, away_team = rng.sample(teams, 2)
+    match = {
+        "home_team": home_team,
+        "away_team": away_team,
+        "match_date": (date.today() + timedelta(days=rng.randrange(1, 300))).isoformat(),
+        "match_time": f"{rng.choice([13, 15, 16, 18, 19, 20, 21])}:{rng.choice(['00', '15', '30', '45'])}",
+        "matchday": rng.randint(1, 30),
+    }
+    if weather:
+        match.update(temperature=round(rng.uniform(-2, 25), 1),
+                     weather_condition=rng.choice(["Clear or mostly clear", "Partly cloudy", "Rainy"]))
+    return match
+
+
+def _client(url, teams, stop_at, batch, weather, seed, results):
+    rng = random.Random(seed)
+    target = urlparse(url)
+    path = "/predict/batch" if batch else "/predict"
+    headers = {"Content-Type": "application/json"}
+    latencies, errors = [], 0
+    conn = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+    while time.perf_counter() < stop_at:
+        if batch:
+            payload = {"matches": [random_match(rng, teams, weather) for _ in range(batch)]}
+        else:
+            payload = random_match(rng, teams, weather)
+        body = json.dumps(payload).encode()     # bytes: sent with the headers in one packet
+        start = time.perf_counter()
+        try:
+            conn.request("POST", path, body, headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+    results.append((latencies, errors))
+
+
+def run(url, clients=4, duration=10.0, batch=0, weather=False, warmup=1.0):
+    """Load the service for `duration` seconds; return a dict of throughput and latency figures."""
+    teams = list(registry.current().league_teams)
+    if warmup:
+        _client(url, teams, time.perf_counter() + warmup, batch, weather, -1, [])
+
+    results = []
+    stop_at = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=_client, args=(url, teams, stop_at, batch, weather, seed, results))
+        for seed in range(clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array([latency for latency_list, _ in results for latency in latency_list]) * 1000
+    requests = len(latencies)
+    return {
+        "requests": requests,
+        "errors": sum(errors for _, errors in results),
+        "seconds": elapsed,
+        "requests_per_second": requests / elapsed,
+        "matches_per_second": requests * max(batch, 1) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)) if requests else float("nan"),
+        "p99_ms": float(np.percentile(latencies, 99)) if requests else float("nan"),
+    }
+
+
+def _free_port():
+    with closing(socket.socket()) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_service(workers=1, timeout=60):
+    """Start `python -m football.service` in a subprocess; return (process, url) once it answers."""
+    port = _free_port()
+    command = [sys.executable, "-m", "football.service", "--port", str(port), "--workers", str(workers)]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    if workers == 1 and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(process.pid, {min(os.sched_getaffinity(0))})
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url + "/health", timeout=1):
+                return process, url
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError("The service exited before answering") from None
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"The service did not answer within {timeout} s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the attendance prediction service.")
+    parser.add_argument("--url", help="running service (default: start one with a single worker)")
+    parser.add_argument("--clients", type=int, default=4, help="concurrent keep-alive connections (default: 4)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load (default: 10)")
+    parser.add_argument("--batch", type=int, default=0, help="matches per /predict/batch request (default: 0, use /predict)")
+    parser.add_argument("--weather", action="store_true", help="send a forecast (with-weather model, never the cube)")
+    args = parser.parse_args(argv)
+
+    process = None
+    url = args.url
+    if url is None:
+        process, url = start_service()
+    try:
+        report = run(url, args.clients, args.duration, args.batch, args.weather)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    endpoint = f"/predict/batch ({args.batch} matches)" if args.batch else "/predict"
+    print(f"✅ {endpoint}: {report['requests_per_second']:.0f} requests/s "
+          f"({report['matches_per_second']:.0f} matches/s) over {report['seconds']:.1f} s, "
+          f"{args.clients} keep-alive clients")
+    print(f"   latency p50 {report['p50_ms']:.2f} ms, p99 {report['p99_ms']:.2f} ms, "
+          f"{report['requests']} requests, {report['errors']} errors")
+
+
+if __name__ == "__main__":
+    main()
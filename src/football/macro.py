@@ -0,0 +1,303 @@
+"""Quarterly macro-economic data: a local store with revisions and an as-of join.
+
+The three series the models read (real GDP, quarter-on-quarter CPI growth
+and the employment rate of Belgium) are published by FRED. The store keeps
+every value ever downloaded in one long CSV, Data/macro_observations.csv:
+
+    series, date, value, revision        revision = when the value was fetched (UTC, ISO 8601)
+
+An update downloads each series and only appends the observations that are
+new or whose value was revised, so the file is also the history of the
+revisions: quarterly(as_of=...) gives the data exactly as it was known on a
+given day. Nothing here needs the network except update(); when FRED cannot
+be reached the stored values are used as they are.
+
+A match gets the values of the previous available quarter (the *_lagQ
+features): the latest observation of each series dated in an earlier quarter
+than the match. MacroTable keeps one sorted array of quarter numbers per
+series and answers that with np.searchsorted, for one match or a whole
+fixture list at once. A match after the latest published quarter gets the
+latest values, which is what the app needs for upcoming matches.
+
+From the src/ folder:
+
+    python -m football.macro                      # summary of the store
+    python -m football.macro --update             # download the FRED series, record the revisions
+    python -m football.macro --import-xlsx belgium_economic_data.xlsx
+"""
+
+import argparse
+import bisect
+import io
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import requests
+
+from football.paths import MACRO_STORE_PATH, MACRO_XLSX_PATH
+
+
+FRED_URL = os.environ.get("FOOTBALL_FRED_URL", "https://fred.stlouisfed.org/graph/fredgraph.csv")
+
+# Column of the quarterly data -> FRED series id
+SERIES = {
+    "GDP_Real": "CLVMNACSCAB1GQBE",
+    "CPI_QoQ_Growth_%": "CPALTT01BEQ657N",
+    "Employment_Rate_%": "LREM64TTBEQ156N",
+}
+LAG_COLUMNS = tuple(f"{column}_lagQ" for column in SERIES)
+
+OBSERVATION_COLUMNS = ["series", "date", "value", "revision"]
+
+
+def revision_stamp(moment=None):
+    """Revision label of a download: its UTC time, ISO 8601 (sorts as text)."""
+    moment = moment or datetime.now(timezone.utc)
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def fetch_fred_series(series_id, timeout=10, session=None):
+    """Download one FRED series; return a DataFrame with the columns date and value.
+
+    Missing values ("." in the CSV) are dropped. Raises requests.RequestException
+    or ValueError when the series cannot be read.
+    """
+    session = session or requests
+    response = session.get(FRED_URL, params={"id": series_id}, timeout=timeout)
+    response.raise_for_status()
+    df = pd.read_csv(io.StringIO(response.text))
+
+    date_column = next((c for c in ["observation_date", "DATE", "date", "Date"] if c in df.columns), None)
+    value_columns = [c for c in df.columns if c != date_column]
+    if date_column is None or not value_columns:
+        raise ValueError(f"Unexpected columns for {series_id}: {list(df.columns)}")
+    return pd.DataFrame({
+        "date": pd.to_datetime(df[date_column]),
+        "value": pd.to_numeric(df[value_columns[0]], errors="coerce"),
+    }).dropna()
+
+
+class MacroStore:
+    """Every downloaded observation of the quarterly series, with its revision."""
+
+    def __init__(self, observations=None):
+        if observations is None:
+            observations = pd.DataFrame({column: [] for column in OBSERVATION_COLUMNS})
+        observations = observations[OBSERVATION_COLUMNS].astype({"series": str, "value": float, "revision": str})
+        observations["date"] = pd.to_datetime(observations["date"])
+        self.observations = observations.sort_values(["series", "date", "revision"], ignore_index=True)
+
+    def __len__(self):
+        return len(self.observations)
+
+    def __repr__(self):
+        return f"MacroStore({len(self)} observations, {len(self.revisions())} revisions)"
+
+    @classmethod
+    def load(cls, path=MACRO_STORE_PATH):
+        """The store saved at `path`; empty if there is no file yet."""
+        if not Path(path).exists():
+            return cls()
+        return cls(pd.read_csv(path, dtype={"series": str, "revision": str}))
+
+    def save(self, path=MACRO_STORE_PATH):
+        """Write the store (to a temporary file first, so readers never see half a file)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        frame = self.observations.assign(date=self.observations["date"].dt.strftime("%Y-%m-%d"))
+        frame.to_csv(tmp, index=False)
+        os.replace(tmp, path)
+
+    def revisions(self):
+        """The revision labels in the store, oldest first."""
+        return sorted(self.observations["revision"].unique())
+
+    def values(self, as_of=None):
+        """The latest value of every (series, date) known at `as_of` (a revision label or date; None: now)."""
+        observations = self.observations
+        if as_of is not None:
+            as_of = pd.Timestamp(as_of)
+            as_of = as_of.tz_localize("UTC") if as_of.tzinfo is None else as_of
+            observations = observations[observations["revision"] <= revision_stamp(as_of)]
+        return observations.drop_duplicates(["series", "date"], keep="last")
+
+    def record(self, series, frame, revision=None):
+        """Add a download of `series` (columns date and value); return how many observations it added.
+
+        Only the dates the store does not know yet and the values that
+        changed since the last revision are kept.
+        """
+        revision = revision or revision_stamp()
+        known = self.values()
+        known = known[known["series"] == series].set_index("date")["value"]
+        frame = frame.dropna(subset=["value"])
+        dates = pd.to_datetime(frame["date"])
+        previous = known.reindex(dates).to_numpy()
+        values = frame["value"].to_numpy(dtype=float)
+        changed = np.isnan(previous) | ~np.isclose(previous, values, rtol=1e-12, atol=0)
+        if not changed.any():
+            return 0
+        added = pd.DataFrame({
+            "series": series,
+            "date": dates[changed].to_numpy(),
+            "value": values[changed],
+            "revision": revision,
+        })
+        self.observations = pd.concat([self.observations, added], ignore_index=True).sort_values(
+            ["series", "date", "revision"], ignore_index=True)
+        return int(changed.sum())
+
+    def quarterly(self, as_of=None):
+        """The quarterly data (Date plus one column per series), as known at `as_of`."""
+        values = self.values(as_of)
+        wide = values.pivot(index="date", columns="series", values="value")
+        wide = wide.reindex(columns=[column for column in SERIES if column in wide.columns])
+        wide.columns.name = None
+        return wide.rename_axis("Date").reset_index()
+
+
+def import_xlsx(store, path=MACRO_XLSX_PATH, revision=None):
+    """Record the Quarterly_Data sheet of the notebook's workbook; return the number of added observations.
+
+    The revision defaults to the creation time of the workbook.
+    """
+    if revision is None:
+        import openpyxl
+        created = openpyxl.load_workbook(path, read_only=True).properties.created
+        revision = revision_stamp(created.replace(tzinfo=timezone.utc)) if created else None
+    qdata = pd.read_excel(path, sheet_name="Quarterly_Data")
+    return sum(
+        store.record(column, pd.DataFrame({"date": qdata["Date"], "value": qdata[column]}), revision)
+        for column in SERIES if column in qdata
+    )
+
+
+def update(path=MACRO_STORE_PATH, timeout=10, session=None):
+    """Download every series and record what changed; return {column: added observations or None}.
+
+    A series that cannot be downloaded keeps its stored values (None in the result).
+    """
+    store = MacroStore.load(path)
+    revision = revision_stamp()
+    added = {}
+    for column, series_id in SERIES.items():
+        try:
+            added[column] = store.record(column, fetch_fred_series(series_id, timeout, session), revision)
+        except (requests.RequestException, ValueError) as error:
+            print(f"⚠️ {series_id} ({column}) not updated, the stored values are kept: {error}")
+            added[column] = None
+    if any(added.values()):
+        store.save(path)
+    return added
+
+
+def quarter_number(year, quarter):
+    """Quarters counted from year 0, so consecutive quarters are consecutive integers."""
+    return year * 4 + quarter - 1
+
+
+class MacroTable:
+    """Sorted quarter numbers and values of each series, for the as-of join of the *_lagQ features."""
+
+    def __init__(self, qdata):
+        qdata = qdata.sort_values("Date", kind="stable")
+        dates = pd.to_datetime(qdata["Date"])
+        quarters = quarter_number(dates.dt.year.to_numpy(), dates.dt.quarter.to_numpy())
+        self.columns = [column for column in qdata.columns if column != "Date"]
+        self.quarters = {}
+        self.values = {}
+        for column in self.columns:
+            values = qdata[column].to_numpy(dtype=float)
+            available = ~np.isnan(values)
+            # Several observations in one quarter: the last chronological one counts
+            frame = pd.DataFrame({"quarter": quarters[available], "value": values[available]})
+            frame = frame.drop_duplicates("quarter", keep="last")
+            self.quarters[column] = frame["quarter"].to_numpy()
+            self.values[column] = frame["value"].to_numpy()
+
+    def __repr__(self):
+        last = max((q[-1] for q in self.quarters.values() if len(q)), default=None)
+        latest = f"up to {last // 4}-Q{last % 4 + 1}" if last is not None else "empty"
+        return f"MacroTable({', '.join(self.columns)}; {latest})"
+
+    def lagged(self, years, quarters):
+        """The *_lagQ values of matches played in (year, quarter): {column_lagQ: float array}.
+
+        Each value is the latest observation of an earlier quarter, NaN when
+        there is none (or the year / quarter is missing).
+        """
+        target = quarter_number(np.asarray(years, dtype=float), np.asarray(quarters, dtype=float))
+        missing = np.isnan(target)
+        result = {}
+        for column in self.columns:
+            keys, values = self.quarters[column], self.values[column]
+            index = np.searchsorted(keys, np.where(missing, 0, target), side="left") - 1
+            found = (index >= 0) & ~missing
+            result[f"{column}_lagQ"] = np.where(found, values[np.maximum(index, 0)] if len(values) else np.nan, np.nan)
+        return result
+
+    def lagged_dates(self, dates):
+        """lagged() for match dates (anything pd.to_datetime reads)."""
+        dates = pd.DatetimeIndex(pd.to_datetime(dates))
+        return self.lagged(dates.year.to_numpy(dtype=float), dates.quarter.to_numpy(dtype=float))
+
+    def lagged_one(self, match_date):
+        """The *_lagQ values of one match (a date); {column_lagQ: float}."""
+        target = quarter_number(match_date.year, (match_date.month - 1) // 3 + 1)
+        result = {}
+        for column in self.columns:
+            index = bisect.bisect_left(self.quarters[column], target) - 1
+            result[f"{column}_lagQ"] = float(self.values[column][index]) if index >= 0 else float("nan")
+        return result
+
+    def latest(self):
+        """The *_lagQ values of any match after the latest published quarter."""
+        return {
+            f"{column}_lagQ": float(self.values[column][-1]) if len(self.values[column]) else float("nan")
+            for column in self.columns
+        }
+
+
+def load_table(path=MACRO_STORE_PATH):
+    """The MacroTable of the latest values in the store at `path`."""
+    return MacroTable(MacroStore.load(path).quarterly())
+
+
+def current(path=MACRO_STORE_PATH):
+    """The MacroTable of the store, loaded once per process and again only when the file changes."""
+    from football.resources import load_cached
+    return load_cached(path, load_table)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local store of the quarterly macro-economic series.")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--update", action="store_true", help="download the FRED series and record the revisions")
+    group.add_argument("--import-xlsx", metavar="XLSX", help="record the Quarterly_Data sheet of a workbook")
+    parser.add_argument("--store", default=MACRO_STORE_PATH, help=f"store file (default: {MACRO_STORE_PATH})")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.update:
+        added = update(args.store)
+        print(f"✅ Macro store updated in {time.perf_counter() - start:.1f} s: "
+              + ", ".join(f"{column} +{n}" if n is not None else f"{column} offline" for column, n in added.items()))
+    elif args.import_xlsx:
+        store = MacroStore.load(args.store)
+        added = import_xlsx(store, args.import_xlsx)
+        store.save(args.store)
+        print(f"✅ {added} observation(s) imported from {args.import_xlsx}")
+
+    store = MacroStore.load(args.store)
+    table = MacroTable(store.quarterly())
+    print(f"{store!r}, {table!r}")
+    print("   latest lagged values:", ", ".join(f"{k} = {v:g}" for k, v in table.latest().items()))
+
+
+if __name__ == "__main__":
+    main()
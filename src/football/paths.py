@@ -0,0 +1,31 @@
+from pathlib import Path
+
+# Resolve paths relative to this file (src/football/paths.py)
+PACKAGE_DIR = Path(__file__).resolve().parent   # src/football/ folder
+BASE_DIR = PACKAGE_DIR.parent.parent            # project root
+DATA_DIR = BASE_DIR / "Data"
+MODELS_DIR = BASE_DIR / "Models"
+
+DB_PATH = DATA_DIR / "football.db"
+
+# Encoded training matrix materialised next to the database (see training_view.py)
+TRAINING_VIEW_DIR = DATA_DIR / "training_view"
+
+# Models used by the app and the batch scorer (XGBoost UBJ with a manifest, see artifacts.py)
+MODEL_WITH_WEATHER_PATH = MODELS_DIR / "finalized_model_with_weather.ubj"
+MODEL_WITHOUT_WEATHER_PATH = MODELS_DIR / "finalized_model_without_weather.ubj"
+
+# P10 / P90 companions of the two models (see quantiles.py)
+MODEL_WITH_WEATHER_INTERVAL_PATH = MODELS_DIR / "finalized_model_with_weather_interval.ubj"
+MODEL_WITHOUT_WEATHER_INTERVAL_PATH = MODELS_DIR / "finalized_model_without_weather_interval.ubj"
+
+# Precomputed without-weather predictions, memory-mapped by the app (see cube.py)
+PREDICTION_CUBE_DIR = DATA_DIR / "prediction_cube"
+
+# Data pipeline files
+RAW_WEATHER_CSV_PATH = DATA_DIR / "RawDataB_weather.csv"
+CLEANED_CSV_PATH = DATA_DIR / "CleanedData.csv"
+MACRO_XLSX_PATH = PACKAGE_DIR.parent / "belgium_economic_data.xlsx"
+
+# Downloaded macro-economic observations with their revisions (see macro.py)
+MACRO_STORE_PATH = DATA_DIR / "macro_observations.csv"
@@ -0,0 +1,322 @@
+"""The whole data pipeline as explicit stages, rerun only where something changed.
+
+The pipeline guide used to say "run 2.DataCleaning, then 3.DB, then
+4.ML_dev&save when the data changed", and every run rewrote every file. Here
+each step is a stage with the files it reads, the files it writes and the
+football modules its code lives in:
+
+    clean          RawDataB_weather.csv + macro store  -> CleanedData.csv
+    database       CleanedData.csv                     -> football.db
+    training_view  football.db                         -> Data/training_view/
+    models         training view                       -> Models/finalized_model_*.ubj   (tuning.train_models)
+    companions     football.db + models                -> Models/*_interval.ubj
+    explain        football.db + models                -> TeamAttribution in football.db
+    backtest       training view + models              -> Data/backtest.csv
+    cube           football.db + macro store + models  -> Data/prediction_cube/
+
+A stage's key is a sha256 of the source of its modules, the content of its
+input files and the current version of what its upstream stages produced:
+the content of their files, except for football.db (its build stamp, since
+the form, threshold and attribution tables are updated in place) and the
+training view (its data_version). A stage runs when its key differs from the
+one recorded in Data/pipeline_state.json after its last successful run, or
+when one of its outputs is missing. So a database rebuilt from an identical
+CSV gives an identical training view, and the models are not tuned again.
+Retraining the models in the notebook makes the stages after them rerun.
+
+Stages whose upstream stages are done run in parallel, each in its own
+process (companions, explain and backtest after the models).
+
+From the src/ folder:
+
+    python -m football.pipeline                     # every stage that is out of date
+    python -m football.pipeline cube                # the cube and what it needs
+    python -m football.pipeline database --force    # rebuild football.db even if it is up to date
+    python -m football.pipeline --dry-run           # what would run, and why
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from football.paths import (
+    CLEANED_CSV_PATH,
+    DATA_DIR,
+    DB_PATH,
+    MACRO_STORE_PATH,
+    MODEL_WITH_WEATHER_INTERVAL_PATH,
+    MODEL_WITH_WEATHER_PATH,
+    MODEL_WITHOUT_WEATHER_INTERVAL_PATH,
+    MODEL_WITHOUT_WEATHER_PATH,
+    PREDICTION_CUBE_DIR,
+    RAW_WEATHER_CSV_PATH,
+    TRAINING_VIEW_DIR,
+)
+from football.resources import file_digest
+
+
+PIPELINE_STATE_PATH = DATA_DIR / "pipeline_state.json"
+BACKTEST_CSV_PATH = DATA_DIR / "backtest.csv"
+
+MODEL_PATHS = (MODEL_WITH_WEATHER_PATH, MODEL_WITHOUT_WEATHER_PATH)
+INTERVAL_PATHS = (MODEL_WITH_WEATHER_INTERVAL_PATH, MODEL_WITHOUT_WEATHER_INTERVAL_PATH)
+
+Stage = namedtuple("Stage", [
+    "name",
+    "run",          # module-level function without arguments (it runs in a worker process)
+    "deps",         # names of the stages it needs
+    "inputs",       # files it reads that no stage writes
+    "outputs",      # files it writes; a missing one makes the stage run
+    "code",         # football modules its work is done in
+    "version",      # function -> version of its outputs, for the keys of the stages after it
+])
+
+
+############################## STAGES ##############################
+
+def _files_version(paths):
+    return lambda: {Path(path).name: file_digest(path) if Path(path).exists() else None for path in paths}
+
+
+def _run_clean():
+    from football import cleaning
+    cleaned = cleaning.clean(cleaning.read_raw(RAW_WEATHER_CSV_PATH), cleaning.read_quarterly_macro(),
+                             cleaning.CONFLICTS_CSV_PATH)
+    tmp = CLEANED_CSV_PATH.with_suffix(".tmp")
+    cleaned.to_csv(tmp, index=False)
+    os.replace(tmp, CLEANED_CSV_PATH)
+    print(f"✅ {CLEANED_CSV_PATH.name}: {len(cleaned)} matches")
+
+
+def _run_database():
+    from football import db
+    db.build_database(CLEANED_CSV_PATH, DB_PATH)
+
+
+def _database_version():
+    from football import db
+    return db.build_stamp(DB_PATH)
+
+
+def _run_training_view():
+    from football import training_view
+    view = training_view.refresh(DB_PATH, TRAINING_VIEW_DIR, verbose=True)
+    print(f"✅ Training view: {view.X.shape[0]} rows x {view.X.shape[1]} features")
+
+
+def _training_view_version():
+    from football import training_view
+    meta = training_view.read_meta(TRAINING_VIEW_DIR)
+    return meta and meta["data_version"]
+
+
+def _run_models():
+    from football import training_view, tuning
+    tuning.train_models(training_view.load(TRAINING_VIEW_DIR, mmap=False))
+
+
+def _run_companions():
+    from football import quantiles
+    quantiles.train_companions(DB_PATH)
+
+
+def _run_explain():
+    from football import explain
+    counts = explain.refresh(DB_PATH)
+    print("✅ TeamAttribution: " + ", ".join(f"{name} ({n} teams)" for name, n in counts.items()))
+
+
+def _run_backtest():
+    from football import backtest
+    result = backtest.run(db_path=DB_PATH)
+    result.predictions.to_csv(BACKTEST_CSV_PATH, index=False)
+    print(result.seasons.round(3).to_string(index=False))
+
+
+def _run_cube():
+    from football import cube
+    cube.build(PREDICTION_CUBE_DIR, verbose=False)
+    print(f"✅ Prediction cube rebuilt in {PREDICTION_CUBE_DIR}")
+
+
+STAGES = [
+    Stage("clean", _run_clean, (), (RAW_WEATHER_CSV_PATH, MACRO_STORE_PATH), (CLEANED_CSV_PATH,),
+          ("cleaning", "form", "macro", "static_data"), _files_version([CLEANED_CSV_PATH])),
+    Stage("database", _run_database, ("clean",), (), (DB_PATH,),
+          ("db", "form", "thresholds", "static_data"), _database_version),
+    Stage("training_view", _run_training_view, ("database",), (), (TRAINING_VIEW_DIR / "meta.json",),
+          ("training_view", "features", "registry"), _training_view_version),
+    Stage("models", _run_models, ("training_view",), (), MODEL_PATHS,
+          ("tuning", "artifacts"), _files_version(MODEL_PATHS)),
+    Stage("companions", _run_companions, ("database", "models"), (), INTERVAL_PATHS,
+          ("quantiles", "features", "training_view"), _files_version(INTERVAL_PATHS)),
+    Stage("explain", _run_explain, ("database", "models"), (), (),
+          ("explain", "features", "training_view"), lambda: None),
+    Stage("backtest", _run_backtest, ("training_view", "models"), (), (BACKTEST_CSV_PATH,),
+          ("backtest",), _files_version([BACKTEST_CSV_PATH])),
+    Stage("cube", _run_cube, ("database", "models", "companions"), (MACRO_STORE_PATH,), (PREDICTION_CUBE_DIR / "meta.json",),
+          ("cube", "features", "form", "macro", "registry", "tree_engine"), _files_version([PREDICTION_CUBE_DIR / "meta.json"])),
+]
+
+
+############################## KEYS / STATE ##############################
+
+def stages_by_name(stages=STAGES):
+    return {stage.name: stage for stage in stages}
+
+
+def with_upstream(targets, stages=STAGES):
+    """The target stages and every stage they need, in pipeline order."""
+    by_name = stages_by_name(stages)
+    unknown = set(targets) - set(by_name)
+    if unknown:
+        raise ValueError(f"Unknown stage(s) {sorted(unknown)}; the stages are {list(by_name)}")
+    needed, todo = set(), list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in needed:
+            needed.add(name)
+            todo.extend(by_name[name].deps)
+    return [stage for stage in stages if stage.name in needed]
+
+
+def _module_digest(module):
+    return file_digest(importlib.util.find_spec(f"football.{module}").origin)
+
+
+def stage_key(stage, dep_versions):
+    """sha256 of the stage's code, its input files and the versions of its upstream outputs."""
+    fingerprint = {
+        "code": {module: _module_digest(module) for module in stage.code},
+        "inputs": {Path(path).name: file_digest(path) if Path(path).exists() else None for path in stage.inputs},
+        "deps": dep_versions,
+    }
+    return hashlib.sha256(json.dumps(fingerprint, sort_keys=True, default=str).encode()).hexdigest()[:20]
+
+
+def read_state(path=PIPELINE_STATE_PATH):
+    """{stage: {key, finished_at, seconds}} of the last successful runs ({} if none)."""
+    path = Path(path)
+    return json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+
+
+def _save_state(state, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=1), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _timed(function):
+    """Run a stage function (in a worker process); return its duration in seconds."""
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+############################## RUNNER ##############################
+
+def run(targets=None, force=(), workers=None, dry_run=False, stages=STAGES, state_path=PIPELINE_STATE_PATH):
+    """Bring the target stages (default: all) up to date; return {stage: status}.
+
+    A status is "up to date", "ran", "failed", "skipped" (an upstream stage
+    failed) or, with dry_run, "would run". Stages named in `force` run even
+    when they are up to date.
+    """
+    selected = with_upstream(targets or [stage.name for stage in stages], stages)
+    state = read_state(state_path)
+    by_name = stages_by_name(stages)
+    status, versions, keys, running = {}, {}, {}, {}
+    start = time.perf_counter()
+
+    def ready(stage):
+        return stage.name not in status and stage.name not in running.values() and all(
+            dep in status for dep in stage.deps)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while len(status) < len(selected):
+            for stage in [stage for stage in selected if ready(stage)]:
+                upstream = [status[dep] for dep in stage.deps]
+                if any(s in ("failed", "skipped") for s in upstream):
+                    status[stage.name] = "skipped"
+                    print(f"⚠️ {stage.name}: skipped, an upstream stage failed")
+                    continue
+                if any(s == "would run" for s in upstream):
+                    status[stage.name] = "would run"
+                    print(f"   {stage.name}: would run (upstream stage changes)")
+                    continue
+
+                key = keys[stage.name] = stage_key(stage, {dep: versions[dep] for dep in stage.deps})
+                missing = [Path(path).name for path in stage.outputs if not Path(path).exists()]
+                reason = ("forced" if stage.name in force
+                          else "missing " + ", ".join(missing) if missing
+                          else "never ran" if stage.name not in state
+                          else "inputs or code changed" if state[stage.name]["key"] != key
+                          else None)
+                if reason is None:
+                    status[stage.name] = "up to date"
+                    versions[stage.name] = stage.version()
+                    print(f"   {stage.name}: up to date")
+                elif dry_run:
+                    status[stage.name] = "would run"
+                    print(f"   {stage.name}: would run ({reason})")
+                else:
+                    print(f"▶️ {stage.name}: running ({reason})")
+                    running[pool.submit(_timed, stage.run)] = stage.name
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    seconds = future.result()
+                except Exception as error:
+                    status[name] = "failed"
+                    print(f"⚠️ {name} failed: {error!r}")
+                    continue
+                status[name] = "ran"
+                versions[name] = by_name[name].version()
+                state[name] = {
+                    "key": keys[name],
+                    "finished_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    "seconds": round(seconds, 2),
+                }
+                _save_state(state, state_path)
+                print(f"✅ {name} done in {seconds:.1f} s")
+
+    counts = {s: sum(value == s for value in status.values()) for s in set(status.values())}
+    summary = ", ".join(f"{n} {s}" for s, n in sorted(counts.items()))
+    print(f"{'⚠️' if 'failed' in counts else '✅'} Pipeline: {summary} ({time.perf_counter() - start:.1f} s)")
+    return status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the data pipeline, skipping the stages that are up to date.")
+    parser.add_argument("stages", nargs="*", help=f"stages to bring up to date, with what they need "
+                                                  f"(default: all of {', '.join(s.name for s in STAGES)})")
+    parser.add_argument("--force", action="store_true",
+                        help="run the named stages (default: every stage) even if they are up to date")
+    parser.add_argument("--dry-run", action="store_true", help="only show what would run")
+    parser.add_argument("--workers", type=int, default=None, help="stages run at the same time (default: all cores)")
+    args = parser.parse_args(argv)
+    unknown = set(args.stages) - set(stages_by_name())
+    if unknown:
+        parser.error(f"unknown stage(s) {', '.join(sorted(unknown))}")
+
+    forced = set(args.stages or [stage.name for stage in STAGES]) if args.force else ()
+    status = run(args.stages, force=forced, workers=args.workers,
+                 dry_run=args.dry_run)
+    if "failed" in status.values():
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+"""Turn model outputs into attendance figures and Low / Normal / High levels.
+
+The models predict the share of the stadium that is filled (0–1). These helpers
+work on scalars as well as NumPy arrays, so the app and the batch scorer apply
+exactly the same capping and thresholds.
+"""
+
+import numpy as np
+
+
+def attendance_from_share(share, max_capacity):
+    """Convert a predicted share of capacity into a head count, capped at capacity."""
+    return np.minimum(np.round(share * max_capacity), max_capacity)
+
+
+def attendance_level(attendance, attendance_30th, attendance_70th):
+    """Low below the team's 30th percentile, High above its 70th, Normal in between."""
+    return np.where(
+        attendance < attendance_30th, "Low",
+        np.where(attendance > attendance_70th, "High", "Normal"),
+    )
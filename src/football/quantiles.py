@@ -0,0 +1,185 @@
+"""P10 / P90 prediction intervals: quantile companions of the two attendance models.
+
+Each model gets a companion XGBoost model trained with reg:quantileerror and
+quantile_alpha=[0.1, 0.9]: one booster with two outputs, the 10th and the
+90th percentile of the attendance share. The companion is trained on the
+same football.db rows as the training view, encoded with the point model's
+own feature list (FeatureEncoder), so the app encodes a match once and feeds
+the same row to both.
+
+Raw quantile models are overconfident out of sample, so the interval is
+calibrated on matches the companion did not see (conformalised quantile
+regression): the manifest stores the offsets that widen [P10, P90] until it
+covers 80% of them.
+
+At serving time the point model and its companion are stacked into one
+TreeEngine (tree_engine.py): a single walk over all trees returns
+[prediction, P10, P90], which keeps a request well within twice the cost of
+the point prediction alone.
+
+Train the companions from football.db (from the src/ folder):
+
+    python -m football.quantiles
+
+They are saved next to the models (Models/*_interval.ubj) as model artifacts;
+the manifest records the quantiles, the offsets and the interval coverage on
+the held-out 25% of the matches.
+"""
+
+import argparse
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from xgboost import XGBRegressor
+
+from football import db, training_view
+from football.artifacts import load_artifact, manifest, save_artifact
+from football.features import encoder_for, model_columns
+from football.paths import (
+    DB_PATH,
+    MODEL_WITH_WEATHER_INTERVAL_PATH,
+    MODEL_WITH_WEATHER_PATH,
+    MODEL_WITHOUT_WEATHER_INTERVAL_PATH,
+    MODEL_WITHOUT_WEATHER_PATH,
+)
+from football.tree_engine import TreeEngine, compile_model
+
+
+QUANTILES = (0.1, 0.9)
+
+# Deliberately shallow and slow-learning: quantile losses overfit quickly on ~900 matches
+COMPANION_PARAMS = {
+    "n_estimators": 300,
+    "learning_rate": 0.05,
+    "max_depth": 4,
+    "min_child_weight": 5,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8,
+}
+
+
+def fit_companion(X, y, quantiles=QUANTILES, params=None, seed=42):
+    """Fit a two-output quantile model on an encoded matrix (DataFrame or array)."""
+    companion = XGBRegressor(
+        objective="reg:quantileerror", quantile_alpha=list(quantiles),
+        tree_method="hist", random_state=seed, **(params or COMPANION_PARAMS),
+    )
+    return companion.fit(X, y)
+
+
+def conformal_offset(y, bounds, quantiles=QUANTILES):
+    """How far to widen [P10, P90] so that it covers 80% of held-out matches.
+
+    Conformalised quantile regression: the score of a match is how far it
+    falls outside its interval (negative when inside), and the offset is the
+    finite-sample corrected 80% quantile of those scores.
+    """
+    bounds = np.asarray(bounds)
+    scores = np.maximum(bounds[:, 0] - y, y - bounds[:, -1])
+    level = min(1.0, np.ceil((len(y) + 1) * (quantiles[-1] - quantiles[0])) / len(y))
+    return float(np.quantile(scores, level, method="higher"))
+
+
+def widen(bounds, offsets):
+    """Apply the manifest's calibration offsets to raw companion outputs."""
+    return np.asarray(bounds) + np.asarray(offsets, dtype=np.float32)
+
+
+def interval(prediction, bounds, offsets=(0.0, 0.0)):
+    """Return (lower, upper): companion outputs widened by the offsets, as shares.
+
+    The bounds are kept within [0, 1] and around the prediction: the
+    companion is fitted separately from the point model, so on rare rows P10
+    can end up above the prediction (or P90 below it).
+    """
+    bounds = np.clip(widen(bounds, offsets), 0, 1)
+    return np.minimum(bounds[..., 0], prediction), np.maximum(bounds[..., -1], prediction)
+
+
+def coverage(y, bounds):
+    """Share of the targets inside [P10, P90], and the mean interval width."""
+    bounds = np.asarray(bounds)
+    inside = (y >= bounds[:, 0]) & (y <= bounds[:, -1])
+    return float(inside.mean()), float(np.mean(bounds[:, -1] - bounds[:, 0]))
+
+
+class IntervalPredictor:
+    """A point model and its quantile companion, scored in one TreeEngine call.
+
+    predict(row) returns (prediction, lower, upper) as arrays of attendance
+    shares, with the calibration offsets applied and the interval kept
+    around the prediction. Given the fitted model as well, batches of more
+    than ENGINE_MAX_ROWS rows go through XGBoost's own predictor, which is
+    faster there and gives the same numbers.
+    """
+
+    ENGINE_MAX_ROWS = 8
+
+    def __init__(self, engine, companion, model=None):
+        self.engine = TreeEngine.stack([engine, compile_model(companion)])
+        self.offsets = manifest(companion).get("offsets", [0.0, 0.0])
+        self.feature_names = engine.feature_names
+        self.model = model
+        self.companion = companion
+
+    def __repr__(self):
+        return f"IntervalPredictor({self.engine})"
+
+    def predict(self, X):
+        if self.model is not None and np.ndim(X) == 2 and len(X) > self.ENGINE_MAX_ROWS:
+            prediction, bounds = self.model.predict(X), self.companion.predict(X)
+        else:
+            outputs = self.engine.predict(X)
+            prediction, bounds = outputs[:, 0], outputs[:, 1:]
+        lower, upper = interval(prediction, bounds, self.offsets)
+        return prediction, lower, upper
+
+
+def train_companions(db_path=DB_PATH, quantiles=QUANTILES, verbose=True):
+    """Train and save the companions of both shipped models; return their manifests."""
+    with closing(db.connect(db_path)) as conn:
+        matches = training_view.prepare(training_view.read_training_frame(conn))
+    rows, _ = training_view.training_rows(matches)
+    y = rows[training_view.TARGET].to_numpy(dtype=float)
+    # Same 75/25 split as the notebook; a third of the training part calibrates the interval
+    train, test = train_test_split(np.arange(len(rows)), test_size=0.25, random_state=42)
+    fit, calibration = train_test_split(train, test_size=1 / 3, random_state=42)
+
+    manifests = {}
+    for name, model_path, interval_path in [
+        ("with_weather", MODEL_WITH_WEATHER_PATH, MODEL_WITH_WEATHER_INTERVAL_PATH),
+        ("without_weather", MODEL_WITHOUT_WEATHER_PATH, MODEL_WITHOUT_WEATHER_INTERVAL_PATH),
+    ]:
+        model = load_artifact(model_path)
+        columns = model_columns(model)
+        X = pd.DataFrame(encoder_for(columns).encode_frame(rows), columns=list(columns))
+        companion = fit_companion(X.iloc[fit], y[fit], quantiles)
+        offset = conformal_offset(y[calibration], companion.predict(X.iloc[calibration]), quantiles)
+        offsets = [-offset, offset]
+        covered, width = coverage(y[test], widen(companion.predict(X.iloc[test]), offsets))
+        manifests[name] = save_artifact(
+            companion, interval_path, f"{name}_interval",
+            data_version=training_view.data_version(X.to_numpy(np.float32)[fit], y[fit], list(X.columns)),
+            metrics={"coverage": covered, "mean_width": width},
+            quantiles=list(quantiles),
+            offsets=offsets,
+            companion_of=manifest(model)["name"],
+            train_rows=len(fit),
+        )
+        if verbose:
+            print(f"✅ {interval_path.name}: P{quantiles[0] * 100:.0f}-P{quantiles[-1] * 100:.0f} covers "
+                  f"{covered:.0%} of the held-out matches (mean width {width * 100:.1f} points)")
+    return manifests
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the P10/P90 companions of the attendance models.")
+    parser.add_argument("--db", default=DB_PATH, help="database file (default: Data/football.db)")
+    args = parser.parse_args(argv)
+    train_companions(args.db)
+
+
+if __name__ == "__main__":
+    main()
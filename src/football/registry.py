@@ -0,0 +1,170 @@
+"""Team registry: every team fact (stadium, capacity, roof, coordinates, derbies, thresholds) by team id.
+
+The team facts used to be literal dicts spread over the app and the notebooks
+(stadium_coordinates, team_data, full_roof_map, derby_pairs, stadium_info,
+teams_to_keep, super_league_teams), and they had drifted apart: the app gave
+the models Full Roof = 0 for Genk, KAA Gent, OH Leuven and Sint-Truiden,
+whose training rows say 1. They now come from football.db (the Team, Stadium
+and Derby tables, built from static_data.py, see db.py), loaded once into a
+TeamRegistry: one read-only NumPy array per fact, indexed by team_id. The
+Low / High attendance thresholds come from the TeamAttendance table, which
+follows every new match (thresholds.py); static_data.py only covers clubs
+without a home match in the database yet.
+
+    registry = current()                      # once per process, reloaded when the DB changes
+    ids = registry.ids(df["Home Team"])       # names -> team ids, 0 for a team it does not know
+    registry.max_capacity[ids]                # one gather instead of a dict lookup per row
+    registry.derby[home_ids, away_ids]
+
+Index 0 is "no team": its numbers are NaN, its names None and its
+league_order 0, so unknown teams need no special case.
+
+The cleaning step runs before the database exists and uses seed(), the same
+registry built straight from static_data.py (with its own ids).
+"""
+
+import functools
+import sqlite3
+from collections import namedtuple
+from contextlib import closing
+from types import MappingProxyType
+
+import numpy as np
+
+from football import static_data, thresholds
+from football.paths import DB_PATH
+
+
+TEAM_QUERY = """
+SELECT t.team_id, t.team_name, t.league_order, t.stadium_id,
+       s.stadium_name, s.city, s.province, s.max_capacity, s.full_roof, s.latitude, s.longitude
+FROM Team AS t
+LEFT JOIN Stadium AS s ON s.stadium_id = t.stadium_id
+ORDER BY t.team_id
+"""
+
+_TeamRegistry = namedtuple("TeamRegistry", [
+    "team_name",        # object
+    "league_order",     # int, 1.. in the app's order for the current league teams, 0 otherwise
+    "stadium_id",       # int, 0 without a home stadium
+    "stadium_name",     # object
+    "city",             # object
+    "province",         # object
+    "max_capacity",     # float
+    "full_roof",        # float, 0 / 1
+    "latitude",         # float
+    "longitude",        # float
+    "attendance_30th",  # float, Low / Normal threshold
+    "attendance_70th",  # float, Normal / High threshold
+    "derby",            # bool (n, n), symmetric
+    "index",            # read-only {team name: team_id}
+])
+
+
+class TeamRegistry(_TeamRegistry):
+    """Team facts as parallel read-only arrays indexed by team_id (index 0: no team)."""
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return f"TeamRegistry({len(self.index)} teams, {len(self.league_teams)} in the league)"
+
+    @property
+    def n_teams(self):
+        return len(self.index)
+
+    @property
+    def league_teams(self):
+        """The current league teams, in the order the app lists them."""
+        order = np.flatnonzero(self.league_order > 0)
+        return tuple(self.team_name[order[np.argsort(self.league_order[order])]])
+
+    def id_of(self, name):
+        """Return the team_id of one team name, 0 if unknown."""
+        return self.index.get(name, 0)
+
+    def ids(self, names):
+        """Return the team_ids of a sequence of names (0 for unknown), one lookup per distinct name."""
+        names = np.asarray(names, dtype=object)
+        if names.size == 0:
+            return np.zeros(names.shape, dtype=np.int64)
+        values, inverse = np.unique(names.astype(str), return_inverse=True)
+        return np.array([self.index.get(value, 0) for value in values], dtype=np.int64)[inverse].reshape(names.shape)
+
+
+def _column(values, dtype, missing):
+    array = np.array([missing if value is None else value for value in values], dtype=dtype)
+    array.flags.writeable = False
+    return array
+
+
+def build(teams, derby_pairs, attendance_thresholds=None):
+    """Assemble a registry from team rows and (team_id, rival_id) derby pairs.
+
+    `teams` are tuples ordered like TEAM_QUERY's columns, with ids 1..n.
+    `attendance_thresholds` ({team name: (30th, 70th)}) override the seed ones.
+    """
+    teams = sorted(teams)
+    if [team[0] for team in teams] != list(range(1, len(teams) + 1)):
+        raise ValueError("Team ids must be 1..n")
+    # Row 0: no team
+    columns = list(zip((0, None, 0, 0, None, None, None, None, None, None, None), *teams))
+    (_, names, league_order, stadium_id, stadium_name, city, province,
+     max_capacity, full_roof, latitude, longitude) = columns
+
+    known = {**static_data.attendance_thresholds, **(attendance_thresholds or {})}
+    levels = [known.get(name, (None, None)) for name in names]
+    derby = np.zeros((len(names), len(names)), dtype=bool)
+    for team_id, rival_id in derby_pairs:
+        derby[team_id, rival_id] = derby[rival_id, team_id] = True
+    derby.flags.writeable = False
+
+    return TeamRegistry(
+        team_name=_column(names, object, None),
+        league_order=_column(league_order, np.int64, 0),
+        stadium_id=_column(stadium_id, np.int64, 0),
+        stadium_name=_column(stadium_name, object, None),
+        city=_column(city, object, None),
+        province=_column(province, object, None),
+        max_capacity=_column(max_capacity, np.float64, np.nan),
+        full_roof=_column(full_roof, np.float64, np.nan),
+        latitude=_column(latitude, np.float64, np.nan),
+        longitude=_column(longitude, np.float64, np.nan),
+        attendance_30th=_column([low for low, _ in levels], np.float64, np.nan),
+        attendance_70th=_column([high for _, high in levels], np.float64, np.nan),
+        derby=derby,
+        index=MappingProxyType({name: team_id for team_id, name in enumerate(names) if team_id}),
+    )
+
+
+def read(conn):
+    """Load the registry from an open football.db connection."""
+    teams = conn.execute(TEAM_QUERY).fetchall()
+    derby_pairs = conn.execute("SELECT team_id, rival_id FROM Derby").fetchall()
+    return build(teams, derby_pairs, thresholds.read_thresholds(conn))
+
+
+def load(db_path=DB_PATH):
+    """Load the registry from football.db (opened read-only)."""
+    with closing(sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)) as conn:
+        return read(conn)
+
+
+def current(db_path=DB_PATH):
+    """The registry of football.db, loaded once per process and again only when the file changes."""
+    from football.resources import load_cached
+    return load_cached(db_path, load)
+
+
+@functools.lru_cache(maxsize=1)
+def seed():
+    """The registry of the current league clubs, straight from static_data.py (no database)."""
+    stadium_ids = {}
+    teams = []
+    for order, (name, (stadium, capacity, city, province, roof)) in enumerate(static_data.league_clubs.items(), 1):
+        stadium_id = stadium_ids.setdefault(stadium, len(stadium_ids) + 1)
+        latitude, longitude = static_data.stadium_coordinates.get(stadium, (None, None))
+        teams.append((order, name, order, stadium_id, stadium, city, province, capacity, roof, latitude, longitude))
+    index = {team[1]: team[0] for team in teams}
+    derby_pairs = [(index[home], index[away]) for home, away in static_data.derbies]
+    return build(teams, derby_pairs)
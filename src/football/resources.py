@@ -0,0 +1,113 @@
+"""Process-wide cache for the heavy objects the app needs.
+
+Streamlit re-executes app_football.py on every widget interaction, but imported
+modules stay loaded for the whole life of the server process. Keeping the cache
+in this module means every rerun and every session shares a single
+deserialized copy of each model.
+"""
+
+import functools
+import hashlib
+import threading
+from collections import namedtuple
+from pathlib import Path
+
+from football.artifacts import load_artifact
+from football.tree_engine import compile_model
+
+
+_CacheEntry = namedtuple("_CacheEntry", ["mtime_ns", "size", "digest", "value"])
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """Return the sha256 hex digest of a file, read in chunks."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def load_cached(path, loader):
+    """Return loader(path), reusing the cached result while the file is unchanged.
+
+    A rerun only pays for an os.stat(). When the mtime or size changes the file
+    is hashed, and it is only loaded again if the content hash changed too, so
+    touching or re-copying an identical file does not trigger a reload.
+    """
+    path = Path(path).resolve()
+    stat = path.stat()
+
+    entry = _cache.get((path, loader))
+    if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+        return entry.value
+
+    with _lock:
+        # Another session may have reloaded the file while we were waiting
+        stat = path.stat()
+        entry = _cache.get((path, loader))
+        if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+            return entry.value
+
+        digest = file_digest(path)
+        if entry is not None and entry.digest == digest:
+            value = entry.value
+        else:
+            value = loader(path)
+
+        _cache[(path, loader)] = _CacheEntry(stat.st_mtime_ns, stat.st_size, digest, value)
+        return value
+
+
+def load_model(model_path):
+    """Load and verify a model artifact once per process (see load_cached)."""
+    return load_cached(model_path, load_artifact)
+
+
+def _load_engine(model_path):
+    return compile_model(load_artifact(model_path))
+
+
+def load_engine(model_path):
+    """Load a model artifact compiled into a TreeEngine, once per process."""
+    return load_cached(model_path, _load_engine)
+
+
+@functools.lru_cache(maxsize=8)
+def _interval_predictor(engine, companion, model):
+    # Keyed by the cached objects: a reloaded file gives a new key
+    from football.quantiles import IntervalPredictor
+    return IntervalPredictor(engine, companion, model)
+
+
+def load_interval_predictor(model_path, interval_path):
+    """Load a model and its P10/P90 companion, stacked into one IntervalPredictor."""
+    return _interval_predictor(load_engine(model_path), load_model(interval_path), load_model(model_path))
+
+
+def _load_cube(meta_path):
+    from football import cube
+    return cube.load(meta_path)
+
+
+def load_prediction_cube(cube_dir, model_path, interval_path):
+    """Load the prediction cube once per process (see cube.py).
+
+    Returns None when there is no cube, or when it was built from other model
+    files than the ones the app serves: the app then scores every match live.
+    """
+    meta_path = Path(cube_dir) / "meta.json"
+    if not meta_path.exists():
+        return None
+    cube = load_cached(meta_path, _load_cube)
+    digests = [load_cached(path, file_digest) for path in (model_path, interval_path)]
+    return cube if cube.model_digests == digests else None
+
+
+def clear_cache():
+    """Forget every cached resource (the next load reads from disk again)."""
+    with _lock:
+        _cache.clear()
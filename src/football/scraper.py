@@ -0,0 +1,254 @@
+"""Scrape Transfermarkt fixture pages ("spielplandatum") into a match CSV.
+
+The scraping notebook used to fetch every page one after the other, parse it
+with html.parser and keep every row in memory until the very end, so a crash
+lost the whole run. scrape() instead:
+
+- downloads pages with a small pool of worker threads;
+- keeps every raw page in a content-addressed cache (Data/html_cache/), so
+  re-parsing, e.g. after fixing the parser, never downloads again;
+- parses with lxml, and only the results table;
+- streams the rows of each page into the CSV as soon as the page and all the
+  pages before it are done (rows keep the order of the URL list);
+- records a checkpoint after every page, so a re-run skips pages already
+  written and resumes after the last complete one.
+
+Usage from the notebook:
+
+    from football.scraper import scrape
+    scrape(urls, "../Data/RawDataB.csv")
+
+Pass offline=True to parse only from the cache (no network access), e.g. to
+rebuild the CSV from saved pages.
+"""
+
+import csv
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+
+from football.paths import DATA_DIR
+
+
+HTML_CACHE_DIR = DATA_DIR / "html_cache"
+
+# Headers to mimic a browser request
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+# CSV file columns
+COLUMNS = ["Competition", "Matchday", "Date", "Time", "Home Team", "Ranking Home Team", "Away Team", "Ranking Away Team", "Attendance", "Result"]
+
+# Only the results table is turned into a tree, the rest of the page is skipped
+_TABLE_ONLY = SoupStrainer("div", class_="responsive-table")
+
+
+class PageCache:
+    """Raw pages stored by the sha256 of their content, with a URL -> hash index.
+
+    Pages are written to <dir>/<hash[:2]>/<hash>.html. Identical pages are
+    stored once. The index is an append-only JSON lines file, so it survives
+    an interrupted run.
+    """
+
+    def __init__(self, directory=HTML_CACHE_DIR):
+        self.directory = Path(directory)
+        self.index_path = self.directory / "index.jsonl"
+        self.index = {}
+        self._lock = threading.Lock()
+        if self.index_path.exists():
+            with open(self.index_path, encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.index[entry["url"]] = entry["sha256"]
+
+    def _page_path(self, digest):
+        return self.directory / digest[:2] / f"{digest}.html"
+
+    def get(self, url):
+        """Return the cached page body (bytes) for a URL, or None."""
+        digest = self.index.get(url)
+        if digest is None:
+            return None
+        path = self._page_path(digest)
+        return path.read_bytes() if path.exists() else None
+
+    def put(self, url, content):
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._page_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".tmp{threading.get_ident()}")
+            tmp.write_bytes(content)
+            os.replace(tmp, path)
+        with self._lock:
+            self.index[url] = digest
+            with open(self.index_path, "a", encoding="utf-8") as file:
+                file.write(json.dumps({"url": url, "sha256": digest}) + "\n")
+        return digest
+
+
+def parse_fixture_page(content, parser="lxml"):
+    """Return the match rows (lists in COLUMNS order) of one fixture page."""
+    soup = BeautifulSoup(content, parser, parse_only=_TABLE_ONLY)
+
+    # Find the table within the responsive-table div
+    table = soup.find("div", class_="responsive-table").find("table")
+    # Extract all rows from tbody
+    rows = table.find("tbody").find_all("tr")
+
+    # Initialize a variable to hold the current competition name
+    current_competition = ""
+    data = []
+
+    for row in rows:
+        # Check if the row contains a competition name
+        competition_cell = row.find("td", class_="extrarow bg_blau_20 hauptlink")
+        if competition_cell:
+            current_competition = competition_cell.get_text(strip=True)
+            continue  # This row doesn't contain match data
+
+        cells = row.find_all("td")
+        if len(cells) >= 11:  # Ensure the row contains enough data columns
+            matchday = cells[0].get_text(strip=True)
+            date = cells[1].get_text(strip=True)
+            time_ = cells[2].get_text(strip=True)
+
+            # Home team and its ranking
+            home_team_cell = cells[4]
+            home_team = home_team_cell.find("a").get_text(strip=True)
+            home_ranking_span = home_team_cell.find("span", class_="tabellenplatz")
+            home_ranking = home_ranking_span.get_text(strip=True) if home_ranking_span else ""
+
+            # Away team and its ranking
+            away_team_cell = cells[6]
+            away_team = away_team_cell.find("a").get_text(strip=True)
+            away_ranking_span = away_team_cell.find("span", class_="tabellenplatz")
+            away_ranking = away_ranking_span.get_text(strip=True) if away_ranking_span else ""
+
+            attendance = cells[9].get_text(strip=True)
+            result = cells[10].get_text(strip=True)
+
+            data.append([current_competition, matchday, date, time_, home_team, home_ranking, away_team, away_ranking, attendance, result])
+    return data
+
+
+class _Fetcher:
+    """Download a page (or read it from the cache); one requests.Session per thread."""
+
+    def __init__(self, cache, offline, timeout, retries, delay):
+        self.cache = cache
+        self.offline = offline
+        self.timeout = timeout
+        self.retries = retries
+        self.delay = delay
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers.update(HEADERS)
+        return session
+
+    def __call__(self, url):
+        content = self.cache.get(url)
+        if content is not None:
+            return content
+        if self.offline:
+            raise LookupError(f"Page not in the cache (offline run): {url}")
+
+        for attempt in range(self.retries):
+            try:
+                response = self._session().get(url, timeout=self.timeout)
+                if response.status_code == 200:
+                    self.cache.put(url, response.content)
+                    return response.content
+                print(f"HTTP {response.status_code} for {url}")
+            except requests.RequestException as e:
+                print(f"Request failed for {url}: {e}")
+            time.sleep(self.delay * 2 ** attempt)
+        raise RuntimeError(f"Could not download {url}")
+
+
+def _read_checkpoint(path):
+    """Return ({url: its checkpoint entry}, csv offset after the last complete page)."""
+    done, offset = {}, None
+    if path.exists():
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                done[entry["url"]] = entry
+                offset = entry["offset"]
+    return done, offset
+
+
+def _write_checkpoint(path, entries):
+    """Rewrite the checkpoint with only these entries (drops a line cut short by a crash)."""
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text("".join(json.dumps(entry) + "\n" for entry in entries), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def scrape(urls, output_csv, cache_dir=HTML_CACHE_DIR, workers=4, offline=False, restart=False,
+           parser="lxml", timeout=(5, 30), retries=3, delay=2.0):
+    """Scrape every URL into output_csv; return the number of rows written this run.
+
+    The checkpoint lives next to the CSV (<output>.checkpoint.jsonl). Pass
+    restart=True to ignore it and rebuild the CSV from scratch (cached pages
+    are still reused).
+    """
+    output_csv = Path(output_csv)
+    checkpoint_path = output_csv.with_name(output_csv.name + ".checkpoint.jsonl")
+    cache = PageCache(cache_dir)
+    cache.directory.mkdir(parents=True, exist_ok=True)
+
+    done, offset = ({}, None) if restart else _read_checkpoint(checkpoint_path)
+    if restart or offset is None or not output_csv.exists():
+        done = {}
+        checkpoint_path.unlink(missing_ok=True)
+        with open(output_csv, mode="w", newline="", encoding="utf-8") as file:
+            csv.writer(file).writerow(COLUMNS)
+    else:
+        # Drop rows of a page that was being written when the last run stopped,
+        # and its checkpoint line if it was cut short (new lines would be glued to it)
+        with open(output_csv, mode="r+b") as file:
+            file.truncate(offset)
+        _write_checkpoint(checkpoint_path, done.values())
+
+    pending = [url for url in dict.fromkeys(urls) if url not in done]
+    if done:
+        print(f"Resuming: {len(done)} page(s) already scraped, {len(pending)} to go")
+
+    fetch = _Fetcher(cache, offline, timeout, retries, delay)
+    written = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool, \
+            open(output_csv, mode="a", newline="", encoding="utf-8") as file, \
+            open(checkpoint_path, mode="a", encoding="utf-8") as checkpoint:
+        writer = csv.writer(file)
+        # map() yields in URL order, as soon as the next page in line is ready
+        for url, content in zip(pending, pool.map(fetch, pending)):
+            rows = parse_fixture_page(content, parser=parser)
+            writer.writerows(rows)
+            file.flush()
+            checkpoint.write(json.dumps({"url": url, "rows": len(rows), "offset": file.tell()}) + "\n")
+            checkpoint.flush()
+            written += len(rows)
+            print(f"Scraped: {url} ({len(rows)} rows)")
+
+    print(f"Data successfully written to {output_csv}")
+    return written
@@ -0,0 +1,210 @@
+"""HTTP JSON prediction service (for the ticketing system), next to the Streamlit app.
+
+Endpoints (request and response bodies are JSON):
+
+    GET  /health           {"status": "ok", "teams": 16, "prediction_cube": true}
+    GET  /teams            {"teams": [...]}, the current league teams in the app's order
+    POST /predict          one match -> one prediction
+    POST /predict/batch    {"matches": [...]} -> {"predictions": [...]}, scored on one matrix
+    POST /explain          one match -> why the model gives this number (explain.Explanation)
+
+A match is the same object core.py takes, e.g.
+
+    {"home_team": "Club Brugge", "away_team": "KAA Gent",
+     "match_date": "2026-03-14", "match_time": "18:15", "matchday": 28}
+
+and a prediction is core.Prediction as an object. An invalid match gets a 400
+with {"error": "..."}. The service never calls the weather API: send
+temperature and weather_condition to use the with-weather model.
+
+Run it from the src/ folder:
+
+    python -m football.service --port 8000 --workers 2
+
+The models, the prediction cube and the team registry are loaded before the
+socket accepts anything, then the process forks into the workers (on
+platforms with os.fork), which share the listening socket and the loaded
+arrays. Connections are HTTP/1.1 keep-alive, each served by a thread of its
+worker. Every worker checks the model and database files every few seconds
+(see resources.py) and reloads what changed, so retraining or a weekly
+update needs no restart. loadtest.py measures the throughput.
+"""
+
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from football.core import AttendancePredictor
+
+
+MAX_BODY_BYTES = 1 << 20
+MAX_BATCH_SIZE = 5000
+RELOAD_CHECK_SECONDS = 5
+
+
+class _PredictorHolder:
+    """The worker's AttendancePredictor, refreshed from the resource cache every few seconds."""
+
+    def __init__(self, check_every=RELOAD_CHECK_SECONDS):
+        self.check_every = check_every
+        self.lock = threading.Lock()
+        self.predictor = AttendancePredictor.current()
+        self.checked = time.monotonic()
+
+    def get(self):
+        if time.monotonic() - self.checked > self.check_every:
+            with self.lock:
+                if time.monotonic() - self.checked > self.check_every:
+                    self.predictor = AttendancePredictor.current()
+                    self.checked = time.monotonic()
+        return self.predictor
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"       # keep-alive
+    disable_nagle_algorithm = True      # headers and body are two writes: do not wait for the client's ACK
+    server_version = "FootballAttendance/1.0"
+
+    def do_GET(self):
+        predictor = self.server.predictors.get()
+        if self.path == "/health":
+            self._send(200, {
+                "status": "ok",
+                "teams": len(predictor.teams.league_teams),
+                "prediction_cube": predictor.prediction_cube is not None,
+            })
+        elif self.path == "/teams":
+            self._send(200, {"teams": list(predictor.teams.league_teams)})
+        else:
+            self._send(404, {"error": f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        if self.path not in ("/predict", "/predict/batch", "/explain"):
+            self._send(404, {"error": f"Unknown path: {self.path}"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self._send(413, {"error": f"Request body over {MAX_BODY_BYTES} bytes"})
+            return
+        try:
+            body = json.loads(self.rfile.read(length) or b"null")
+        except ValueError:
+            self._send(400, {"error": "The request body is not valid JSON"})
+            return
+
+        predictor = self.server.predictors.get()
+        try:
+            if self.path == "/predict":
+                response = predictor.predict(body)._asdict()
+            elif self.path == "/explain":
+                why = predictor.explain(body)
+                response = {**why._asdict(), "contributions": [line._asdict() for line in why.contributions]}
+            else:
+                matches = body.get("matches") if isinstance(body, dict) else None
+                if not isinstance(matches, list):
+                    raise ValueError('A batch must be an object with a "matches" list')
+                if len(matches) > MAX_BATCH_SIZE:
+                    raise ValueError(f"At most {MAX_BATCH_SIZE} matches per batch")
+                response = {"predictions": [p._asdict() for p in predictor.predict_many(matches)]}
+        except ValueError as error:
+            self._send(400, {"error": str(error)})
+        except Exception:
+            traceback.print_exc()
+            self._send(500, {"error": "Internal error"})
+        else:
+            self._send(200, response)
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class PredictionServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, verbose=False):
+        super().__init__(address, _Handler)
+        self.verbose = verbose
+        self.predictors = _PredictorHolder()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_server(host="127.0.0.1", port=0):
+    """Run the service in a background thread of this process (port 0: any free port); return the server."""
+    server = PredictionServer((host, port))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serve(host="127.0.0.1", port=8000, workers=1, verbose=False):
+    """Bind, preload everything, fork `workers` processes sharing the socket, and serve until stopped."""
+    server = PredictionServer((host, port), verbose=verbose)
+    print(f"✅ Serving attendance predictions on {server.url} "
+          f"({workers} worker{'s' if workers > 1 else ''}, {server.predictors.get()!r})", flush=True)
+    if workers <= 1 or not hasattr(os, "fork"):
+        server.serve_forever()
+        return
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    def stop(*_):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        stop()
+    server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve attendance predictions over HTTP (JSON).")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8000, help="port (default: 8000)")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (default: 1, one per CPU core is plenty)")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    try:
+        serve(args.host, args.port, args.workers, args.verbose)
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Seed data of the team registry: the clubs of the current season and their stadiums.
+
+football.db is built from these tables (Team, Stadium and Derby, see db.py),
+and the app, the batch scorer and the training code read the team facts back
+from the database through registry.py. The cleaning step, which produces the
+database's input, reads them through registry.seed(). Edit the season's clubs
+here, then rebuild the database.
+"""
+
+# 🇧🇪 Clubs of the current Jupiler Pro League season (2024–25), in the order the app lists them
+# team: (stadium, max capacity, city, province, full roof)
+league_clubs = {
+    "Club Brugge": ("Jan Breydel Stadion", 29062, "Bruges", "VWV", 0),
+    "Cercle Brugge": ("Jan Breydel Stadion", 29062, "Bruges", "VWV", 0),
+    "Genk": ("Cegeka Arena", 23500, "Genk", "LIM", 1),
+    "RSC Anderlecht": ("Lotto Park", 22500, "Anderlecht (Brussels)", "BRU", 1),
+    "Union SG": ("Joseph Marien Stadium", 9400, "Forest (Brussels)", "BRU", 0),
+    "KAA Gent": ("Ghelamco Arena", 20000, "Ghent", "VOV", 1),
+    "Royal Antwerp": ("Bosuilstadion", 16644, "Antwerp", "ANT", 0),
+    "KVC Westerlo": ("Het Kuipje", 8000, "Westerlo", "ANT", 0),
+    "Standard Liège": ("Stade Maurice Dufrasne", 27670, "Liège", "LIE", 0),
+    "KV Mechelen": ("AFAS Stadion", 16500, "Mechelen", "ANT", 0),
+    "R Charleroi SC": ("Stade du Pays de Charleroi", 15000, "Charleroi", "WHT", 0),
+    "OH Leuven": ("Den Dreef", 10500, "Leuven", "VBR", 1),
+    "Sint-Truiden": ("Stayen", 14600, "Sint-Truiden", "LIM", 1),
+    "FCV Dender EH": ("Van Roystadion", 6200, "Denderleeuw", "VBR", 0),
+    "Zulte Waregem": ("Regenboogstadion", 12400, "Waregem", "WVL", 0),
+    "La Louvière": ("Stade du Tivoli", 12000, "La Louvière", "WHT", 0),
+}
+
+# Stadium coordinates (weather forecast and historical weather)
+stadium_coordinates = {
+    "Jan Breydel Stadion": (51.19333, 3.18056),
+    "Cegeka Arena": (51.00500, 5.53333),
+    "Lotto Park": (50.83417, 4.29833),
+    "Joseph Marien Stadium": (50.81733, 4.32417),
+    "Ghelamco Arena": (51.01611, 3.73417),
+    "Bosuilstadion": (51.22500, 4.46992),
+    "Het Kuipje": (51.09482, 4.92881),
+    "Stade Maurice Dufrasne": (50.60597, 5.53934),
+    "AFAS Stadion": (51.03718, 4.48640),
+    "Stade du Pays de Charleroi": (50.41461, 4.45379),
+    "Den Dreef": (50.86833, 4.69417),
+    "Stayen": (50.81347, 5.16626),
+    "Van Roystadion": (50.88368, 4.07118),
+    "Regenboogstadion": (50.88306, 3.42889),
+    "Stade du Tivoli": (50.47750, 4.20131),
+}
+
+# Derbies, stored in one direction only
+derbies = {
+    ("Club Brugge", "Cercle Brugge"): "Bruges Derby",
+    ("RSC Anderlecht", "Union SG"): "Brussels Derby",
+    ("Genk", "Sint-Truiden"): "Limburg Derby",
+    ("Standard Liège", "R Charleroi SC"): "Walloon Derby",
+    ("OH Leuven", "KV Mechelen"): "Dijle Derby",
+}
+
+# 30th / 70th percentile of the home attendance (Low / Normal / High thresholds) of clubs
+# without a home match in football.db yet; the others are computed from their matches (thresholds.py)
+attendance_thresholds = {
+    "La Louvière": (1888.0, 3053.0),
+}
@@ -0,0 +1,226 @@
+"""Attendance thresholds of every team, kept up to date one match at a time.
+
+An attendance is Low below the 30th percentile of the home team's home
+attendances and High above the 70th. Those percentiles used to be literals
+computed once in the cleaning notebook, so they went stale as soon as a
+matchday was appended. Now every team keeps its home attendances as a sorted
+list per scope:
+
+    "all"        every home match in football.db (what the app and the batch scorer use)
+    "2024/2025"  one season (one scope per season label)
+    "rolling"    the last ROLLING_WINDOW home matches
+
+A new match is a bisect.insort into each of its team's lists (the rolling
+window also drops its oldest value), and the percentiles are read straight
+off the sorted list with the same linear interpolation as pandas' quantile(),
+so they are exact, not an estimate.
+
+The lists live in football.db (table TeamAttendance, one row per team and
+scope). They are refreshed after every build or append of the database,
+replaying only the matches added since the last refresh, and the registry
+(registry.py) reads the "all" thresholds from there. Other scopes:
+
+    from football.thresholds import LATEST_SEASON, ROLLING, team_thresholds
+    team_thresholds("Club Brugge", ROLLING)          # (30th, 70th) or None
+
+Rebuild the table from the Match table (from the src/ folder):
+
+    python -m football.thresholds
+"""
+
+import sqlite3
+from bisect import bisect_left, insort
+from collections import deque
+from contextlib import closing
+
+import numpy as np
+
+from football.paths import DB_PATH
+
+
+QUANTILES = (0.3, 0.7)
+ROLLING_WINDOW = 20         # about one season of home games
+
+ALL = "all"
+ROLLING = "rolling"
+LATEST_SEASON = "latest season"     # resolved to the team's latest season scope when read
+
+threshold_table_sql = """
+CREATE TABLE IF NOT EXISTS TeamAttendance (
+    team_id          INTEGER NOT NULL,
+    scope            TEXT NOT NULL,
+    games_played     INTEGER NOT NULL,
+    last_match_id    INTEGER NOT NULL,
+    attendances      TEXT NOT NULL,
+    attendance_30th  REAL,
+    attendance_70th  REAL,
+    PRIMARY KEY (team_id, scope),
+    FOREIGN KEY (team_id) REFERENCES Team(team_id)
+) WITHOUT ROWID;
+"""
+
+
+class AttendanceSample:
+    """One team's home attendances in one scope, kept sorted (the rolling one also in match order)."""
+
+    __slots__ = ("team", "scope", "values", "window")
+
+    def __init__(self, team, scope, attendances=()):
+        self.team = team
+        self.scope = scope
+        self.window = deque(attendances, maxlen=ROLLING_WINDOW) if scope == ROLLING else None
+        self.values = sorted(attendances if self.window is None else self.window)
+
+    def push(self, attendance):
+        attendance = float(attendance)
+        if self.window is not None:
+            if len(self.window) == self.window.maxlen:
+                del self.values[bisect_left(self.values, self.window[0])]
+            self.window.append(attendance)
+        insort(self.values, attendance)
+
+    def stored(self):
+        """The attendances as saved: match order for the rolling window, sorted otherwise."""
+        return list(self.window) if self.window is not None else self.values
+
+    def thresholds(self):
+        """(30th, 70th) percentile, interpolated like pandas' Series.quantile; None without games."""
+        if not self.values:
+            return None, None
+        low, high = np.quantile(self.values, QUANTILES)
+        return float(low), float(high)
+
+
+class ThresholdStore:
+    """Every team's AttendanceSample, per scope."""
+
+    def __init__(self, last_match_id=0):
+        self.samples = {}
+        self.last_match_id = last_match_id
+
+    def sample(self, team, scope=ALL):
+        key = (team, scope)
+        sample = self.samples.get(key)
+        if sample is None:
+            sample = self.samples[key] = AttendanceSample(team, scope)
+        return sample
+
+    def add_match(self, home_team, season, attendance, match_id=None):
+        """Add one home attendance to the team's all-time, season and rolling samples."""
+        if attendance is not None and not np.isnan(attendance):
+            scopes = (ALL, ROLLING) if season in (None, "Unknown") else (ALL, ROLLING, str(season))
+            for scope in scopes:
+                self.sample(home_team, scope).push(attendance)
+        if match_id is not None:
+            self.last_match_id = max(self.last_match_id, int(match_id))
+
+    @classmethod
+    def load(cls, conn):
+        """Read the TeamAttendance table (an empty store if the database has none yet)."""
+        conn.execute(threshold_table_sql)
+        store = cls()
+        rows = conn.execute("""
+            SELECT t.team_name, a.scope, a.last_match_id, a.attendances
+            FROM TeamAttendance AS a JOIN Team AS t ON t.team_id = a.team_id
+        """).fetchall()
+        for team, scope, last_match_id, attendances in rows:
+            store.samples[(team, scope)] = AttendanceSample(team, scope, _floats(attendances))
+            store.last_match_id = max(store.last_match_id, last_match_id)
+        return store
+
+    def save(self, conn):
+        """Write every sample to TeamAttendance (replacing the stored ones)."""
+        conn.execute(threshold_table_sql)
+        team_ids = dict(conn.execute("SELECT team_name, team_id FROM Team").fetchall())
+        rows = []
+        for (team, scope), sample in self.samples.items():
+            low, high = sample.thresholds()
+            rows.append((
+                team_ids[team], scope, len(sample.values), self.last_match_id,
+                _text(sample.stored()), low, high,
+            ))
+        conn.execute("DELETE FROM TeamAttendance")
+        conn.executemany("INSERT INTO TeamAttendance VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.commit()
+
+
+def _text(values):
+    return ",".join(repr(v) for v in values)
+
+
+def _floats(text):
+    return [float(v) for v in text.split(",")] if text else []
+
+
+def refresh(conn):
+    """Bring TeamAttendance up to date with the Match table; return the store.
+
+    Only matches added since the last refresh are read (in match_id order,
+    which the rolling window needs), so after a weekly append this touches a
+    handful of rows and never rescans the match history.
+    """
+    store = ThresholdStore.load(conn)
+    rows = conn.execute("""
+        SELECT m.match_id, t.team_name, m.season, m.attendance
+        FROM Match AS m
+        JOIN MatchParticipation AS mp ON mp.match_id = m.match_id AND mp.is_home = 1
+        JOIN Team AS t ON t.team_id = mp.team_id
+        WHERE m.match_id > ?
+        ORDER BY m.match_id
+    """, (store.last_match_id,)).fetchall()
+    for match_id, home_team, season, attendance in rows:
+        store.add_match(home_team, season, attendance, match_id)
+    if rows:
+        store.save(conn)
+    return store
+
+
+def read_thresholds(conn, scope=ALL):
+    """{team name: (30th, 70th)} of one scope from an open connection ({} before the first refresh)."""
+    try:
+        rows = conn.execute("""
+            SELECT t.team_name, a.attendance_30th, a.attendance_70th
+            FROM TeamAttendance AS a JOIN Team AS t ON t.team_id = a.team_id
+            WHERE a.scope = ?
+        """, (scope,)).fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    return {team: (low, high) for team, low, high in rows if low is not None}
+
+
+def team_thresholds(team, scope=ALL, db_path=DB_PATH):
+    """(30th, 70th) home attendance percentile of one team, or None if it has no home game in scope.
+
+    `scope` is ALL, ROLLING, a season label ("2024/2025") or LATEST_SEASON
+    (the last season the team played a home game in).
+    """
+    if scope == LATEST_SEASON:
+        condition, params = "a.scope NOT IN (?, ?) ORDER BY a.scope DESC LIMIT 1", (ALL, ROLLING)
+    else:
+        condition, params = "a.scope = ?", (scope,)
+    try:
+        with closing(sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)) as conn:
+            row = conn.execute(f"""
+                SELECT a.attendance_30th, a.attendance_70th
+                FROM TeamAttendance AS a JOIN Team AS t ON t.team_id = a.team_id
+                WHERE t.team_name = ? AND {condition}
+            """, (team,) + params).fetchone()
+    except sqlite3.Error:
+        return None
+    return tuple(row) if row and row[0] is not None else None
+
+
+def main():
+    """Rebuild TeamAttendance from scratch (python -m football.thresholds)."""
+    with closing(sqlite3.connect(DB_PATH)) as conn:
+        conn.execute(threshold_table_sql)
+        conn.execute("DELETE FROM TeamAttendance")
+        conn.commit()
+        store = refresh(conn)
+    scopes = {scope for _, scope in store.samples}
+    print(f"✅ TeamAttendance rebuilt: {len(store.samples)} samples ({len(scopes)} scopes), "
+          f"up to match {store.last_match_id}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+"""Encoded training matrix, materialised next to football.db.
+
+The ML notebook used to query the database and rerun get_dummies on every
+match each time it was opened. This module does that work once and stores the
+result in Data/training_view/:
+
+    X.npy          float32 design matrix (one row per match, feature_cols order)
+    y.npy          float64 target (PercentageAttendance, clipped to 1)
+    match_id.npy   match_id of every row in football.db
+    meta.json      columns, categories seen, last match, build stamp, data version
+
+refresh() only encodes the matches added since the last refresh (the weekly
+append) with the FeatureEncoder the app uses. The view is rebuilt from scratch
+when the database was rebuilt or upserted (db.build_stamp changed), when the
+transforms below changed (SCHEMA_VERSION) or when a new match brings a
+category the columns do not cover yet (a new team, matchday or weather type).
+
+From the notebooks (cwd src/):
+
+    from football import training_view
+    view = training_view.refresh()
+    X, y = view.X, view.y
+
+From the command line:
+
+    cd src
+    python -m football.training_view [--rebuild]
+
+data_version in meta.json is a hash of X, y and the columns: two views with
+the same data_version hold exactly the same training data.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from collections import namedtuple
+from contextlib import closing
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from football import db, registry
+from football.features import FeatureEncoder
+from football.paths import DB_PATH, TRAINING_VIEW_DIR
+
+
+# Bump when the query or the transforms below change, so stored views are rebuilt
+SCHEMA_VERSION = 1
+
+TARGET = "PercentageAttendance"
+
+# One-hot encoded as in the ML notebook: the first group with drop_first=True,
+# the second one in full (for easier feature importance analysis)
+DUMMIES_DROP_FIRST = ["Matchday", "Home Team", "Away Team", "Weekday"]
+DUMMIES_FULL = ["Opposing team Category", "Home team Category", "Game day", "Time slot", "Weather GoodBad", "Weather"]
+
+TRAINING_QUERY = """
+SELECT
+    -- Competition was constant in the original CSV
+    'Jupiler Pro League'                    AS Competition,
+
+    -- calendar / ids
+    m.match_id                              AS match_id,
+    m.matchday_label                        AS Matchday,
+    m.match_date                            AS Date,
+    CAST(m.time_hour AS FLOAT)              AS Time,
+
+    -- teams & rankings
+    t_home.team_name                        AS "Home Team",
+    mp_home.ranking_at_match                AS "Ranking Home Team",
+    t_away.team_name                        AS "Away Team",
+    mp_away.ranking_at_match                AS "Ranking Away Team",
+
+    -- attendance
+    m.attendance                            AS Attendance,
+    m.percentage_attendance                 AS PercentageAttendance,
+
+    -- weather
+    m.weather_type                          AS Weather,
+    m.temperature_c                         AS "Temperature (°C)",
+    m.weather_quality                       AS "Weather GoodBad",
+
+    -- calendar details
+    m.weekday                               AS Weekday,
+    m.month                                 AS Month,
+    CAST(strftime('%Y', m.match_date) AS INT) AS Year,
+    m.season                                AS Season,
+    -- quarter of the match date: 1..4
+    CAST(((CAST(strftime('%m', m.match_date) AS INT) - 1) / 3 + 1) AS INT) AS quarter,
+    m.day_of_month                          AS Day,
+    m.game_day_type                         AS "Game day",
+    m.time_slot                             AS "Time slot",
+    m.derby_flag                            AS Derby,
+
+    -- stadium
+    s.stadium_name                          AS Stadium,
+    CAST(s.max_capacity AS FLOAT)           AS "Max Capacity",
+    s.city                                  AS City,
+    s.province                              AS Province,
+    CAST(s.full_roof AS FLOAT)              AS "Full Roof",
+
+    -- macro context (already lagged in the CSV)
+    ec.gdp_real_lagq                        AS GDP_Real_lagQ,
+    ec.cpi_qoq_growth_pct_lagq              AS "CPI_QoQ_Growth_%_lagQ",
+    ec.employment_rate_pct_lagq             AS "Employment_Rate_%_lagQ",
+
+    -- goals & outcomes
+    mp_home.goals_scored                    AS "Home Team Goals Scored",
+    mp_away.goals_scored                    AS "Away Team Goals Scored",
+    m.match_type                            AS "Match Type",
+    mp_home.outcome                         AS "Home Team Outcome",
+    mp_away.outcome                         AS "Away Team Outcome",
+
+    -- rolling stats & categories (from the home team row)
+    mp_home.goals_scored_last5              AS "Goals Scored in Last 5 Games",
+    mp_home.goals_conceded_last5            AS "Goals Conceded in Last 5 Games",
+    mp_home.wins_last5                      AS "Number of Wins in Last 5 Games",
+    mp_home.opponent_category               AS "Opposing team Category",
+    mp_home.team_category                   AS "Home team Category"
+
+FROM Match AS m
+JOIN Stadium AS s
+    ON m.stadium_id = s.stadium_id
+JOIN EconomicContext AS ec
+    ON m.year    = ec.year
+   AND m.quarter = ec.quarter
+JOIN MatchParticipation AS mp_home
+    ON m.match_id = mp_home.match_id
+   AND mp_home.is_home = 1
+JOIN Team AS t_home
+    ON mp_home.team_id = t_home.team_id
+JOIN MatchParticipation AS mp_away
+    ON m.match_id = mp_away.match_id
+   AND mp_away.is_home = 0
+JOIN Team AS t_away
+    ON mp_away.team_id = t_away.team_id
+WHERE m.match_id > ?
+ORDER BY m.match_id;
+"""
+
+TrainingView = namedtuple("TrainingView", ["X", "y", "match_ids", "columns", "meta"])
+
+
+def read_training_frame(conn, after_match_id=0):
+    """Return the training rows of the matches with match_id > after_match_id."""
+    return pd.read_sql_query(TRAINING_QUERY, conn, params=(after_match_id,))
+
+
+def prepare(df, teams=None):
+    """Apply the ML notebook's row transforms before one-hot encoding.
+
+    Caps PercentageAttendance at 1 and Attendance at the stadium capacity,
+    drops Year and quarter (collinear with GDP) and puts every away team that
+    is not in the current league (of `teams`, by default registry.current())
+    under "Unknown".
+    """
+    df = df.copy()
+    df[TARGET] = df[TARGET].clip(upper=1)
+    df["Attendance"] = np.minimum(df["Attendance"], df["Max Capacity"])
+    df = df.drop(columns=["Year", "quarter"], errors="ignore")
+    teams = teams or registry.current()
+    in_league = teams.league_order[teams.ids(df["Away Team"])] > 0
+    df["Away Team"] = df["Away Team"].where(in_league, "Unknown")
+    return df
+
+
+def ranked_rows(df):
+    """Mask of the rows the models train on (both rankings known, i.e. not 0)."""
+    return ((df["Ranking Home Team"] != 0) & (df["Ranking Away Team"] != 0)).to_numpy()
+
+
+def categories(df):
+    """Sorted distinct values of every one-hot encoded column."""
+    return {
+        column: sorted(str(value) for value in df[column].dropna().unique())
+        for column in DUMMIES_DROP_FIRST + DUMMIES_FULL
+    }
+
+
+def design_columns(df):
+    """Feature columns get_dummies gives for these (prepared) rows, in notebook order."""
+    dummies = pd.get_dummies(df, columns=DUMMIES_DROP_FIRST, drop_first=True)
+    dummies = pd.get_dummies(dummies, columns=DUMMIES_FULL, drop_first=False)
+    return list(
+        dummies.drop(columns=[TARGET, "Attendance"], errors="ignore")
+               .select_dtypes(include=["number", "bool"])
+               .columns
+    )
+
+
+def training_rows(df, first_row_id=1):
+    """Return (rows, match_ids): the prepared rows the models train on, not yet encoded.
+
+    Unranked rows are dropped and the "match_id" feature becomes the row
+    number in the training set (as the notebook renumbers it), so new rows
+    continue from first_row_id. The database match_id is returned separately.
+    """
+    rows = df.loc[ranked_rows(df)].reset_index(drop=True)
+    match_ids = rows["match_id"].to_numpy(dtype=np.int64)
+    rows["match_id"] = np.arange(first_row_id, first_row_id + len(rows))
+    return rows, match_ids
+
+
+def encode(df, columns, first_row_id=1):
+    """Encode prepared rows into (X, y, match_ids), dropping unranked rows (see training_rows)."""
+    rows, match_ids = training_rows(df, first_row_id)
+    X = FeatureEncoder(columns).encode_frame(rows)
+    y = rows[TARGET].to_numpy(dtype=np.float64)
+    return X, y, match_ids
+
+
+def data_version(X, y, columns):
+    """Hash of the training data; equal hashes mean identical X, y and columns."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(list(columns)).encode())
+    digest.update(np.ascontiguousarray(X).tobytes())
+    digest.update(np.ascontiguousarray(y).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def weather_columns(columns):
+    """Columns dropped for the model without weather (as in the ML notebook)."""
+    return [
+        c for c in columns
+        if c.startswith("Weather_") or c.startswith("Weather GoodBad_") or c == "Temperature (°C)"
+    ]
+
+
+def without_weather(view):
+    """Return (X, columns) of the view without the weather features."""
+    dropped = set(weather_columns(view.columns))
+    keep = [i for i, c in enumerate(view.columns) if c not in dropped]
+    return view.X[:, keep], [view.columns[i] for i in keep]
+
+
+############################## STORAGE ##############################
+
+def _save_array(path, array):
+    tmp = path.with_suffix(".tmp.npy")
+    np.save(tmp, array)
+    os.replace(tmp, path)
+
+
+def _save(view_dir, X, y, match_ids, meta):
+    """Write the arrays, then meta.json last: a view with a meta is always complete."""
+    view_dir = Path(view_dir)
+    view_dir.mkdir(parents=True, exist_ok=True)
+    meta_path = view_dir / "meta.json"
+    meta_path.unlink(missing_ok=True)
+    _save_array(view_dir / "X.npy", X)
+    _save_array(view_dir / "y.npy", y)
+    _save_array(view_dir / "match_id.npy", match_ids)
+    tmp = meta_path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(meta, indent=1, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, meta_path)
+
+
+def read_meta(view_dir=TRAINING_VIEW_DIR):
+    """Return the stored meta.json, or None if there is no complete view."""
+    meta_path = Path(view_dir) / "meta.json"
+    if not meta_path.exists():
+        return None
+    return json.loads(meta_path.read_text(encoding="utf-8"))
+
+
+def load(view_dir=TRAINING_VIEW_DIR, mmap=True):
+    """Load the stored view (memory-mapped by default, so loading is instant)."""
+    view_dir = Path(view_dir)
+    meta = read_meta(view_dir)
+    if meta is None:
+        raise FileNotFoundError(f"No training view in {view_dir}; run refresh() first")
+    mode = "r" if mmap else None
+    return TrainingView(
+        X=np.load(view_dir / "X.npy", mmap_mode=mode),
+        y=np.load(view_dir / "y.npy", mmap_mode=mode),
+        match_ids=np.load(view_dir / "match_id.npy", mmap_mode=mode),
+        columns=meta["columns"],
+        meta=meta,
+    )
+
+
+############################## BUILD / REFRESH ##############################
+
+def _meta(X, y, columns, seen, last_match_id, stamp, revision):
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "build_stamp": stamp,
+        "revision": revision,
+        "data_version": data_version(X, y, columns),
+        "rows": int(len(X)),
+        "last_match_id": int(last_match_id),
+        "refreshed_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "columns": list(columns),
+        "categories": seen,
+    }
+
+
+def rebuild(db_path=DB_PATH, view_dir=TRAINING_VIEW_DIR):
+    """Encode every match of the database into a new view."""
+    stamp = db.build_stamp(db_path)
+    previous = read_meta(view_dir)
+    with closing(db.connect(db_path)) as conn:
+        df = prepare(read_training_frame(conn), registry.read(conn))
+
+    columns = design_columns(df)
+    X, y, match_ids = encode(df, columns)
+    last_match_id = int(df["match_id"].max()) if len(df) else 0
+    revision = previous["revision"] + 1 if previous else 1
+    meta = _meta(X, y, columns, categories(df), last_match_id, stamp, revision)
+    _save(view_dir, X, y, match_ids, meta)
+    return load(view_dir)
+
+
+def _new_categories(df, seen):
+    found = categories(df)
+    return {column: sorted(set(values) - set(seen.get(column, [])))
+            for column, values in found.items() if set(values) - set(seen.get(column, []))}
+
+
+def refresh(db_path=DB_PATH, view_dir=TRAINING_VIEW_DIR, verbose=False):
+    """Bring the view up to date with the database and return it.
+
+    Only the matches added since the last refresh are read and encoded. Falls
+    back to rebuild() when the stored view cannot simply be extended.
+    """
+    def log(message):
+        if verbose:
+            print(message)
+
+    meta = read_meta(view_dir)
+    stamp = db.build_stamp(db_path)
+    if meta is None:
+        log("No stored view: building it")
+        return rebuild(db_path, view_dir)
+    if meta["schema_version"] != SCHEMA_VERSION or meta["build_stamp"] != stamp:
+        log("Database rebuilt or transforms changed: rebuilding the view")
+        return rebuild(db_path, view_dir)
+
+    with closing(db.connect(db_path)) as conn:
+        last_in_db = conn.execute("SELECT COALESCE(MAX(match_id), 0) FROM Match").fetchone()[0]
+        if last_in_db < meta["last_match_id"]:
+            log("Matches were removed from the database: rebuilding the view")
+            return rebuild(db_path, view_dir)
+        if last_in_db == meta["last_match_id"]:
+            log(f"View up to date ({meta['rows']} rows)")
+            return load(view_dir)
+        df = prepare(read_training_frame(conn, meta["last_match_id"]), registry.read(conn))
+
+    new = _new_categories(df, meta["categories"])
+    if new:
+        log(f"New categories {new}: rebuilding the view")
+        return rebuild(db_path, view_dir)
+
+    view = load(view_dir, mmap=False)
+    X_new, y_new, ids_new = encode(df, view.columns, first_row_id=meta["rows"] + 1)
+    X = np.concatenate([view.X, X_new])
+    y = np.concatenate([view.y, y_new])
+    match_ids = np.concatenate([view.match_ids, ids_new])
+    meta = _meta(X, y, view.columns, meta["categories"], last_in_db, stamp, meta["revision"] + 1)
+    _save(view_dir, X, y, match_ids, meta)
+    log(f"Appended {len(X_new)} rows ({len(X)} in total)")
+    return load(view_dir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh the encoded training matrix next to football.db.")
+    parser.add_argument("--db", default=DB_PATH, help="database file (default: Data/football.db)")
+    parser.add_argument("-o", "--output", default=TRAINING_VIEW_DIR, help="view directory (default: Data/training_view)")
+    parser.add_argument("--rebuild", action="store_true", help="encode every match again instead of only the new ones")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.rebuild:
+        view = rebuild(args.db, args.output)
+    else:
+        view = refresh(args.db, args.output, verbose=True)
+    print(f"✅ {view.X.shape[0]} rows x {view.X.shape[1]} features, "
+          f"revision {view.meta['revision']}, data version {view.meta['data_version']} "
+          f"({time.perf_counter() - start:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""Fast single-row predictions: the XGBoost ensemble flattened into NumPy arrays.
+
+XGBRegressor.predict builds a DMatrix and validates its input on every call.
+For the one row the app scores per click, that overhead is most of the time.
+TreeEngine reads the booster's JSON dump once and stores every node of every
+tree in flat arrays (feature, threshold, left / right child, default
+direction for missing values, leaf value). A prediction walks all trees at
+once, one depth level per step, with fancy indexing:
+
+    engine = compile_model(model)
+    engine.predict(row)          # row: float32 array ordered like engine.feature_names
+
+Leaves point to themselves, so rows that reach a leaf early simply stay there
+until the deepest tree is done. Splits follow XGBoost's rule (go left when
+x < threshold, missing values follow default_left) on float32 inputs, and the
+leaf values are added tree by tree in float32 from base_score, like XGBoost's
+CPU predictor, so the output matches model.predict.
+
+Check it against model.predict on the whole training set (from src/):
+
+    python -m football.tree_engine
+"""
+
+import json
+import time
+
+import numpy as np
+
+
+class TreeEngine:
+    """A compiled tree ensemble for regression models with an identity link.
+
+    Multi-output boosters (e.g. reg:quantileerror with several quantile_alpha)
+    are supported: every tree adds to one output column, and predict()
+    returns an (n_rows, n_outputs) array for them.
+    """
+
+    def __init__(self, booster):
+        dump = json.loads(booster.save_raw("json"))
+        learner = dump["learner"]
+        if learner["gradient_booster"]["name"] != "gbtree":
+            raise ValueError(f"Only gbtree models can be compiled, not {learner['gradient_booster']['name']}")
+        objective = learner["objective"]["name"]
+        if objective not in ("reg:squarederror", "reg:absoluteerror", "reg:quantileerror", "reg:pseudohubererror"):
+            raise ValueError(f"Objective {objective} has a non-identity link, use model.predict")
+
+        model = learner["gradient_booster"]["model"]
+        trees = model["trees"]
+        if any(any(tree["split_type"]) for tree in trees):
+            raise ValueError("Categorical splits are not supported")
+
+        # Only the trees predict() uses (all of them unless training stopped early)
+        best_iteration = booster.attr("best_iteration")
+        if best_iteration is not None:
+            trees = trees[:int(model["iteration_indptr"][int(best_iteration) + 1])]
+
+        base_score = learner["learner_model_param"]["base_score"]   # "[6.2E-1]" since XGBoost 3
+        base_score = json.loads(base_score) if base_score.startswith("[") else [float(base_score)]
+
+        sizes = np.array([len(tree["left_children"]) for tree in trees])
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+        left = np.concatenate([np.asarray(t["left_children"], dtype=np.int64) for t in trees])
+        right = np.concatenate([np.asarray(t["right_children"], dtype=np.int64) for t in trees])
+        base = np.repeat(offsets, sizes)
+        leaf = left < 0
+        node = np.arange(len(left))
+
+        feature = np.concatenate([np.asarray(t["split_indices"], dtype=np.int64) for t in trees])
+        threshold = np.concatenate([np.asarray(t["split_conditions"], dtype=np.float32) for t in trees])
+        # Leaves hold their value in split_conditions and loop back to themselves
+        value = np.where(leaf, threshold, np.float32(0)).astype(np.float32)
+        feature[leaf] = 0
+        threshold[leaf] = np.inf
+
+        self._set(
+            feature_names=list(booster.feature_names or []),
+            n_features=booster.num_features(),
+            base_score=np.asarray(base_score, dtype=np.float32),
+            output=np.asarray(model["tree_info"][:len(trees)], dtype=np.int64),
+            roots=offsets,
+            feature=feature,
+            threshold=threshold,
+            default_left=np.concatenate([np.asarray(t["default_left"], dtype=bool) for t in trees]),
+            left=np.where(leaf, node, left + base),
+            right=np.where(leaf, node, right + base),
+            value=value,
+            depth=max((_depth(t) for t in trees), default=0),
+        )
+
+    def _set(self, feature_names, n_features, base_score, output, roots, feature, threshold,
+             default_left, left, right, value, depth):
+        self.feature_names = feature_names
+        self.n_features = n_features
+        self.base_score = base_score
+        self.output = output            # output column of every tree
+        self.n_outputs = len(base_score)
+        self.n_trees = len(roots)
+        self.roots = roots
+        self.feature = feature
+        self.threshold = threshold
+        self.default_left = default_left
+        self.left = left
+        self.right = right
+        self.value = value
+        self.depth = depth
+        # Trees of each output column, in boosting order
+        self._trees_of = [np.flatnonzero(output == k) for k in range(self.n_outputs)]
+
+    def __repr__(self):
+        outputs = f", {self.n_outputs} outputs" if self.n_outputs > 1 else ""
+        return f"TreeEngine({self.n_trees} trees, depth {self.depth}, {self.n_features} features{outputs})"
+
+    def leaves(self, X):
+        """Return the leaf node index reached in every tree, shape (n_rows, n_trees)."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1 or len(X) == 1:
+            # One row: plain 1-D gathers, no row broadcasting
+            x_row = X.reshape(-1)
+            node = self.roots
+            for _ in range(self.depth):
+                x = x_row[self.feature[node]]
+                go_left = np.where(np.isnan(x), self.default_left[node], x < self.threshold[node])
+                node = np.where(go_left, self.left[node], self.right[node])
+            return node.reshape(1, -1)
+
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), self.n_trees))
+        for _ in range(self.depth):
+            x = X[rows, self.feature[node]]
+            go_left = np.where(np.isnan(x), self.default_left[node], x < self.threshold[node])
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def predict(self, X):
+        """Predict one row (1-D array) or a small batch (2-D array).
+
+        Returns a float32 array of shape (n_rows,), or (n_rows, n_outputs)
+        for a multi-output ensemble.
+        """
+        values = self.value[self.leaves(X)]
+        if self.n_outputs == 1:
+            # Sequential float32 sum from base_score, tree by tree, like XGBoost
+            # (np.cumsum adds in order, unlike np.sum's pairwise summation)
+            values[:, 0] += self.base_score[0]
+            return np.cumsum(values, axis=1, dtype=np.float32)[:, -1]
+
+        out = np.empty((len(values), self.n_outputs), dtype=np.float32)
+        for k, trees in enumerate(self._trees_of):
+            column = values[:, trees]
+            column[:, 0] += self.base_score[k]
+            out[:, k] = np.cumsum(column, axis=1, dtype=np.float32)[:, -1]
+        return out
+
+    @classmethod
+    def stack(cls, engines):
+        """Merge engines that read the same features into one multi-output engine.
+
+        Output columns follow the engines (and their own outputs) in order, so
+        e.g. a point model and its P10/P90 companion are scored by a single
+        walk over all their trees.
+        """
+        names = engines[0].feature_names
+        if any(engine.feature_names != names for engine in engines):
+            raise ValueError("Only engines with the same feature names can be stacked")
+
+        node_offsets = np.cumsum([0] + [len(engine.value) for engine in engines])[:-1]
+        output_offsets = np.cumsum([0] + [engine.n_outputs for engine in engines])[:-1]
+        stacked = cls.__new__(cls)
+        stacked._set(
+            feature_names=names,
+            n_features=engines[0].n_features,
+            base_score=np.concatenate([engine.base_score for engine in engines]),
+            output=np.concatenate([engine.output + o for engine, o in zip(engines, output_offsets)]),
+            roots=np.concatenate([engine.roots + o for engine, o in zip(engines, node_offsets)]),
+            feature=np.concatenate([engine.feature for engine in engines]),
+            threshold=np.concatenate([engine.threshold for engine in engines]),
+            default_left=np.concatenate([engine.default_left for engine in engines]),
+            left=np.concatenate([engine.left + o for engine, o in zip(engines, node_offsets)]),
+            right=np.concatenate([engine.right + o for engine, o in zip(engines, node_offsets)]),
+            value=np.concatenate([engine.value for engine in engines]),
+            depth=max(engine.depth for engine in engines),
+        )
+        return stacked
+
+
+def _depth(tree):
+    left, right = tree["left_children"], tree["right_children"]
+    depth, level = 0, [0]
+    while True:
+        level = [c for n in level for c in (left[n], right[n]) if c >= 0]
+        if not level:
+            return depth
+        depth += 1
+
+
+def compile_model(model):
+    """Compile a fitted XGBRegressor (or a Booster) into a TreeEngine."""
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    return TreeEngine(booster)
+
+
+def check_parity(model, X, engine=None):
+    """Return the largest |engine - model.predict| over the rows of X."""
+    engine = compile_model(model) if engine is None else engine
+    X = np.asarray(X, dtype=np.float32)
+    expected = np.asarray(model.predict(X)).reshape(len(X), -1)
+    return float(np.max(np.abs(engine.predict(X).reshape(len(X), -1) - expected), initial=0.0))
+
+
+def latency(predict, row, repeats=2000):
+    """Return the (median, p99) latency of predict(row) in milliseconds."""
+    timings = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        predict(row)
+        timings[i] = time.perf_counter() - start
+    return np.median(timings) * 1000, np.percentile(timings, 99) * 1000
+
+
+def main():
+    from contextlib import closing
+
+    from football import db, training_view
+    from football.features import encoder_for, model_columns
+    from football.paths import MODEL_WITH_WEATHER_PATH, MODEL_WITHOUT_WEATHER_PATH
+    from football.resources import load_model
+
+    with closing(db.connect(db.DB_PATH)) as conn:
+        matches = training_view.prepare(training_view.read_training_frame(conn))
+
+    for path in (MODEL_WITH_WEATHER_PATH, MODEL_WITHOUT_WEATHER_PATH):
+        model = load_model(path)
+        engine = compile_model(model)
+        X = encoder_for(model_columns(model)).encode_frame(matches)
+        error = check_parity(model, X, engine)
+        assert error <= 1e-6, f"{path.name}: engine differs from model.predict by {error}"
+
+        row = X[:1]
+        engine_median, engine_p99 = latency(engine.predict, row)
+        model_median, model_p99 = latency(model.predict, row, repeats=300)
+        print(f"✅ {path.name}: {engine}, max |difference| {error:.1e} on {len(X)} training rows")
+        print(f"   one row: engine {engine_median:.3f} ms (p99 {engine_p99:.3f}), "
+              f"model.predict {model_median:.3f} ms (p99 {model_p99:.3f})")
+
+
+if __name__ == "__main__":
+    main()
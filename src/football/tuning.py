@@ -0,0 +1,387 @@
+"""Hyperparameter search for the XGBoost models, with successive halving and a result cache.
+
+The ML notebook used to run RandomizedSearchCV (60 candidates x 3 folds, then
+40 more around the best one) separately for the with-weather and the
+without-weather model, refitting every candidate with all its trees each time
+it was opened. Here:
+
+1. Both models share one process pool. Each worker gets the training
+   matrices once (pool initializer) and fits single-threaded XGBoost models,
+   so the CPU cores are busy with whole fits instead of fighting over threads.
+2. Candidates go through successive halving: every candidate is first
+   cross-validated with a fraction of its trees, only the best 1/eta move on
+   to the next rung with eta times more trees, and only the last rung uses
+   all of them. Every fit also stops early when the error on a held-out
+   EARLY_STOPPING_FRACTION of its training fold has not improved for
+   EARLY_STOPPING_ROUNDS rounds; the validation fold is then scored at that
+   round, so it never picks the number of trees it is scored with.
+3. Every evaluated (params, data version, rung) is appended to an on-disk
+   store (Data/tuning_cache.jsonl). A rerun on the same data reads the scores
+   instead of refitting. After a data change the best candidates of earlier
+   runs are tried first (warm start), so the search starts from good ground.
+
+From the notebook (cwd src/):
+
+    from football import tuning
+    results = tuning.tune({"with_weather": (X_train_weather, y_train_weather),
+                           "without_weather": (X_train_without_weather, y_train_without_weather)},
+                          spaces=tuning.SPACES)
+    best_xgb_weather = tuning.fit_best(results["with_weather"], X_train_weather, y_train_weather)
+
+train_models() runs the notebook's whole search on the training view and
+saves both models (the models stage of pipeline.py).
+
+From the command line (tunes both models on the training view):
+
+    cd src
+    python -m football.tuning --candidates 60
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.stats import loguniform, randint, uniform
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.model_selection import KFold, ParameterSampler, train_test_split
+from xgboost import XGBRegressor
+
+from football import artifacts
+from football.paths import DATA_DIR, MODEL_WITH_WEATHER_PATH, MODEL_WITHOUT_WEATHER_PATH
+from football.training_view import data_version
+
+
+TUNING_CACHE_PATH = DATA_DIR / "tuning_cache.jsonl"
+
+EARLY_STOPPING_ROUNDS = 50
+# Share of every training fold held out to decide when to stop
+EARLY_STOPPING_FRACTION = 0.2
+
+# Search space of the notebook's first (wide) RandomizedSearchCV
+wide_space = {
+    "n_estimators": randint(300, 1200),
+    "learning_rate": loguniform(0.01, 0.2),
+    "max_depth": randint(3, 9),
+    "min_child_weight": randint(1, 11),
+    "subsample": uniform(0.5, 0.5),
+    "colsample_bytree": uniform(0.5, 0.5),
+    "gamma": uniform(0.0, 5.0),
+    "reg_alpha": loguniform(1e-4, 1e0),
+    "reg_lambda": loguniform(1e-2, 1e1),
+}
+
+# Search space of the notebook's without-weather model (deeper trees, learning rate down to 0.001)
+without_weather_space = {
+    **wide_space,
+    "learning_rate": loguniform(1e-3, 2e-1),
+    "max_depth": randint(3, 10),
+}
+
+# The first stage's space of each model (notebook, train_models() and the command line)
+SPACES = {"with_weather": wide_space, "without_weather": without_weather_space}
+
+TuningResult = namedtuple("TuningResult", ["name", "best_params", "best_score", "data_version", "history"])
+
+
+def _clipped_uniform_01(center, halfwidth, lo_floor=0.5):
+    lo = max(lo_floor, center - halfwidth)
+    hi = min(1.0, center + halfwidth)
+    return uniform(loc=lo, scale=max(1e-9, hi - lo))
+
+
+def narrow_space(best):
+    """Search space of the notebook's second stage, around the best params of the first."""
+    return {
+        "n_estimators": randint(int(best["n_estimators"] * 0.6), int(best["n_estimators"] * 1.6)),
+        "learning_rate": loguniform(max(best["learning_rate"] / 2, 1e-4), min(best["learning_rate"] * 2, 3e-1)),
+        "max_depth": randint(max(3, best["max_depth"] - 2), min(10, best["max_depth"] + 3)),
+        "min_child_weight": randint(max(1, best["min_child_weight"] - 3), best["min_child_weight"] + 4),
+        "subsample": _clipped_uniform_01(best["subsample"], 0.2),
+        "colsample_bytree": _clipped_uniform_01(best["colsample_bytree"], 0.2),
+        "gamma": uniform(max(0.0, best.get("gamma", 0.0) - 1.0), 2.0),
+        "reg_alpha": loguniform(max(1e-6, best.get("reg_alpha", 1e-3) / 10), max(1e-2, best.get("reg_alpha", 1e-3) * 10)),
+        "reg_lambda": loguniform(max(1e-4, best.get("reg_lambda", 1.0) / 10), max(1e2, best.get("reg_lambda", 1.0) * 10)),
+    }
+
+
+def _plain(params):
+    """Params as plain Python numbers (JSON-able, stable cache keys)."""
+    return {
+        key: int(value) if isinstance(value, (int, np.integer)) else float(value)
+        for key, value in sorted(params.items())
+    }
+
+
+def sample_candidates(space, n_candidates, seed=42):
+    return [_plain(params) for params in ParameterSampler(space, n_candidates, random_state=seed)]
+
+
+class TrialStore:
+    """Cross-validation scores per (params, data version, rung), persisted as JSON lines.
+
+    Lines are only appended, so an interrupted search loses at most the trial
+    that was being written.
+    """
+
+    def __init__(self, path=TUNING_CACHE_PATH):
+        self.path = path
+        self.trials = {}
+        if path is not None and os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # half-written last line of an interrupted run
+                    self.trials[record["key"]] = record
+
+    def __len__(self):
+        return len(self.trials)
+
+    @staticmethod
+    def key(params, version, rounds, folds, seed):
+        text = json.dumps([params, version, rounds, folds, seed, EARLY_STOPPING_ROUNDS, EARLY_STOPPING_FRACTION],
+                          sort_keys=True)
+        return hashlib.sha256(text.encode()).hexdigest()[:20]
+
+    def get(self, key):
+        return self.trials.get(key)
+
+    def add(self, record):
+        self.trials[record["key"]] = record
+        if self.path is not None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(record) + "\n")
+
+    def best_params(self, name, n, exclude_version=None):
+        """Best full-rung params found for a model on other data versions (for warm starts)."""
+        finals = [
+            record for record in self.trials.values()
+            if record["name"] == name and record["final"] and record["data_version"] != exclude_version
+        ]
+        finals.sort(key=lambda record: record["mse"])
+        seen, best = set(), []
+        for record in finals:
+            text = json.dumps(record["params"], sort_keys=True)
+            if text not in seen:
+                seen.add(text)
+                best.append(record["params"])
+            if len(best) == n:
+                break
+        return best
+
+
+############################## WORKERS ##############################
+
+_datasets = {}
+
+
+def _init_worker(datasets):
+    _datasets.update(datasets)
+
+
+def _cross_validate(name, params, rounds, folds, seed):
+    """Mean validation MSE of one candidate with at most `rounds` trees (runs in a worker).
+
+    Early stopping watches a split of each training fold; the validation fold
+    is only predicted, at the best iteration.
+    """
+    X, y = _datasets[name]
+    errors, trees = [], []
+    for train, valid in KFold(folds).split(X):
+        fit, stop = train_test_split(train, test_size=EARLY_STOPPING_FRACTION, random_state=seed)
+        model = XGBRegressor(
+            objective="reg:squarederror", tree_method="hist", random_state=seed, n_jobs=1,
+            early_stopping_rounds=EARLY_STOPPING_ROUNDS, eval_metric="rmse",
+            **{**params, "n_estimators": rounds},
+        )
+        model.fit(X[fit], y[fit], eval_set=[(X[stop], y[stop])], verbose=False)
+        errors.append(mean_squared_error(y[valid], model.predict(X[valid])))
+        trees.append(model.best_iteration + 1)
+    return float(np.mean(errors)), int(round(np.mean(trees)))
+
+
+############################## SEARCH ##############################
+
+def _as_arrays(X, y):
+    columns = list(X.columns) if hasattr(X, "columns") else [str(i) for i in range(np.shape(X)[1])]
+    X = np.ascontiguousarray(np.asarray(X, dtype=np.float32))
+    y = np.asarray(y, dtype=np.float64)
+    return X, y, columns
+
+
+def _rung_rounds(params, rung, n_rungs, eta):
+    return max(EARLY_STOPPING_ROUNDS, math.ceil(params["n_estimators"] / eta ** (n_rungs - 1 - rung)))
+
+
+def tune(datasets, spaces=None, n_candidates=60, eta=3, folds=3, seed=42, workers=None,
+         store=None, warm_start=5, verbose=True):
+    """Search the best XGBoost params for several training sets at once.
+
+    `datasets` maps a model name to its (X_train, y_train). `spaces` maps the
+    same names to a search space (default: wide_space for every model).
+    Returns {name: TuningResult}; best_params["n_estimators"] is the number of
+    trees early stopping settled on in the last rung.
+    """
+    store = TrialStore() if store is None else store
+    spaces = spaces or {}
+    arrays, versions, candidates = {}, {}, {}
+    for name, (X, y) in datasets.items():
+        X, y, columns = _as_arrays(X, y)
+        arrays[name] = (X, y)
+        versions[name] = data_version(X, y, columns)
+        sampled = sample_candidates(spaces.get(name, wide_space), n_candidates, seed)
+        previous = store.best_params(name, warm_start, exclude_version=versions[name]) if warm_start else []
+        # Earlier winners first; the random sample fills the rest
+        unique = {json.dumps(p, sort_keys=True): p for p in previous + sampled}
+        candidates[name] = list(unique.values())[:max(n_candidates, len(previous))]
+
+    n_rungs = max(1, math.floor(math.log(n_candidates, eta)) + 1) if n_candidates > 1 else 1
+    history = {name: [] for name in datasets}
+    start = time.perf_counter()
+    fits = hits = 0
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(arrays,)) as pool:
+        for rung in range(n_rungs):
+            final = rung == n_rungs - 1
+            pending = []
+            for name, rung_candidates in candidates.items():
+                for params in rung_candidates:
+                    rounds = _rung_rounds(params, rung, n_rungs, eta)
+                    key = TrialStore.key(params, versions[name], rounds, folds, seed)
+                    record = store.get(key)
+                    if record is not None:
+                        hits += 1
+                        history[name].append({**record, "rung": rung, "cached": True})
+                    else:
+                        future = pool.submit(_cross_validate, name, params, rounds, folds, seed)
+                        pending.append((future, name, params, rounds, key))
+
+            for future, name, params, rounds, key in pending:
+                mse, trees = future.result()
+                fits += folds
+                record = {"key": key, "name": name, "data_version": versions[name], "params": params,
+                          "rounds": rounds, "trees": trees, "mse": mse, "final": final}
+                store.add(record)
+                history[name].append({**record, "rung": rung, "cached": False})
+
+            for name in candidates:
+                scored = [r for r in history[name] if r["rung"] == rung]
+                scored.sort(key=lambda r: r["mse"])
+                keep = max(1, len(scored) // eta) if not final else len(scored)
+                candidates[name] = [r["params"] for r in scored[:keep]]
+                if verbose:
+                    print(f"{name}: rung {rung + 1}/{n_rungs}, {len(scored)} candidates, "
+                          f"best RMSE {math.sqrt(scored[0]['mse']):.4f}")
+
+    if verbose:
+        print(f"✅ {fits} fits, {hits} cached trials, {time.perf_counter() - start:.1f} s")
+
+    results = {}
+    for name in datasets:
+        table = pd.DataFrame(history[name])
+        last = table[table["rung"] == table["rung"].max()].sort_values("mse").iloc[0]
+        best = {**last["params"], "n_estimators": int(last["trees"])}
+        results[name] = TuningResult(name, best, float(last["mse"]), versions[name], table)
+    return results
+
+
+def fit_best(result, X, y, seed=42):
+    """Fit the final model of a TuningResult on the whole training set."""
+    model = XGBRegressor(objective="reg:squarederror", tree_method="hist", random_state=seed, **result.best_params)
+    return model.fit(X, y)
+
+
+def train_models(view, n_candidates=60, workers=None, paths=None, verbose=True):
+    """Tune, fit and save both models the way the ML notebook does; return their manifests.
+
+    Same 75/25 split, two-stage search for the with-weather model (a narrower
+    space around the stage-1 best, kept only if it is better) and the same
+    artifact manifests (data version of the training part, test RMSE and R²).
+    The best params are recorded in the manifests too (see
+    backtest.model_params). `paths` maps the model names to their files
+    (default: the Models/ files the app loads).
+    """
+    from football import training_view
+
+    paths = paths or {"with_weather": MODEL_WITH_WEATHER_PATH, "without_weather": MODEL_WITHOUT_WEATHER_PATH}
+    X_without, columns_without = training_view.without_weather(view)
+    frames = {
+        "with_weather": pd.DataFrame(np.asarray(view.X, dtype=np.float32), columns=view.columns),
+        "without_weather": pd.DataFrame(np.asarray(X_without, dtype=np.float32), columns=columns_without),
+    }
+    y = pd.Series(np.asarray(view.y, dtype=np.float64))
+    train, test = train_test_split(np.arange(len(y)), test_size=0.25, random_state=42)
+
+    datasets = {name: (frame.iloc[train], y.iloc[train]) for name, frame in frames.items()}
+    stage1 = tune(datasets, spaces=SPACES, n_candidates=n_candidates, seed=42, workers=workers, verbose=verbose)
+    stage2 = tune({"with_weather": datasets["with_weather"]},
+                  spaces={"with_weather": narrow_space(stage1["with_weather"].best_params)},
+                  n_candidates=max(1, n_candidates * 2 // 3), seed=43, workers=workers, verbose=verbose)
+    best = {
+        "with_weather": min(stage1["with_weather"], stage2["with_weather"], key=lambda result: result.best_score),
+        "without_weather": stage1["without_weather"],
+    }
+
+    manifests = {}
+    for name, frame in frames.items():
+        X_train, y_train = datasets[name]
+        model = fit_best(best[name], X_train, y_train)
+        predicted = model.predict(frame.iloc[test])
+        manifests[name] = artifacts.save_artifact(
+            model, paths[name], name=name,
+            data_version=data_version(X_train.to_numpy(np.float32), y_train.to_numpy(float), list(X_train.columns)),
+            metrics={
+                "rmse": np.sqrt(mean_squared_error(y.iloc[test], predicted)),
+                "r2": r2_score(y.iloc[test], predicted),
+            },
+            train_rows=len(X_train),
+            params=best[name].best_params,
+        )
+        if verbose:
+            print(f"✅ {paths[name].name}: test RMSE {manifests[name]['metrics']['rmse']:.4f}, "
+                  f"R² {manifests[name]['metrics']['r2']:.3f}")
+    return manifests
+
+
+def main(argv=None):
+    from football import diagnostics, training_view
+
+    parser = argparse.ArgumentParser(description="Tune the with- and without-weather XGBoost models.")
+    parser.add_argument("--candidates", type=int, default=60, help="random candidates per model (default: 60)")
+    parser.add_argument("--eta", type=int, default=3, help="halving rate: 1/eta of the candidates survive a rung")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--no-cache", action="store_true", help="do not read or write Data/tuning_cache.jsonl")
+    args = parser.parse_args(argv)
+
+    view = training_view.refresh()
+    X_without, columns_without = training_view.without_weather(view)
+    X = np.asarray(view.X)
+    y = np.asarray(view.y)
+
+    # Multicollinearity of both feature tables, before any training (see diagnostics.py)
+    for name, X_check, columns in [("with_weather", X, view.columns), ("without_weather", X_without, columns_without)]:
+        print(f"VIF check ({name}):")
+        diagnostics.check(pd.DataFrame(X_check, columns=columns))
+
+    # Same 75/25 split as the notebook; only the training part is tuned on
+    train, _ = train_test_split(np.arange(len(y)), test_size=0.25, random_state=42)
+    results = tune(
+        {"with_weather": (X[train], y[train]), "without_weather": (X_without[train], y[train])},
+        spaces=SPACES, n_candidates=args.candidates, eta=args.eta, workers=args.workers,
+        store=TrialStore(None) if args.no_cache else None,
+    )
+    for name, result in results.items():
+        print(f"{name}: RMSE {math.sqrt(result.best_score):.4f}  {result.best_params}")
+
+
+if __name__ == "__main__":
+    main()
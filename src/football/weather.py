@@ -0,0 +1,167 @@
+"""Weather forecast for a match, cached per stadium and date.
+
+The app asks open-meteo for the forecast at the home team's stadium. The answer
+is the full hourly series for the match date. It is kept for `ttl` seconds, so
+moving the match time, changing a ranking or any other rerun is served from
+memory. The cache key is the coordinates plus the date (not the team), so
+Club Brugge and Cercle Brugge, which share the Jan Breydel stadium, share one
+entry.
+
+Every request has a hard timeout. When several sessions ask for the same
+stadium and date at the same time, only one of them calls the API and the
+others wait for its result. Failed requests are remembered for a short time
+as well, so an API outage does not block every rerun until the timeout.
+
+Set FOOTBALL_WEATHER_URL to point the app at another server, e.g. the local
+stub in football.weather_stub:
+
+    FOOTBALL_WEATHER_URL=http://127.0.0.1:8765/v1/forecast streamlit run App/app_football.py
+"""
+
+import os
+import threading
+import time
+from collections import Counter, namedtuple
+
+import requests
+
+
+FORECAST_URL = os.environ.get("FOOTBALL_WEATHER_URL", "https://api.open-meteo.com/v1/forecast")
+
+# Hourly series for one stadium and date (index = hour of the day)
+HourlyForecast = namedtuple("HourlyForecast", ["temperature", "weathercode"])
+
+_Entry = namedtuple("_Entry", ["expires", "forecast"])
+
+
+def weather_condition_for_code(code):
+    """Map an open-meteo weather code to the conditions the models know."""
+    if code in [0]:
+        return "Clear or mostly clear"
+    elif code in [1, 2, 3]:
+        return "Partly cloudy"
+    elif code in [61, 63, 65, 80, 81, 82]:
+        return "Rainy"
+    elif code in [51, 53, 55]:
+        return "Drizzle"
+    elif code in [71, 73, 75, 85, 86, 77]:
+        return "Snowy"
+    else:
+        return "Unknown"
+
+
+class ForecastCache:
+    """Hourly forecasts keyed by (latitude, longitude, date), with TTL eviction.
+
+    ttl: seconds a successful forecast is reused.
+    error_ttl: seconds a failed request is remembered before trying again.
+    timeout: (connect, read) timeout of one API call, in seconds.
+    """
+
+    def __init__(self, base_url=None, ttl=30 * 60, error_ttl=60, timeout=(2, 4), session=None):
+        self.base_url = base_url or FORECAST_URL
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.timeout = timeout
+        self.session = session or requests.Session()
+
+        self._entries = {}
+        # One lock per key while some thread is asking for it; _key_users counts
+        # those threads, and the lock goes away with the last one
+        self._key_locks = {}
+        self._key_users = Counter()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _key(self, latitude, longitude, match_date):
+        # Rounded so that two teams at the same stadium always share an entry
+        return round(float(latitude), 4), round(float(longitude), 4), str(match_date)
+
+    def _fresh(self, key, now):
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires > now:
+            return entry
+        return None
+
+    def _evict_expired(self, now):
+        for key in [k for k, entry in self._entries.items() if entry.expires <= now]:
+            del self._entries[key]
+
+    def fetch(self, latitude, longitude, match_date):
+        """Call the API once and return the HourlyForecast (raises on failure)."""
+        params = {
+            "latitude": latitude,
+            "longitude": longitude,
+            "start_date": str(match_date),
+            "end_date": str(match_date),
+            "hourly": "temperature_2m,weathercode",
+            "timezone": "auto",
+        }
+        response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        hourly = response.json()["hourly"]
+        return HourlyForecast(list(hourly["temperature_2m"]), list(hourly["weathercode"]))
+
+    def hourly(self, latitude, longitude, match_date):
+        """Return the HourlyForecast for a stadium and date, or None if unavailable."""
+        key = self._key(latitude, longitude, match_date)
+        entry = self._fresh(key, time.monotonic())
+        if entry is not None:
+            return entry.forecast
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+            self._key_users[key] += 1
+
+        try:
+            # One API call per key: whoever gets the lock first fetches, the others reuse it
+            with key_lock:
+                now = time.monotonic()
+                entry = self._fresh(key, now)
+                if entry is not None:
+                    return entry.forecast
+
+                try:
+                    forecast = self.fetch(latitude, longitude, match_date)
+                    expires = time.monotonic() + self.ttl
+                except (requests.RequestException, KeyError, TypeError, ValueError):
+                    forecast = None
+                    expires = time.monotonic() + self.error_ttl
+
+                with self._lock:
+                    self._evict_expired(now)
+                    self._entries[key] = _Entry(expires, forecast)
+                return forecast
+        finally:
+            with self._lock:
+                self._key_users[key] -= 1
+                if not self._key_users[key]:
+                    del self._key_users[key]
+                    del self._key_locks[key]
+
+    def at(self, latitude, longitude, match_date, match_hour):
+        """Return (temperature, weather condition) at the match hour, or (None, None)."""
+        forecast = self.hourly(latitude, longitude, match_date)
+        try:
+            temperature = forecast.temperature[match_hour]
+            code = forecast.weathercode[match_hour]
+        except (AttributeError, IndexError, TypeError):
+            return None, None
+        if temperature is None or code is None:
+            return None, None
+        return temperature, weather_condition_for_code(code)
+
+
+# One cache per process, shared by every Streamlit session
+forecast_cache = ForecastCache()
+
+
+def get_weather_data(latitude, longitude, match_date, match_hour):
+    """Return (temperature, weather condition) at the match, or (None, None)."""
+    return forecast_cache.at(latitude, longitude, match_date, match_hour)
@@ -0,0 +1,321 @@
+"""Historical weather for every match in RawDataB.csv, fetched in bulk.
+
+The scraping notebook used to call the open-meteo archive once per match (about
+4,000 calls, split by hand into 200-row cells) and slept for a blocking 60
+seconds after every HTTP 429. This module needs a few dozen calls instead:
+
+1. Matches are grouped by home stadium and season. One archive call returns
+   the hourly series from the first to the last home game of that season.
+2. Those calls run concurrently (asyncio, a few at a time), paced by a token
+   bucket. A 429 pauses the bucket for every request, not just one thread.
+3. Every day received is appended to an on-disk cache
+   (Data/weather_cache/archive_hourly.jsonl). An interrupted run resumes where
+   it stopped, and a re-run only asks for the days that are still missing.
+
+Usage (from the src/ folder):
+
+    python -m football.weather_backfill ../Data/RawDataB.csv -o ../Data/RawDataB_weather.csv
+
+The output is the input CSV plus the Weather and Temperature (°C) columns,
+with the same values and "None" placeholders as the notebook produced.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+from collections import namedtuple
+from datetime import date, datetime
+
+import numpy as np
+import requests
+
+from football import registry
+from football.paths import DATA_DIR
+
+
+ARCHIVE_URL = os.environ.get("FOOTBALL_ARCHIVE_URL", "https://archive-api.open-meteo.com/v1/archive")
+CACHE_PATH = DATA_DIR / "weather_cache" / "archive_hourly.jsonl"
+
+# One archive call: a stadium and an inclusive date range
+ArchiveRequest = namedtuple("ArchiveRequest", ["latitude", "longitude", "start_date", "end_date"])
+
+
+def archive_weather_description(weather_code):
+    """Translate an archive weather code to the text stored in RawDataB_weather.csv."""
+    weather_description = "Unknown"
+    if weather_code is not None:
+        if weather_code in [0, 1]:
+            weather_description = "Clear or mostly clear"
+        elif weather_code in [2, 3]:
+            weather_description = "Partly cloudy"
+        elif weather_code in [45, 48]:
+            weather_description = "Foggy"
+        elif weather_code in [51, 53, 55, 56, 57]:
+            weather_description = "Drizzle"
+        elif weather_code in [61, 63, 65, 66, 67]:
+            weather_description = "Rainy"
+        elif weather_code in [71, 73, 75, 77]:
+            weather_description = "Snowy"
+        elif weather_code in [80, 81, 82]:
+            weather_description = "Showers"
+        elif weather_code in [95, 96, 99]:
+            weather_description = "Thunderstorm"
+    return weather_description
+
+
+def parse_match_datetime(match_date, match_time):
+    """Parse the Transfermarkt "Sat 27/07/19" + "8:30 PM" pair, or return None."""
+    try:
+        return datetime.strptime(f"{match_date} {match_time}", "%a %d/%m/%y %I:%M %p")
+    except (TypeError, ValueError):
+        return None
+
+
+def season_of(day):
+    """Season a date belongs to (2019 for July 2019 - June 2020)."""
+    return day.year if day.month >= 7 else day.year - 1
+
+
+class TokenBucket:
+    """Allow `rate` requests per second on average, with bursts of `capacity`.
+
+    pause() empties the bucket for a while (e.g. after an HTTP 429), so every
+    waiting request backs off together instead of hammering the API again.
+    """
+
+    def __init__(self, rate=5.0, capacity=5):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class DayCache:
+    """Hourly archive series per (latitude, longitude, day), persisted as JSON lines.
+
+    Each line holds the days of one archive answer. Lines are only appended,
+    so a crash can at worst lose the answer that was being written.
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.days = {}
+        if path is not None and os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # half-written last line of an interrupted run
+                    self._store(record)
+
+    def __len__(self):
+        return len(self.days)
+
+    @staticmethod
+    def _key(latitude, longitude, day):
+        return round(float(latitude), 4), round(float(longitude), 4), str(day)
+
+    def _store(self, record):
+        for day, (temperatures, codes) in record["days"].items():
+            self.days[self._key(record["latitude"], record["longitude"], day)] = (temperatures, codes)
+
+    def get(self, latitude, longitude, day):
+        """Return (temperatures, weather codes) for one day, or None if not fetched yet."""
+        return self.days.get(self._key(latitude, longitude, day))
+
+    def add(self, latitude, longitude, hourly):
+        """Split an archive "hourly" block into days, keep them and append them to disk.
+
+        Days without any value (not yet in the archive) are not kept, so a later
+        run asks for them again.
+        """
+        days = {}
+        for stamp, temperature, code in zip(hourly["time"], hourly["temperature_2m"], hourly["weathercode"]):
+            temperatures, codes = days.setdefault(stamp[:10], ([], []))
+            temperatures.append(temperature)
+            codes.append(code)
+        days = {day: series for day, series in days.items() if any(v is not None for v in series[0])}
+        if not days:
+            return 0
+
+        record = {"latitude": latitude, "longitude": longitude, "days": days}
+        self._store(record)
+        if self.path is not None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(record) + "\n")
+        return len(days)
+
+
+def stadium_location(home_team):
+    """(latitude, longitude) of a league club's stadium, or None."""
+    clubs = registry.seed()
+    team_id = clubs.id_of(home_team)
+    if np.isnan(clubs.latitude[team_id]):
+        return None
+    return float(clubs.latitude[team_id]), float(clubs.longitude[team_id])
+
+
+def plan_requests(matches, cache, today=None):
+    """Group the matches still missing from the cache into archive calls.
+
+    `matches` is an iterable of (home team, match datetime). There is at most
+    one call per home stadium and season, covering only the missing days.
+    Teams without coordinates and future matches are skipped.
+    """
+    today = today or date.today()
+    missing = {}
+    for home_team, match_datetime in matches:
+        coordinates = stadium_location(home_team)
+        if coordinates is None or match_datetime is None or match_datetime.date() > today:
+            continue
+        day = match_datetime.date()
+        if cache.get(*coordinates, day) is not None:
+            continue
+        key = (*coordinates, season_of(day))
+        missing.setdefault(key, set()).add(day)
+
+    return [
+        ArchiveRequest(latitude, longitude, min(days).isoformat(), max(days).isoformat())
+        for (latitude, longitude, _), days in sorted(missing.items())
+    ]
+
+
+async def _fetch(session, bucket, semaphore, request, cache, url, timeout, max_attempts):
+    params = {
+        "latitude": request.latitude,
+        "longitude": request.longitude,
+        "start_date": request.start_date,
+        "end_date": request.end_date,
+        "hourly": "temperature_2m,weathercode",
+        "timezone": "Europe/Brussels",
+    }
+    async with semaphore:
+        for attempt in range(max_attempts):
+            await bucket.acquire()
+            try:
+                response = await asyncio.to_thread(session.get, url, params=params, timeout=timeout)
+            except requests.RequestException as e:
+                print(f"Request failed for {request} ({e}), retrying...")
+                await asyncio.sleep(min(60, 2 ** attempt))
+                continue
+
+            if response.status_code == 200:
+                return cache.add(request.latitude, request.longitude, response.json()["hourly"])
+            elif response.status_code == 429:
+                retry_after = response.headers.get("Retry-After")
+                delay = float(retry_after) if retry_after and retry_after.isdigit() else min(60, 2 ** (attempt + 1))
+                print(f"API request limit exceeded. Pausing all requests for {delay:.0f} seconds...")
+                bucket.pause(delay)
+            else:
+                print(f"API request failed with status code {response.status_code} for {request}")
+                return 0
+    print(f"Giving up on {request} after {max_attempts} attempts")
+    return 0
+
+
+async def fetch_all(archive_requests, cache, url=None, rate=5.0, concurrency=4, timeout=(5, 60), max_attempts=6):
+    """Run the archive calls concurrently; return the number of days added to the cache."""
+    bucket = TokenBucket(rate=rate, capacity=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    with requests.Session() as session:
+        added = await asyncio.gather(*[
+            _fetch(session, bucket, semaphore, request, cache, url or ARCHIVE_URL, timeout, max_attempts)
+            for request in archive_requests
+        ])
+    return sum(added)
+
+
+def weather_at(cache, home_team, match_datetime):
+    """Return (weather, temperature) for one match from the cache, "None" when unknown."""
+    coordinates = stadium_location(home_team)
+    if coordinates is None or match_datetime is None:
+        return "None", "None"
+    series = cache.get(*coordinates, match_datetime.date())
+    if series is None:
+        return "None", "None"
+
+    temperatures, codes = series
+    hour = match_datetime.hour
+    if len(temperatures) <= hour or len(codes) <= hour:
+        return "None", "None"
+    return archive_weather_description(codes[hour]), temperatures[hour]
+
+
+def backfill_rows(rows, cache=None, **fetch_options):
+    """Add "Weather" and "Temperature (°C)" to every row (dicts from csv.DictReader)."""
+    cache = cache if cache is not None else DayCache()
+    now = datetime.now()
+    match_datetimes = [
+        parse_match_datetime(row.get("Date"), row.get("Time")) if row.get("Home Team") else None
+        for row in rows
+    ]
+    # Future matches have no archive weather yet
+    match_datetimes = [None if dt is not None and dt > now else dt for dt in match_datetimes]
+
+    archive_requests = plan_requests(
+        [(row.get("Home Team"), dt) for row, dt in zip(rows, match_datetimes)], cache, today=now.date()
+    )
+    if archive_requests:
+        asyncio.run(fetch_all(archive_requests, cache, **fetch_options))
+
+    for row, match_datetime in zip(rows, match_datetimes):
+        row["Weather"], row["Temperature (°C)"] = weather_at(cache, row.get("Home Team"), match_datetime)
+    return rows, archive_requests
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Add historical weather to the scraped match list.")
+    parser.add_argument("input_csv", help="e.g. ../Data/RawDataB.csv")
+    parser.add_argument("-o", "--output", required=True, help="e.g. ../Data/RawDataB_weather.csv")
+    parser.add_argument("--cache", default=str(CACHE_PATH), help="on-disk cache of fetched days")
+    parser.add_argument("--rate", type=float, default=5.0, help="archive calls per second")
+    parser.add_argument("--concurrency", type=int, default=4, help="archive calls in flight at once")
+    args = parser.parse_args(argv)
+
+    with open(args.input_csv, mode="r", encoding="utf-8-sig") as infile:
+        reader = csv.DictReader(infile)
+        fieldnames = reader.fieldnames + ["Weather", "Temperature (°C)"]
+        rows = list(reader)
+
+    start = time.perf_counter()
+    rows, archive_requests = backfill_rows(
+        rows, DayCache(args.cache), rate=args.rate, concurrency=args.concurrency
+    )
+
+    with open(args.output, mode="w", newline="", encoding="utf-8-sig") as outfile:
+        writer = csv.DictWriter(outfile, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    found = sum(row["Weather"] != "None" for row in rows)
+    print(f"✅ {found}/{len(rows)} matches with weather, {len(archive_requests)} archive calls "
+          f"in {time.perf_counter() - start:.1f} s → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Local stand-in for the open-meteo forecast and archive APIs.
+
+Answers /v1/forecast and /v1/archive with a deterministic hourly series (same
+coordinates and date, same numbers) and counts the requests it received, so
+the weather cache and the historical backfill can be checked without network
+access:
+
+    python -m football.weather_stub --port 8765
+    FOOTBALL_WEATHER_URL=http://127.0.0.1:8765/v1/forecast streamlit run App/app_football.py
+    FOOTBALL_ARCHIVE_URL=http://127.0.0.1:8765/v1/archive python -m football.weather_backfill ...
+
+From Python, start_stub_server() runs it in a background thread:
+
+    server = start_stub_server()
+    cache = ForecastCache(base_url=server.url)
+    ...
+    server.shutdown()
+"""
+
+import argparse
+import json
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+# A few codes of every condition the app knows, plus one it does not
+_WEATHER_CODES = [0, 1, 2, 3, 51, 61, 63, 71, 80, 45]
+
+
+def hourly_series(latitude, longitude, date):
+    """Return the fake 24-hour series for one place and date."""
+    seed = zlib.crc32(f"{latitude}|{longitude}|{date}".encode())
+    temperatures = [round(4 + (seed % 12) + 6 * (hour / 23), 1) for hour in range(24)]
+    codes = [_WEATHER_CODES[(seed + hour // 6) % len(_WEATHER_CODES)] for hour in range(24)]
+    return {"temperature_2m": temperatures, "weathercode": codes}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+
+        if url.path not in ("/v1/forecast", "/v1/archive") or "latitude" not in query or "start_date" not in query:
+            self.send_error(404)
+            return
+        if server.throttle_every and server.request_count % server.throttle_every == 0:
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if server.delay:
+            time.sleep(server.delay)
+
+        first = date.fromisoformat(query["start_date"])
+        last = date.fromisoformat(query.get("end_date", query["start_date"]))
+        hourly = {"time": [], "temperature_2m": [], "weathercode": []}
+        for offset in range((last - first).days + 1):
+            day = (first + timedelta(days=offset)).isoformat()
+            series = hourly_series(query["latitude"], query.get("longitude"), day)
+            hourly["time"] += [f"{day}T{hour:02d}:00" for hour in range(24)]
+            hourly["temperature_2m"] += series["temperature_2m"]
+            hourly["weathercode"] += series["weathercode"]
+        body = json.dumps({"latitude": float(query["latitude"]), "hourly": hourly}).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, delay=0.0, throttle_every=0):
+        super().__init__(address, _Handler)
+        self.delay = delay
+        self.throttle_every = throttle_every
+        self.request_count = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1/forecast"
+
+    @property
+    def archive_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1/archive"
+
+
+def start_stub_server(host="127.0.0.1", port=0, delay=0.0, throttle_every=0):
+    """Start the stub in a daemon thread and return the server (port 0 = any free port)."""
+    server = StubServer((host, port), delay=delay, throttle_every=throttle_every)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve fake open-meteo forecasts and archives locally.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds to wait before every answer")
+    parser.add_argument("--throttle-every", type=int, default=0, help="answer every Nth request with HTTP 429")
+    args = parser.parse_args(argv)
+
+    server = StubServer((args.host, args.port), delay=args.delay, throttle_every=args.throttle_every)
+    print(f"Serving fake forecasts on {server.url} and archives on {server.archive_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
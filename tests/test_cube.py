@@ -0,0 +1,92 @@
+"""The prediction cube against the app's own path: parse_match, match_features, the live model."""
+
+import datetime
+import sqlite3
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+import pytest
+from xgboost import XGBRegressor
+
+from football import cube, registry, training_view
+from football.artifacts import save_artifact
+from football.core import AttendancePredictor
+from football.features import FeatureEncoder
+from football.paths import DB_PATH
+from football.quantiles import fit_companion
+from football.resources import load_interval_predictor
+
+DATE_DUMMIES = ("Weekday_", "Game day_", "Time slot_", "Matchday_")
+
+
+@pytest.fixture(scope="module")
+def dated_model(tmp_path_factory):
+    """A small without-weather model trained on football.db with the notebook's columns (date dummies included)."""
+    with closing(sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)) as conn:
+        matches = training_view.prepare(training_view.read_training_frame(conn))
+    rows, _ = training_view.training_rows(matches)
+    columns = training_view.design_columns(rows)
+    columns = [c for c in columns if c not in training_view.weather_columns(columns)]
+    X = pd.DataFrame(FeatureEncoder(columns).encode_frame(rows), columns=columns)
+    y = rows[training_view.TARGET].to_numpy(dtype=float)
+
+    folder = tmp_path_factory.mktemp("models")
+    model_path, interval_path = folder / "model.ubj", folder / "model_interval.ubj"
+    model = XGBRegressor(n_estimators=40, max_depth=6, tree_method="hist", random_state=0).fit(X, y)
+    save_artifact(model, model_path, "without_weather")
+    companion = fit_companion(X, y, params={"n_estimators": 20, "max_depth": 3})
+    save_artifact(companion, interval_path, "without_weather_interval", offsets=[-0.02, 0.02])
+    return model_path, interval_path
+
+
+@pytest.fixture(scope="module")
+def cube_and_predictors(dated_model, tmp_path_factory):
+    model_path, interval_path = dated_model
+    teams = registry.current().league_teams[:4]
+    cube_dir = tmp_path_factory.mktemp("cube")
+    cube.build(cube_dir, model_path, interval_path, teams=teams, verbose=False)
+    prediction_cube = cube.load(cube_dir / "meta.json")
+    predictor = load_interval_predictor(model_path, interval_path)
+    return (
+        prediction_cube,
+        AttendancePredictor(predictor, predictor, prediction_cube),
+        AttendancePredictor(predictor, predictor),
+    )
+
+
+def test_model_reads_date_dummies(dated_model):
+    model_path, interval_path = dated_model
+    engine = load_interval_predictor(model_path, interval_path).engine
+    read = {engine.feature_names[i] for i in engine.feature[engine.left != np.arange(len(engine.left))]}
+    assert any(name.startswith(DATE_DUMMIES) for name in read)
+
+
+def test_cube_answers_like_the_live_model(cube_and_predictors):
+    prediction_cube, with_cube, live = cube_and_predictors
+    teams = prediction_cube.meta["teams"]
+    start = datetime.date.fromisoformat(prediction_cube.meta["horizon"][0])
+    rng = np.random.default_rng(0)
+    for _ in range(60):
+        home_team, away_team = rng.choice(teams, size=2, replace=False)
+        match = {
+            "home_team": str(home_team),
+            "away_team": str(away_team),
+            "match_date": (start + datetime.timedelta(days=int(rng.integers(cube.HORIZON_DAYS)))).isoformat(),
+            "match_time": f"{int(rng.integers(0, 24)):02d}:{int(rng.choice([0, 15, 30])):02d}",
+            "matchday": int(rng.integers(1, 39)),
+        }
+        cached, expected = with_cube.predict(match), live.predict(match)
+        assert cached.source == "cube", match
+        assert expected.source == "live"
+        assert cached._replace(source="live") == expected
+
+
+def test_other_inputs_are_scored_live(cube_and_predictors):
+    prediction_cube, with_cube, live = cube_and_predictors
+    home_team, away_team = prediction_cube.meta["teams"][:2]
+    # An overridden ranking is not the anchor
+    match = {"home_team": home_team, "away_team": away_team, "match_date": prediction_cube.meta["horizon"][0],
+             "match_time": "18:30", "matchday": 12, "ranking_home_team": 99}
+    assert with_cube.predict(match) == live.predict(match)
+    assert with_cube.predict(match).source == "live"
@@ -0,0 +1,170 @@
+"""Fixture-page parsing, the page cache and resumed scrape() runs, all offline (tests/data/fixture_page.html)."""
+
+import csv
+import json
+from pathlib import Path
+
+import pytest
+from bs4 import BeautifulSoup
+
+from football import scraper
+from football.scraper import COLUMNS, PageCache, parse_fixture_page, scrape
+
+FIXTURE_PAGE = (Path(__file__).parent / "data" / "fixture_page.html").read_bytes()
+
+
+def notebook_rows(content):
+    """The scraping notebook's parser: the whole page through html.parser."""
+    soup = BeautifulSoup(content, "html.parser")
+    table = soup.find("div", class_="responsive-table").find("table")
+    current_competition = ""
+    data = []
+    for row in table.find("tbody").find_all("tr"):
+        competition_cell = row.find("td", class_="extrarow bg_blau_20 hauptlink")
+        if competition_cell:
+            current_competition = competition_cell.get_text(strip=True)
+            continue
+        cells = row.find_all("td")
+        if len(cells) >= 11:
+            home_ranking = cells[4].find("span", class_="tabellenplatz")
+            away_ranking = cells[6].find("span", class_="tabellenplatz")
+            data.append([
+                current_competition,
+                cells[0].get_text(strip=True),
+                cells[1].get_text(strip=True),
+                cells[2].get_text(strip=True),
+                cells[4].find("a").get_text(strip=True),
+                home_ranking.get_text(strip=True) if home_ranking else "",
+                cells[6].find("a").get_text(strip=True),
+                away_ranking.get_text(strip=True) if away_ranking else "",
+                cells[9].get_text(strip=True),
+                cells[10].get_text(strip=True),
+            ])
+    return data
+
+
+def pages(n):
+    """n distinct fixture pages (one per season), {url: content}."""
+    return {
+        f"https://www.transfermarkt.com/fc-zurich/spielplandatum/verein/260/saison_id/{2019 + i}":
+            FIXTURE_PAGE.replace(b"/2019", f"/{2019 + i}".encode()).replace(b"14.622", f"14.62{2 + i}".encode())
+        for i in range(n)
+    }
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as file:
+        return list(csv.reader(file))
+
+
+############################## PARSING ##############################
+
+def test_parse_fixture_page_matches_the_notebook():
+    expected = notebook_rows(FIXTURE_PAGE)
+    assert len(expected) == 4
+    assert parse_fixture_page(FIXTURE_PAGE) == expected                          # lxml + SoupStrainer
+    assert parse_fixture_page(FIXTURE_PAGE, parser="html.parser") == expected
+
+
+def test_parse_fixture_page_rows():
+    rows = parse_fixture_page(FIXTURE_PAGE)
+    assert rows[0] == ["Super League", "1", "Sat 20/07/2019", "6:30 PM", "FC Zürich", "(4.)",
+                       "BSC Young Boys", "(1.)", "14.622", "2:1"]
+    assert rows[1][5] == ""                          # no ranking next to the home team
+    assert rows[2][:2] == ["Swiss Cup", "2nd Round"]
+    assert rows[3][8:] == ["", "-:-"]                # not played yet
+
+
+############################## CACHE ##############################
+
+def test_page_cache_miss_then_hit(tmp_path):
+    cache = PageCache(tmp_path)
+    url = next(iter(pages(1)))
+    assert cache.get(url) is None
+    digest = cache.put(url, FIXTURE_PAGE)
+    assert cache.get(url) == FIXTURE_PAGE
+    assert (tmp_path / digest[:2] / f"{digest}.html").read_bytes() == FIXTURE_PAGE
+
+    # The index is read back by a new cache over the same folder
+    assert PageCache(tmp_path).get(url) == FIXTURE_PAGE
+    assert PageCache(tmp_path).get(url + "&other=1") is None
+
+
+def test_page_cache_stores_identical_pages_once(tmp_path):
+    cache = PageCache(tmp_path)
+    cache.put("https://example.com/a", FIXTURE_PAGE)
+    cache.put("https://example.com/b", FIXTURE_PAGE)
+    assert len(list(tmp_path.glob("*/*.html"))) == 1
+    assert cache.get("https://example.com/a") == cache.get("https://example.com/b") == FIXTURE_PAGE
+
+
+def test_page_cache_misses_a_deleted_page_and_skips_a_torn_index_line(tmp_path):
+    cache = PageCache(tmp_path)
+    digest = cache.put("https://example.com/a", FIXTURE_PAGE)
+    with open(tmp_path / "index.jsonl", "a", encoding="utf-8") as file:
+        file.write('{"url": "https://example.com/b", "sha2')            # interrupted write
+    assert PageCache(tmp_path).get("https://example.com/a") == FIXTURE_PAGE
+    (tmp_path / digest[:2] / f"{digest}.html").unlink()
+    assert PageCache(tmp_path).get("https://example.com/a") is None
+
+
+############################## SCRAPE ##############################
+
+@pytest.fixture
+def cached_pages(tmp_path):
+    """Three fixture pages in a page cache, for offline scrape() runs."""
+    cache_dir = tmp_path / "html_cache"
+    cache = PageCache(cache_dir)
+    cache.directory.mkdir(parents=True)
+    urls = pages(3)
+    for url, content in urls.items():
+        cache.put(url, content)
+    return list(urls), cache_dir
+
+
+def test_scrape_offline_from_the_cache(tmp_path, cached_pages):
+    urls, cache_dir = cached_pages
+    output = tmp_path / "RawData.csv"
+    assert scrape(urls, output, cache_dir=cache_dir, offline=True) == 12
+    rows = read_csv(output)
+    assert rows[0] == COLUMNS
+    assert [row[8] for row in rows[1:] if row[1] == "1"] == ["14.622", "14.623", "14.624"]
+
+    with pytest.raises(LookupError):
+        scrape(urls + ["https://example.com/not-cached"], tmp_path / "other.csv", cache_dir=cache_dir, offline=True)
+
+
+def test_scrape_resumes_from_a_truncated_checkpoint(tmp_path, cached_pages, monkeypatch):
+    urls, cache_dir = cached_pages
+    complete = tmp_path / "complete.csv"
+    scrape(urls, complete, cache_dir=cache_dir, offline=True)
+
+    # A run that died while writing the second page: its rows are half in the CSV
+    # and the checkpoint line was cut short
+    output = tmp_path / "RawData.csv"
+    scrape(urls, output, cache_dir=cache_dir, offline=True)
+    checkpoint = output.with_name(output.name + ".checkpoint.jsonl")
+    first, second, _ = checkpoint.read_text(encoding="utf-8").splitlines()
+    checkpoint.write_text(first + "\n" + second[:20], encoding="utf-8")
+    with open(output, "r+b") as file:
+        file.truncate(json.loads(second)["offset"] - 40)
+
+    parsed = []
+    def counting_parse(content, parser="lxml"):
+        parsed.append(content)
+        return parse_fixture_page(content, parser)
+    monkeypatch.setattr(scraper, "parse_fixture_page", counting_parse)
+    assert scrape(urls, output, cache_dir=cache_dir, offline=True) == 8
+
+    assert len(parsed) == 2                              # the first page is not parsed again
+    assert output.read_bytes() == complete.read_bytes()
+    entries = [json.loads(line) for line in checkpoint.read_text(encoding="utf-8").splitlines()]
+    assert [entry["url"] for entry in entries] == urls
+
+
+def test_scrape_restart_rewrites_the_csv(tmp_path, cached_pages):
+    urls, cache_dir = cached_pages
+    output = tmp_path / "RawData.csv"
+    scrape(urls[:1], output, cache_dir=cache_dir, offline=True)
+    assert scrape(urls, output, cache_dir=cache_dir, offline=True, restart=True) == 12
+    assert len(read_csv(output)) == 13
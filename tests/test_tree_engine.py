@@ -0,0 +1,69 @@
+"""TreeEngine against model.predict for the shipped boosters: training rows, missing values, exact thresholds."""
+
+import sqlite3
+from contextlib import closing
+
+import numpy as np
+import pytest
+
+from football import training_view
+from football.features import encoder_for, model_columns
+from football.paths import (
+    DB_PATH,
+    MODEL_WITH_WEATHER_INTERVAL_PATH,
+    MODEL_WITH_WEATHER_PATH,
+    MODEL_WITHOUT_WEATHER_INTERVAL_PATH,
+    MODEL_WITHOUT_WEATHER_PATH,
+)
+from football.resources import load_model
+from football.tree_engine import check_parity, compile_model
+
+TOLERANCE = 1e-6
+SHIPPED = [MODEL_WITH_WEATHER_PATH, MODEL_WITHOUT_WEATHER_PATH,
+           MODEL_WITH_WEATHER_INTERVAL_PATH, MODEL_WITHOUT_WEATHER_INTERVAL_PATH]
+
+
+@pytest.fixture(scope="module")
+def matches():
+    with closing(sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)) as conn:
+        return training_view.prepare(training_view.read_training_frame(conn))
+
+
+def threshold_rows(engine, X):
+    """Training rows with one split feature set exactly on its threshold, and just below it."""
+    internal = engine.left != np.arange(len(engine.left))
+    splits = np.unique(np.stack([engine.feature[internal], engine.threshold[internal]], axis=1), axis=0)
+    rows = np.repeat(X[np.arange(len(splits)) % len(X)][None], 2, axis=0)
+    features = splits[:, 0].astype(np.int64)
+    thresholds = splits[:, 1].astype(np.float32)
+    index = np.arange(len(splits))
+    rows[0, index, features] = thresholds
+    rows[1, index, features] = np.nextafter(thresholds, np.float32(-np.inf))
+    return rows.reshape(-1, X.shape[1])
+
+
+def missing_rows(X, rng):
+    """An all-NaN row, and training rows with a random third of their features missing."""
+    rows = X[rng.choice(len(X), size=min(len(X), 500), replace=False)].copy()
+    rows[rng.random(rows.shape) < 1 / 3] = np.nan
+    return np.vstack([np.full((1, X.shape[1]), np.nan, dtype=np.float32), rows])
+
+
+def max_error(model, engine, X, batch=512):
+    return max(check_parity(model, X[i:i + batch], engine) for i in range(0, len(X), batch))
+
+
+@pytest.mark.parametrize("path", SHIPPED, ids=lambda path: path.stem)
+def test_engine_matches_model_predict(path, matches):
+    model = load_model(path)
+    engine = compile_model(model)
+    X = encoder_for(model_columns(model)).encode_frame(matches)
+    edges = np.vstack([threshold_rows(engine, X), missing_rows(X, np.random.default_rng(0))])
+
+    assert max_error(model, engine, X) <= TOLERANCE
+    assert max_error(model, engine, edges) <= TOLERANCE
+
+    # One row at a time goes through the 1-D path of leaves()
+    for row in edges[::max(1, len(edges) // 200)]:
+        expected = np.asarray(model.predict(row.reshape(1, -1))).reshape(-1)
+        assert np.max(np.abs(engine.predict(row).reshape(-1) - expected)) <= TOLERANCE
@@ -0,0 +1,72 @@
+"""ForecastCache: one API call per stadium and date, even while other keys expire."""
+
+import threading
+import time
+
+from football.weather import ForecastCache, _Entry
+
+
+class FakeSession:
+    """Answers like open-meteo; calls for the latitudes in `blocked` wait for `release`."""
+
+    def __init__(self, blocked=()):
+        self.blocked = set(blocked)
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def get(self, url, params, timeout):
+        with self._lock:
+            self.calls.append(params["latitude"])
+        if params["latitude"] in self.blocked:
+            self.started.set()
+            self.release.wait(5)
+        return self
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"hourly": {"temperature_2m": [12.5] * 24, "weathercode": [0] * 24}}
+
+
+def test_concurrent_requests_share_one_call():
+    session = FakeSession(blocked={50.0})
+    cache = ForecastCache(session=session)
+    threads = [threading.Thread(target=cache.at, args=(50.0, 4.0, "2026-01-10", 18)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    assert session.started.wait(5)
+    time.sleep(0.1)
+    session.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert session.calls == [50.0]
+    assert cache.at(50.0, 4.0, "2026-01-10", 18) == (12.5, "Clear or mostly clear")
+    assert session.calls == [50.0]
+    assert cache._key_locks == {} and not cache._key_users
+
+
+def test_evicting_a_key_keeps_the_lock_of_its_running_request():
+    session = FakeSession(blocked={51.0})
+    cache = ForecastCache(session=session)
+    # An expired entry, refreshed by a first request that is still waiting for the API
+    cache._entries[cache._key(51.0, 4.0, "2026-01-10")] = _Entry(0.0, None)
+    first = threading.Thread(target=cache.hourly, args=(51.0, 4.0, "2026-01-10"))
+    first.start()
+    assert session.started.wait(5)
+
+    # Another key's answer evicts the expired entry; a second request for it must still wait
+    cache.hourly(50.0, 4.0, "2026-01-10")
+    second = threading.Thread(target=cache.hourly, args=(51.0, 4.0, "2026-01-10"))
+    second.start()
+    time.sleep(0.1)
+    assert session.calls.count(51.0) == 1
+
+    session.release.set()
+    first.join()
+    second.join()
+    assert session.calls.count(51.0) == 1
+    assert cache._key_locks == {} and not cache._key_users